@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import os
+
+import numpy as np
 import pytest
 
 import vpype as vp
@@ -28,6 +31,43 @@ def test_benchmark_read(benchmark, svg_file):
     assert doc is not None
 
 
+@pytest.mark.parametrize("parallel", [False, True])
+@pytest.mark.parametrize(
+    "simplify",
+    [
+        False,
+        pytest.param(
+            True,
+            marks=pytest.mark.skipif(
+                "VPYPE_LARGE_BENCHMARKS" not in os.environ,
+                reason="set VPYPE_LARGE_BENCHMARKS to run",
+            ),
+        ),
+    ],
+)
+@pytest.mark.parametrize(
+    "svg_file", ["benchmark/300_beziers.svg", "benchmark/500_circles.svg"]
+)
+def test_benchmark_read_parallel(benchmark, svg_file, simplify, parallel):
+    path = str(TEST_FILE_DIRECTORY / svg_file)
+
+    doc = benchmark(vp.read_multilayer_svg, path, 0.1, simplify=simplify, parallel=parallel)
+
+    assert len(doc.layers) > 0
+
+
+@pytest.mark.parametrize(
+    "svg_file", ["benchmark/300_beziers.svg", "benchmark/900_quad_beziers.svg"]
+)
+def test_benchmark_read_adaptive(benchmark, svg_file):
+    path = str(TEST_FILE_DIRECTORY / svg_file)
+
+    # 0.05 px is about 0.01mm
+    doc = benchmark(vp.read_multilayer_svg, path, 10.0, tolerance=0.05)
+
+    assert len(doc.layers) > 0
+
+
 def test_benchmark_linesort(benchmark):
     doc = vp.read_multilayer_svg(str(TEST_FILE_DIRECTORY / "benchmark/7k_lines.svg"), 0.1)
 
@@ -39,16 +79,70 @@ def test_benchmark_linesort(benchmark):
     assert cnt == len(doc.layers[1])
 
 
-def test_benchmark_linemerge(benchmark):
+@pytest.mark.parametrize(
+    "line_count",
+    [
+        10_000,
+        100_000,
+        pytest.param(
+            1_000_000,
+            marks=pytest.mark.skipif(
+                "VPYPE_LARGE_BENCHMARKS" not in os.environ,
+                reason="set VPYPE_LARGE_BENCHMARKS to run",
+            ),
+        ),
+    ],
+)
+def test_benchmark_linesort_scaling(benchmark, line_count):
+    rng = np.random.default_rng(0)
+    doc = vp.Document(
+        vp.LineCollection(
+            rng.uniform(0, 1000, (line_count, 2)) + 1j * rng.uniform(0, 1000, (line_count, 2))
+        )
+    )
+
+    pen_up_length, _, _ = doc.layers[1].pen_up_length()
+    doc = benchmark(vpype_cli.execute, "linesort", doc)
+
+    assert pen_up_length > doc.layers[1].pen_up_length()[0]
+    assert len(doc.layers[1]) == line_count
+
+
+@pytest.mark.parametrize("method", ["hilbert", "morton"])
+def test_benchmark_linesort_curve(benchmark, method):
+    # stipple-like layer of 1M short lines
+    rng = np.random.default_rng(0)
+    starts = rng.uniform(0, 1000, 1_000_000) + 1j * rng.uniform(0, 1000, 1_000_000)
+    points = np.column_stack([starts, starts + 0.1]).ravel()
+    doc = vp.Document(vp.LineCollection.from_arrays(points, np.arange(0, len(points) + 1, 2)))
+
+    pen_up_length, _, _ = doc.layers[1].pen_up_length()
+    doc = benchmark(vpype_cli.execute, f"linesort --method {method}", doc)
+
+    assert pen_up_length > doc.layers[1].pen_up_length()[0]
+    assert len(doc.layers[1]) == 1_000_000
+
+
+@pytest.mark.parametrize("pipeline", ["linemerge", "splitall linemerge", "linegraph"])
+def test_benchmark_linemerge(benchmark, pipeline):
     doc = vp.read_multilayer_svg(str(TEST_FILE_DIRECTORY / "benchmark/multi_skull.svg"), 0.1)
 
     cnt = len(doc.layers[1])
-    doc = benchmark(vpype_cli.execute, "linemerge", doc)
+    doc = benchmark(vpype_cli.execute, pipeline, doc)
 
     assert len(doc.layers[1]) > 0
     assert cnt > len(doc.layers[1])
 
 
+def test_benchmark_crop(benchmark):
+    doc = vp.read_multilayer_svg(str(TEST_FILE_DIRECTORY / "benchmark/7k_lines.svg"), 0.1)
+
+    cnt = len(doc.layers[1])
+    doc = benchmark(vpype_cli.execute, "trim 3cm 3cm", doc)
+
+    assert 0 < len(doc.layers[1]) < cnt
+
+
 @pytest.fixture(scope="session")
 def doc_for_render():
     return vp.read_multilayer_svg(str(TEST_FILE_DIRECTORY / "benchmark/7k_lines.svg"), 0.1)
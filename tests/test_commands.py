@@ -46,6 +46,9 @@ MINIMAL_COMMANDS = [
     Command(f"read -s '{EXAMPLE_SVG}'", preserves_metadata=False),
     Command(f"read -m '{EXAMPLE_SVG}'", preserves_metadata=False),
     Command(f"read -a stroke '{EXAMPLE_SVG}'", preserves_metadata=False),
+    Command(f"read -t 0.01mm '{EXAMPLE_SVG}'", preserves_metadata=False),
+    Command(f"read --streaming '{EXAMPLE_SVG}'", preserves_metadata=False),
+    Command(f"read -t 0.01mm -q 1mm -m '{EXAMPLE_SVG}'", preserves_metadata=False),
     Command("write -f svg -"),
     Command("write -f hpgl -d hp7475a -p a4 -"),
     Command("rotate 0"),
@@ -57,7 +60,18 @@ MINIMAL_COMMANDS = [
     Command("lineshuffle"),
     Command("linesort"),
     Command("linesort --two-opt"),
+    Command("linesort --time-limit 0.05"),
+    Command("linesort --method hilbert"),
+    Command("linesort --method morton --no-flip"),
+    Command("linesort --seam --tolerance 0.1mm"),
     Command("random linesort"),  # make sure there is something sort
+    Command("estimate"),
+    Command("estimate -d hp7475a"),
+    Command("layersort"),
+    Command("layersort -d hp7475a --no-flip"),
+    Command("layersort --pen-switch-time 3 --pen-up-speed 10cm"),
+    Command("linegraph"),
+    Command("linegraph --tolerance 0.1mm"),
     Command("linemerge"),
     Command("linesimplify"),
     Command("multipass"),
@@ -440,6 +454,21 @@ def test_linemerge(runner, linemerge_args, expected):
     assert data.count == expected
 
 
+@pytest.mark.parametrize(
+    ("tolerance", "expected"),
+    [("0.05", 3), ("0.15", 2), ("0.25", 1)],
+)
+def test_linegraph(runner, tolerance, expected):
+    res = runner.invoke(
+        cli,
+        "line 0 0 0 10 line 0 10.2 0 20 line 30 30 0 20.1 "
+        f"linegraph --tolerance {tolerance} dbsample dbdump",
+    )
+    data = DebugData.load(res.output)[0]
+    assert res.exit_code == 0
+    assert data.count == expected
+
+
 @pytest.mark.parametrize(
     "lines",
     [
@@ -462,6 +491,10 @@ def test_linesort(runner, lines):
         ("--no-flip", 50.0),
         ("", 20.0),
         ("--two-opt", 0.0),
+        ("--time-limit 0.05", 0.0),
+        ("--method hilbert", 0.0),
+        ("--method morton", 0.0),
+        ("--seam", 20.0),
     },
 )
 def test_linesort_result(runner, opt, expected):
@@ -500,6 +533,52 @@ def test_linesort_reject_bad_opt(runner):
     assert data.pen_up_length == pytest.approx(14.1, abs=0.1)
 
 
+def test_linesort_seam(runner):
+    res = runner.invoke(cli, "rect 0 0 10 10 circle 30 5 5 linesort --seam dbsample dbdump")
+
+    # the circle is entered at its point closest to the rectangle's seam
+    data = DebugData.load(res.output)[0]
+    assert res.exit_code == 0
+    assert data.pen_up_length == pytest.approx(abs(25 + 5j), abs=0.1)
+
+
+def test_linesort_seam_bad_method(runner):
+    res = runner.invoke(cli, "rect 0 0 10 10 linesort --seam --method hilbert")
+    assert res.exit_code != 0
+
+
+def test_estimate(runner):
+    res = runner.invoke(cli, "line 0 0 10cm 0 line -l 2 0 0 10cm 0 estimate")
+
+    assert res.exit_code == 0
+    assert res.output.count("Total time:") == 3
+    assert "Layer 2" in res.output
+
+
+def test_estimate_bad_device(runner):
+    res = runner.invoke(cli, "line 0 0 10 0 estimate --device unknown_device")
+    assert res.exit_code != 0
+
+
+def test_layersort(runner):
+    res = runner.invoke(
+        cli,
+        "line -l1 0 0 10 0 line -l2 50 0 60 0 line -l7 100 0 90 0 "
+        "layersort --device hp7475a --pen-switch-time 10 dbsample dbdump",
+    )
+
+    # layers 1 and 7 use the same pen and are plotted consecutively, the latter reversed
+    data = DebugData.load(res.output)[0]
+    assert res.exit_code == 0
+    assert sorted(data.document.layers) == [1, 7, 8]
+    assert data.document.layers[7][0][0] == 90
+
+
+def test_layersort_bad_device(runner):
+    res = runner.invoke(cli, "line 0 0 10 0 layersort --device unknown_device")
+    assert res.exit_code != 0
+
+
 def test_linesort_two_opt_debug_output(runner, caplog):
     res = runner.invoke(cli, "-vv -s 0 random -n 100 linesort --two-opt")
 
@@ -760,6 +839,15 @@ def test_pagerotate_orientation_error():
     assert doc.page_size == pytest.approx((1122.5196850393702, 793.7007874015749))
 
 
+def test_single_precision():
+    doc = execute(
+        "random -n 100 linemerge linegraph linesort", global_opt="--single-precision"
+    )
+    assert doc.layers[1].dtype == np.complex64
+    assert all(line.dtype == np.complex64 for line in doc.layers[1])
+    assert vp.get_default_dtype() == np.complex128
+
+
 def test_help(runner):
     res = runner.invoke(cli, "--help")
 
@@ -1,5 +1,9 @@
 from __future__ import annotations
 
+import pytest
+
+import vpype as vp
+
 
 def test_config_is_empty(config_manager):
     assert config_manager.config == {}
@@ -94,3 +98,49 @@ def test_config_merge_table_must_extend(config_manager, config_file_factory):
     config_manager.load_config_file(p1)
     config_manager.load_config_file(p2)
     assert config_manager.config == {"test": [{"a": 1}, {"b": 2}]}
+
+
+def test_config_plotter_kinematics(config_manager, config_file_factory):
+    path = config_file_factory(
+        """
+        [device.my_plotter]
+        name = "My Plotter"
+        plotter_unit_length = "0.02488mm"
+        pen_count = 6
+        pen_switch_time = 5
+        pen_lift_time = 0.25
+        pen_up_speed = "10cm"
+        pen_down_speed = "5cm"
+        acceleration = 1000
+
+        [[device.my_plotter.paper]]
+        name = "a4"
+        y_axis_up = true
+        origin_location = [0, 0]
+
+        [device.default_plotter]
+        name = "Default Plotter"
+        plotter_unit_length = "0.02488mm"
+        pen_count = 6
+
+        [[device.default_plotter.paper]]
+        name = "a4"
+        y_axis_up = true
+        origin_location = [0, 0]
+        """
+    )
+    config_manager.load_config_file(path)
+
+    config = config_manager.get_plotter_config("my_plotter")
+    assert config.pen_switch_time == 5.0
+    assert config.pen_lift_time == 0.25
+    assert config.pen_up_speed == pytest.approx(vp.convert_length("10cm"))
+    assert config.pen_down_speed == pytest.approx(vp.convert_length("5cm"))
+    assert config.acceleration == 1000.0
+
+    config = config_manager.get_plotter_config("default_plotter")
+    assert config.pen_switch_time == 0.0
+    assert config.pen_lift_time == 0.0
+    assert config.pen_up_speed == pytest.approx(vp.convert_length("200mm"))
+    assert config.pen_down_speed == pytest.approx(vp.convert_length("100mm"))
+    assert config.acceleration == pytest.approx(vp.convert_length("1000mm"))
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import math
+
+import numpy as np
+import pytest
+
+import vpype as vp
+
+
+def _profile(**kwargs) -> vp.PlotterConfig:
+    return vp.PlotterConfig(
+        name="test",
+        paper_configs=[],
+        plotter_unit_length=1.0,
+        pen_count=kwargs.pop("pen_count", 2),
+        pen_down_speed=kwargs.pop("pen_down_speed", 100.0),
+        pen_up_speed=kwargs.pop("pen_up_speed", 200.0),
+        acceleration=kwargs.pop("acceleration", 1000.0),
+        **kwargs,
+    )
+
+
+def _pen_down_time(lines, **kwargs) -> float:
+    doc = vp.Document(vp.LineCollection(lines))
+    return vp.estimate_plot_time(doc, _profile(**kwargs))[1].pen_down
+
+
+@pytest.mark.parametrize(
+    ("length", "expected"),
+    [
+        # trapezoidal profile: 0.1s to reach the maximum speed over 5 units, at both ends
+        (1000, 0.2 + 990 / 100),
+        # triangular profile: the maximum speed is not reached
+        (2, 2 * math.sqrt(2 * 1000) / 1000),
+        (10, 0.2),
+    ],
+)
+def test_estimate_plot_time_straight_line(length, expected):
+    assert _pen_down_time([[0, length]]) == pytest.approx(expected)
+
+    # collinear vertices do not slow down the pen
+    assert _pen_down_time([np.linspace(0, length, 7)]) == pytest.approx(expected)
+
+
+def test_estimate_plot_time_corners():
+    # the pen stops at right angle corners
+    square = [0, 1000, 1000 + 1000j, 1000j, 0]
+    assert _pen_down_time([square]) == pytest.approx(4 * _pen_down_time([[0, 1000]]))
+
+    # shallow turns slow down the pen without stopping it
+    bent = [0, 1000, 2000 + 100j]
+    assert _pen_down_time([[0, 1000]]) < _pen_down_time([bent])
+    assert _pen_down_time([bent]) < _pen_down_time([[0, 1000], [1000, 2000 + 100j]])
+
+
+def test_estimate_plot_time_infinite_acceleration():
+    assert _pen_down_time([[0, 1000, 1000j]], acceleration=math.inf) == pytest.approx(
+        (1000 + 1000 * math.sqrt(2)) / 100
+    )
+
+
+def test_estimate_plot_time_layers():
+    doc = vp.Document()
+    doc.add(vp.LineCollection([[0, 10], [20, 30]]), 1)
+    doc.add(vp.LineCollection(), 2)
+    doc.add(vp.LineCollection([[30, 40]]), 3)
+    doc.add(vp.LineCollection([[40, 50]]), 4)
+
+    times = vp.estimate_plot_time(doc, _profile(pen_lift_time=0.5, pen_switch_time=10))
+    assert list(times) == [1, 2, 3, 4]
+    assert times[2] == vp.PlotTime()
+
+    # layers 1 and 3 use the same pen
+    assert times[1].pen_lift == 2.0
+    assert times[1].pen_switch == 0
+    assert times[3].pen_switch == 0
+    assert times[4].pen_switch == 10
+
+    # pen-up moves start and end at rest
+    assert times[1].pen_up == pytest.approx(2 * math.sqrt(1000 * 10) / 1000)
+    assert times[3].pen_up == 0
+    assert times[4].pen_up == 0
+
+    total = sum(times.values(), vp.PlotTime())
+    assert total.total == pytest.approx(sum(t.total for t in times.values()))
+    assert total.total == pytest.approx(
+        total.pen_down + total.pen_up + total.pen_lift + total.pen_switch
+    )
+
+
+def test_estimate_plot_time_default_profile():
+    doc = vp.Document()
+    doc.add(vp.LineCollection([[0, 10]]), 1)
+    doc.add(vp.LineCollection([[10, 20]]), 7)
+
+    times = vp.estimate_plot_time(doc)
+    assert times[7].pen_switch == 0
+    assert times[1].pen_down == pytest.approx(times[7].pen_down)
+
+    assert vp.estimate_plot_time(vp.Document()) == {}
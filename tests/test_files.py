@@ -4,12 +4,18 @@ from __future__ import annotations
 
 import difflib
 import io
+import math
 import os
+import pathlib
 import re
+from xml.etree import ElementTree
 
 import click
+import multiprocess
 import numpy as np
 import pytest
+import shapely
+import svgelements
 
 import vpype as vp
 import vpype_cli
@@ -53,6 +59,239 @@ def test_read_svg_should_not_generate_duplicate_points(path):
         assert np.all(line[1:] != line[:-1])
 
 
+@pytest.mark.parametrize(
+    "path", [path for path in TEST_FILES if os.sep + "benchmark" + os.sep not in path]
+)
+@pytest.mark.parametrize("simplify", [False, True])
+def test_read_parallel_identical(monkeypatch, path, simplify):
+    # force batching of even the smallest files
+    monkeypatch.setattr(os, "cpu_count", lambda: 2)
+    monkeypatch.setattr(vp.io, "_MIN_BATCH_CURVE_COUNT", 1)
+
+    doc = vp.read_multilayer_svg(path, 0.5, simplify=simplify)
+    doc_parallel = vp.read_multilayer_svg(path, 0.5, simplify=simplify, parallel=True)
+
+    # the worker processes do not outlive the read
+    assert not multiprocess.active_children()
+    assert doc.layers.keys() == doc_parallel.layers.keys()
+    for lid, lc in doc.layers.items():
+        points, offsets = lc.as_arrays()
+        points_parallel, offsets_parallel = doc_parallel.layers[lid].as_arrays()
+        assert np.array_equal(points, points_parallel)
+        assert np.array_equal(offsets, offsets_parallel)
+
+
+@pytest.mark.parametrize(
+    "path", [path for path in TEST_FILES if os.sep + "benchmark" + os.sep not in path]
+)
+def test_read_simplify_within_quantization(path):
+    doc = vp.read_multilayer_svg(path, 0.5, crop=False)
+    doc_simplified = vp.read_multilayer_svg(path, 0.5, crop=False, simplify=True)
+
+    # simplification only drops curve points, and the lines remain within quantization
+    assert doc.layers.keys() == doc_simplified.layers.keys()
+    for lid, lc in doc.layers.items():
+        lc_simplified = doc_simplified.layers[lid]
+        assert len(lc) == len(lc_simplified)
+        assert np.array_equal(lc.line_starts(), lc_simplified.line_starts())
+        assert np.array_equal(lc.line_ends(), lc_simplified.line_ends())
+        for line, simplified in zip(lc, lc_simplified):
+            assert len(simplified) <= len(line)
+            assert np.all(np.isin(simplified, line))
+            assert (
+                shapely.hausdorff_distance(
+                    shapely.linestrings(vp.as_vector(line)),
+                    shapely.linestrings(vp.as_vector(simplified)),
+                )
+                <= 0.5 + 1e-9
+            )
+
+
+def _assert_documents_equal(doc: vp.Document, other: vp.Document) -> None:
+    assert doc.page_size == other.page_size
+    assert doc.metadata == other.metadata
+    assert list(doc.layers) == list(other.layers)
+    for lid, lc in doc.layers.items():
+        assert lc.metadata == other.layers[lid].metadata
+        points, offsets = lc.as_arrays()
+        other_points, other_offsets = other.layers[lid].as_arrays()
+        assert np.array_equal(points, other_points)
+        assert np.array_equal(offsets, other_offsets)
+
+
+@pytest.mark.parametrize(
+    "path", [path for path in TEST_FILES if os.sep + "benchmark" + os.sep not in path]
+)
+def test_read_multilayer_svg_streaming_identical(path):
+    _assert_documents_equal(
+        vp.read_multilayer_svg(path, 0.5),
+        vp.read_multilayer_svg(path, 0.5, streaming=True),
+    )
+
+
+SIMPLE_SVG = """<?xml version="1.0"?>
+<svg xmlns="http://www.w3.org/2000/svg" xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"
+    xmlns:sodipodi="http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd"
+    width="100mm" height="50mm" viewBox="0 0 200 100">
+  <style>.thick { stroke-width: 3; }</style>
+  <sodipodi:namedview inkscape:zoom="1" />
+  <line x1="1" y1="2" x2="3e1" y2="-4.5" />
+  <line x1="5" y1="5" x2="5" y2="5" stroke="red" />
+  <g inkscape:label="Layer 2" transform="translate(10, 20) rotate(30)" stroke="blue">
+    <polyline points="0,0 10,10 20,0" class="thick" />
+    <polygon points="0 0, 10 0 10 10" />
+    <polyline points="" />
+    <polyline points="5,5" />
+    <path d="M 0 0 L 10 10 20 0 Z m 5 5 l 1 1 2 0 h 3 v -2 H 0 V 1 z M1,1" />
+    <path d="m1,2 3,4" />
+    <g transform="scale(2)" style="stroke:green">
+      <path d=" M0,0L5,5" transform="skewX(10)" />
+      <polyline points="1,1 2,2" visibility="hidden" />
+    </g>
+    <g style="display:none"><line x2="10" /></g>
+  </g>
+  <g id="layer5" stroke-width="2"><line x2="10" y2="10"><title>line</title></line></g>
+</svg>
+"""
+
+
+def test_simple_svg_fast_path(tmp_path, monkeypatch):
+    path = _write_svg_file(tmp_path, SIMPLE_SVG)
+    with open(path, "rb") as fp:
+        assert vp.io._simplify_svg(ElementTree.fromstring(fp.read())) is not None
+
+    docs = [
+        vp.read_multilayer_svg(path, 0.1),
+        vp.read_svg_by_attributes(path, ["stroke"], 0.1),
+        vp.Document(vp.read_svg(path, 0.1)[0]),
+    ]
+    monkeypatch.setattr(vp.io, "_simplify_svg", lambda root: None)
+    ref_docs = [
+        vp.read_multilayer_svg(path, 0.1),
+        vp.read_svg_by_attributes(path, ["stroke"], 0.1),
+        vp.Document(vp.read_svg(path, 0.1)[0]),
+    ]
+
+    for doc, ref_doc in zip(docs, ref_docs):
+        _assert_documents_equal(doc, ref_doc)
+    assert list(docs[0].layers) == [1, 2, 5]
+
+
+@pytest.mark.parametrize(
+    "path", [path for path in TEST_FILES if os.sep + "benchmark" + os.sep not in path]
+)
+def test_simple_svg_fast_path_identical(path, monkeypatch):
+    doc = vp.read_multilayer_svg(path, 0.5)
+    monkeypatch.setattr(vp.io, "_simplify_svg", lambda root: None)
+    _assert_documents_equal(doc, vp.read_multilayer_svg(path, 0.5))
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        '<circle r="5" />',
+        '<path d="M0,0 C1,1 2,2 3,3" />',
+        '<path d="L1,1" />',
+        '<path d="M0,0 1" />',
+        '<path d="M0,0 Z 1,1" />',
+        '<use href="#a" />',
+        '<line x2="1mm" />',
+        '<line x2="1 2" />',
+        '<polyline points="0,0 1-2" />',
+        '<polyline points="0,0 1.5.5" />',
+        '<polyline points="0,0 1e" />',
+        '<polyline points="0,0 inf,0" />',
+        '<polyline points="0,0 1" />',
+        '<svg><line x2="1" /></svg>',
+        "<text>hello</text>",
+        '<line x2="1"><line x2="2" /></line>',
+        '<foo:bar xmlns:foo="foo"><line x2="1" /></foo:bar>',
+    ],
+)
+def test_simple_svg_fallback(content):
+    root = ElementTree.fromstring(f'<svg xmlns="http://www.w3.org/2000/svg">{content}</svg>')
+    assert vp.io._simplify_svg(root) is None
+
+
+STREAMING_SVG = """<?xml version="1.0"?>
+<svg xmlns="http://www.w3.org/2000/svg" xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"
+    width="100" height="100">
+  <style>.red { stroke: red; }</style>
+  <defs><circle id="dot" r="5" /></defs>
+  <line x1="0" y1="0" x2="10" y2="0" />
+  <g inkscape:label="3 first"><use href="#dot" x="50" y="50" /></g>
+  <line x1="0" y1="10" x2="10" y2="10" />
+  <line x1="0" y1="20" x2="10" y2="20" />
+  <g id="layer3"><line class="red" x1="0" y1="30" x2="200" y2="30" /></g>
+  <g><line x1="0" y1="40" x2="10" y2="40" /></g>
+</svg>
+"""
+
+
+def test_iter_multilayer_svg(tmp_path, monkeypatch):
+    monkeypatch.setattr(vp.io, "_STREAM_CHUNK_SIZE", 1)
+    path = _write_svg_file(tmp_path, STREAMING_SVG)
+
+    docs = list(vp.iter_multilayer_svg(path, 0.1))
+
+    assert [list(doc.layers) for doc in docs] == [[1], [3], [1], [1], [3], [3]]
+    assert all(doc.page_size == (100, 100) for doc in docs)
+    assert all(doc.sources == {pathlib.Path(path)} for doc in docs)
+    assert docs[1].layers[3].property(vp.METADATA_FIELD_NAME) == "3 first"
+    assert docs[1].layers[3].bounds() == pytest.approx((45, 45, 55, 55))
+    assert docs[4].layers[3].property(vp.METADATA_FIELD_COLOR) == vp.Color("red")
+    assert docs[4].layers[3].bounds() == pytest.approx((0, 30, 100, 30))
+
+    # same result as the regular reader, except for the order of top-level elements
+    doc = vp.read_multilayer_svg(path, 0.1, streaming=True)
+    assert doc.layers[1].line_starts().tolist() == [0, 10j, 20j]
+    assert doc.layers[3].property(vp.METADATA_FIELD_NAME) is None
+    assert len(doc.layers[3]) == 3
+    assert len(doc.layers[3]) == len(vp.read_multilayer_svg(path, 0.1).layers[3])
+
+
+def test_iter_multilayer_svg_empty(tmp_path):
+    path = _write_svg_file(
+        tmp_path, '<svg xmlns="http://www.w3.org/2000/svg" width="10" height="20"></svg>'
+    )
+
+    docs = list(vp.iter_multilayer_svg(path, 0.1))
+
+    assert len(docs) == 1
+    assert docs[0].is_empty()
+    assert docs[0].page_size == (10, 20)
+
+
+def test_read_streaming_unresolved_use_warning(tmp_path, caplog):
+    path = _write_svg_file(
+        tmp_path,
+        """<?xml version="1.0"?>
+<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink"
+    width="100" height="100">
+  <defs><line id="before" x2="10" /></defs>
+  <g id="layer1"><use xlink:href="#before" /><use href="#after" /></g>
+  <g id="layer2"><line id="local" x2="5" /><use xlink:href="#local" y="5" /></g>
+  <defs><line id="after" y2="10" /></defs>
+</svg>""",
+    )
+
+    doc = vp.read_multilayer_svg(path, 0.1, streaming=True)
+
+    assert "'#after'" in caplog.text
+    assert "'#before'" not in caplog.text
+    assert "'#local'" not in caplog.text
+    assert len(doc.layers[1]) == 1
+    assert len(doc.layers[2]) == 2
+
+
+def test_read_streaming_single_layer_warning(caplog):
+    test_file = TEST_FILE_DIRECTORY / "misc" / "multilayer.svg"
+    doc = vpype_cli.execute(f"read -m --streaming '{test_file}'")
+
+    assert "`--streaming` is ignored in single-layer mode" in caplog.text
+    assert len(doc.layers) == 1
+
+
 METADATA_PATTERN = re.compile(r"<metadata>.*</metadata>", flags=re.DOTALL)
 
 
@@ -617,6 +856,83 @@ def test_read_svg_by_attributes_default_page_size(
     assert doc.page_size == pytest.approx(target)
 
 
+@pytest.mark.parametrize(
+    "path_data",
+    [
+        "M 10 20 Q 50 -30 90 20",
+        "M 10 20 C 30 100 70 -60 90 20",
+        "M 0 0 C 100 100 0 100 100 0",  # cusp
+        "M 10 20 A 30 30 0 1 0 70 20",
+        "M 10 20 A 50 20 30 0 1 70 60",
+        "M 10 20 A 50 20 -60 1 0 70 60",
+    ],
+)
+def test_flatten_curves_match_svgelements(path_data):
+    from vpype.io import _curve_interval_lengths, _pack_paths, _sample_curves
+
+    path = svgelements.Path(path_data)
+    seg = path[1]
+    packed = _pack_paths([path])
+    kinds, params = packed.kinds[1:], packed.params[1:]
+
+    lengths = _curve_interval_lengths(kinds, params)
+    assert lengths.sum() == pytest.approx(seg.length(), rel=1e-4)
+
+    points = np.empty(52, dtype=complex)
+    _sample_curves(kinds, params, np.array([50]), points, np.array([1]))
+    expected = seg.npoint(np.linspace(0, 1, 50)).view(dtype=complex).reshape(-1)
+    assert np.allclose(points[1:51], expected, rtol=0, atol=1e-9)
+    assert points[1] == complex(seg.start)
+    assert points[50] == complex(seg.end)
+
+
+def _max_deviation(line: np.ndarray, curve: np.ndarray) -> float:
+    a, b, p = line[np.newaxis, :-1], line[np.newaxis, 1:], curve[:, np.newaxis]
+    t = np.clip(((p - a) * (b - a).conj()).real / np.abs(b - a) ** 2, 0, 1)
+    return np.abs(p - (a + t * (b - a))).min(axis=1).max()
+
+
+@pytest.mark.parametrize(
+    "path_data",
+    [
+        "M 10 20 Q 50 -30 90 20",
+        "M 0 0 C 100 100 0 100 100 0",
+        "M 0 0 C 0 100 100 100 100 0",
+        "M 10 20 A 50 20 30 0 1 70 60",
+    ],
+)
+@pytest.mark.parametrize("quantization", [1.0, math.inf])
+def test_read_adaptive_tolerance(tmp_path, path_data, quantization):
+    path = _write_svg_file(
+        tmp_path,
+        f"""<?xml version="1.0"?>
+<svg xmlns="http://www.w3.org/2000/svg" width="100" height="100">
+  <path d="{path_data}" />
+</svg>""",
+    )
+    seg = svgelements.Path(path_data)[1]
+    curve = seg.npoint(np.linspace(0, 1, 2001)).view(dtype=complex).reshape(-1)
+
+    lc, _, _ = vp.read_svg(path, quantization, crop=False, tolerance=0.01)
+    regular_lc, _, _ = vp.read_svg(path, 0.1, crop=False)
+
+    assert len(lc) == 1
+    assert lc[0][0] == complex(seg.start)
+    assert lc[0][-1] == complex(seg.end)
+    assert _max_deviation(lc[0], curve) <= 0.01
+    assert len(lc[0]) < len(regular_lc[0]) / 4
+    if quantization < math.inf:
+        assert np.abs(np.diff(lc[0])).max() <= quantization
+
+
+def test_read_adaptive_tolerance_invalid():
+    path = str(TEST_FILE_DIRECTORY / "misc" / "few_circles.svg")
+    with pytest.raises(ValueError):
+        vp.read_svg(path, 0.1, tolerance=0)
+    with pytest.raises(click.BadParameter):
+        vpype_cli.execute(f"read -t 0 '{path}'")
+
+
 def test_read_layer_id_extraction():
     from vpype.io import _extract_digit_group
 
@@ -651,3 +967,92 @@ def test_read_layer_id_from_svg(attr, exp):
     doc = vp.read_multilayer_svg(io.StringIO(svg), 0.1)
     assert doc.layers.keys() == {exp}
     assert len(doc.layers[exp]) == 1
+
+
+def _make_vpype_test_document() -> vp.Document:
+    doc = vp.Document(page_size=(100, 200))
+    doc.add([[0, 1 + 1j], [2, 3, 4j]], 1)
+    doc.add([[5, 6 + 6j]], 3)
+    doc.layers[1].set_property(vp.METADATA_FIELD_COLOR, vp.Color("red"))
+    doc.layers[1].set_property(vp.METADATA_FIELD_NAME, "hello")
+    doc.layers[3].set_property("custom", {"a": [1, 2.5, None], "b": (1, "x")})
+    doc.sources |= {TEST_FILE_DIRECTORY / "misc" / "multilayer.svg"}
+    doc.layers[4] = vp.LineCollection()
+    return doc
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_vpype_format_round_trip(tmp_path, mmap):
+    doc = _make_vpype_test_document()
+    path = tmp_path / "test.vpype"
+    vp.write_vpype(path, doc)
+    doc_read = vp.read_vpype(path, mmap=mmap)
+    assert doc_read == doc
+    assert doc_read.page_size == (100, 200)
+    assert doc_read.layers[1].is_packed
+
+    # loaded buffers are read-only and copied on modification
+    doc_read.translate(1, 0)
+    doc_read.layers[3].lines[0][0] = 10
+    assert vp.read_vpype(path, mmap=mmap) == doc
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_vpype_format_overwrite_source(tmp_path, mmap):
+    doc = _make_vpype_test_document()
+    path = tmp_path / "test.vpype"
+    vp.write_vpype(path, doc)
+
+    doc_read = vp.read_vpype(path, mmap=mmap)
+    doc_read.layers[3].translate(1, 0)
+    vp.write_vpype(path, doc_read)
+    assert doc_read.layers[1] == doc.layers[1]
+    assert vp.read_vpype(path) == doc_read
+    assert list(tmp_path.iterdir()) == [path]
+
+    vpype_cli.execute(f"read '{path}' translate 0 1 write '{path}'")
+    doc_read.translate(0, 1)
+    assert vp.read_vpype(path).layers == doc_read.layers
+
+
+def test_vpype_format_file_object():
+    doc = _make_vpype_test_document()
+    doc.set_dtype(np.complex64)
+    buffer = io.BytesIO()
+    vp.write_vpype(buffer, doc)
+    buffer.seek(0)
+    doc_read = vp.read_vpype(buffer)
+    assert doc_read == doc
+    assert doc_read.dtype == np.complex64
+    assert doc_read.layers[1].dtype == np.complex64
+
+
+def test_vpype_format_unsupported_metadata(caplog):
+    doc = vp.Document()
+    doc.add([[0, 1]], 1)
+    doc.layers[1].set_property("unsupported", object())
+    buffer = io.BytesIO()
+    vp.write_vpype(buffer, doc)
+    assert "unsupported" in caplog.text
+    buffer.seek(0)
+    assert vp.read_vpype(buffer).layers[1].metadata == {}
+
+
+def test_vpype_format_invalid_file():
+    with pytest.raises(ValueError):
+        vp.read_vpype(io.BytesIO(b"<svg></svg>"))
+
+
+def test_vpype_format_commands(tmp_path):
+    test_file = TEST_FILE_DIRECTORY / "misc" / "multilayer.svg"
+    path = tmp_path / "test.vpype"
+    doc = vpype_cli.execute(f"read '{test_file}' write '{path}'")
+    doc_read = vpype_cli.execute(f"read '{path}'")
+    assert doc_read.layers == doc.layers
+    assert doc_read.page_size == doc.page_size
+    assert doc_read.property(vp.METADATA_FIELD_SOURCE) == path
+    assert doc_read.sources == {test_file, path}
+
+    doc_single = vpype_cli.execute(f"read -l 2 '{path}'")
+    assert list(doc_single.layers) == [2]
+    assert len(doc_single.layers[2]) == sum(len(lc) for lc in doc.layers.values())
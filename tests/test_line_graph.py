@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+import vpype as vp
+
+
+def _segments(lc: vp.LineCollection) -> list[tuple[complex, complex]]:
+    return sorted(
+        tuple(sorted((a, b), key=lambda p: (p.real, p.imag)))
+        for line in lc
+        for a, b in zip(line[:-1], line[1:])
+    )
+
+
+def _grid(n: int) -> vp.LineCollection:
+    # n x n touching squares
+    return vp.LineCollection([vp.rect(i, j, 1, 1) for i in range(n) for j in range(n)])
+
+
+def test_merge_line_graph_single_stroke():
+    # all nodes have an even degree
+    lc = _grid(5)
+    res = vp.merge_line_graph(lc)
+
+    assert len(res) == 1
+    assert res.pen_up_length()[0] == 0
+    assert res.length() == pytest.approx(lc.length())
+    assert _segments(res) == _segments(lc)
+
+
+@pytest.mark.parametrize("n", [1, 2, 5, 10])
+def test_merge_line_graph_odd_nodes(n):
+    # grid of horizontal and vertical lines: 4 * (n - 1) odd-degree nodes on the border
+    lc = vp.LineCollection()
+    for i in range(n + 1):
+        lc.append(np.arange(n + 1) + 1j * i)
+        lc.append(i + 1j * np.arange(n + 1))
+    lc.merge(0.0)  # make sure the input is not already optimal
+    res = vp.merge_line_graph(lc)
+
+    assert len(res) == max(1, 2 * (n - 1))
+    assert _segments(res) == _segments(lc)
+
+
+def test_merge_line_graph_components():
+    lc = vp.LineCollection([[0, 1], [1, 2], [10, 11], vp.rect(20, 20, 1, 1), [30, 30]])
+    res = vp.merge_line_graph(lc)
+
+    assert len(res) == 4
+    assert _segments(res) == _segments(lc)
+
+
+def test_merge_line_graph_tolerance():
+    lc = vp.LineCollection([[0, 1], [1.01, 2], [2.05, 3]])
+
+    assert len(vp.merge_line_graph(lc)) == 3
+    res = vp.merge_line_graph(lc, tolerance=0.02)
+    assert len(res) == 2
+    assert res.length() == pytest.approx(2.95)
+    assert len(vp.merge_line_graph(lc, tolerance=0.05)) == 1
+
+
+def test_merge_line_graph_tolerance_not_transitive():
+    # endpoints are only snapped to a node within the tolerance, not through a chain of nodes
+    lc = vp.LineCollection([[0, 1j], [0.04, 1 + 1j], [0.08, 2 + 1j]])
+    res = vp.merge_line_graph(lc, tolerance=0.05)
+
+    assert len(res) == 2
+    assert {p for line in res for p in line if p.imag == 0} == {0, 0.08}
+
+
+def test_merge_line_graph_tolerance_finely_sampled():
+    # consecutive points of a densely sampled line are much closer than the tolerance
+    lc = vp.LineCollection([vp.circle(0, 0, 100, 0.01), vp.circle(200.02, 0, 100, 0.01)])
+    res = vp.merge_line_graph(lc, tolerance=0.05)
+
+    assert res.length() == pytest.approx(lc.length(), rel=1e-3)
+    assert len(res) == 1
+    assert res.pen_up_length()[0] == 0
+
+
+def test_merge_line_graph_short_lines():
+    lc = vp.LineCollection([[10, 20]])
+    lc.lines.extend([np.array([0j]), np.array([5 + 5j])])
+    res = vp.merge_line_graph(lc, tolerance=0.05)
+
+    assert len(res) == 3
+    assert _segments(res) == _segments(lc)
+    assert sorted(tuple(line) for line in res if len(line) == 1) == [(0j,), (5 + 5j,)]
+
+
+def test_merge_line_graph_random():
+    rng = np.random.default_rng(0)
+    points = np.round(rng.uniform(0, 10, 200)) + 1j * np.round(rng.uniform(0, 10, 200))
+    lc = vp.LineCollection(points.reshape(-1, 2))
+    lc.metadata["vp_color"] = vp.Color("red")
+    res = vp.merge_line_graph(lc)
+
+    assert res.metadata == lc.metadata
+    assert _segments(res) == _segments(lc)
+    assert len(res) <= len(lc)
+
+
+def test_merge_line_graph_empty():
+    res = vp.merge_line_graph(vp.LineCollection())
+    assert len(res) == 0
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import math
+
 import numpy as np
 import pytest
 
 from vpype import LineCollection, LineIndex
+from vpype.line_index import _PointGrid
 
 from .conftest import random_line
 
@@ -59,3 +62,168 @@ def test_empty_lines():
     idx = LineIndex(LineCollection())
     with pytest.raises(RuntimeError):
         idx.pop_front()
+
+
+@pytest.mark.parametrize("reverse", [False, True])
+def test_find_nearest_matches_brute_force(reverse):
+    rng = np.random.default_rng(0)
+    lines = list(rng.uniform(0, 100, (500, 3)) + 1j * rng.uniform(0, 100, (500, 3)))
+    idx = LineIndex(LineCollection(lines), reverse=reverse)
+
+    available = np.ones(len(lines), dtype=bool)
+    starts = np.array([line[0] for line in lines])
+    ends = np.array([line[-1] for line in lines])
+    for p in rng.uniform(-50, 150, 400) + 1j * rng.uniform(-50, 150, 400):
+        dists = np.where(available, np.abs(starts - p), np.inf)
+        rdists = np.where(available, np.abs(ends - p), np.inf)
+        if reverse and rdists.min() < dists.min():
+            expected, best = (int(np.argmin(rdists)), True), rdists.min()
+        else:
+            expected, best = (int(np.argmin(dists)), False), dists.min()
+
+        assert idx.find_nearest(p) == expected
+        assert idx.find_nearest_within(p, 5.0) == (expected if best < 5.0 else (None, False))
+
+        # indices are stable when lines are popped
+        assert np.array_equal(idx.pop(expected[0]), lines[expected[0]])
+        available[expected[0]] = False
+    assert len(idx) == 100
+
+
+def test_find_nearest_degenerate():
+    idx = LineIndex(LineCollection([(1 + 1j, 2), (1 + 1j, 3), (1 + 1j, 4)]), reverse=True)
+    assert idx.find_nearest(0) == (0, False)
+    assert idx.find_nearest_within(1 + 1j, 0.1) == (0, False)
+    idx.pop(0)
+    assert idx.find_nearest(1000 + 1000j) == (2, True)
+    assert idx.pop_front() is idx[1]
+    assert idx.find_nearest_within(100, 1) == (None, False)
+
+
+def test_point_grid_remove_many():
+    rng = np.random.default_rng(0)
+    points = rng.uniform(0, 10, 2000) + 1j * rng.uniform(0, 10, 2000)
+    grid = _PointGrid(points)
+    available = np.ones(len(points), dtype=bool)
+
+    while available.sum() > 25:
+        items = rng.choice(np.flatnonzero(available), 25, replace=False)
+        if rng.random() < 0.5:
+            grid.remove_many(items)
+        else:
+            for item in items:
+                grid.remove(int(item))
+        available[items] = False
+
+        p = complex(*rng.uniform(-2, 12, 2))
+        dists = np.where(available, np.abs(points - p), np.inf)
+        assert grid.count == available.sum()
+        assert grid.nearest(p) == (int(np.argmin(dists)), pytest.approx(dists.min()))
+
+
+@pytest.mark.parametrize("height", [0, 1e-13, 1e-6])
+def test_point_grid_degenerate_bounds(height):
+    rng = np.random.default_rng(0)
+    points = rng.uniform(0, 1000, 10000) + 1j * rng.uniform(0, height, 10000)
+    grid = _PointGrid(points)
+
+    # the number of cells remains proportional to the number of points
+    assert grid._nx * grid._ny <= 4 * len(points)
+    for p in rng.uniform(-10, 1010, 20) + 1j * rng.uniform(-1, 1, 20):
+        dists = np.abs(points - p)
+        assert grid.nearest(p) == (int(np.argmin(dists)), pytest.approx(dists.min()))
+
+
+@pytest.mark.parametrize("max_dist", [math.inf, 0.5])
+def test_point_grid_nearest_many_remove(max_dist):
+    rng = np.random.default_rng(0)
+    points = rng.uniform(0, 10, 1000) + 1j * rng.uniform(0, 10, 1000)
+    grid = _PointGrid(points)
+    available = np.ones(len(points), dtype=bool)
+    queries = rng.uniform(-2, 12, 200) + 1j * rng.uniform(-2, 12, 200)
+
+    while available.any():
+        items, dists = grid.nearest_many(queries, max_dist)
+        all_dists = np.where(available, np.abs(points - queries[:, np.newaxis]), np.inf)
+        expected = np.where(all_dists.min(axis=1) < max_dist, all_dists.argmin(axis=1), -1)
+        assert np.array_equal(items, expected)
+        assert dists == pytest.approx(np.where(expected >= 0, all_dists.min(axis=1), np.inf))
+
+        # removing the nearest points exercises queries whose candidates were all removed
+        removed = np.unique(items[items >= 0])
+        if len(removed) == 0:
+            removed = np.flatnonzero(available)[:50]
+        grid.remove_many(removed)
+        available[removed] = False
+
+
+@pytest.mark.parametrize("reverse", [False, True])
+def test_find_nearest_many(reverse):
+    rng = np.random.default_rng(0)
+    lines = list(rng.uniform(0, 100, (500, 3)) + 1j * rng.uniform(0, 100, (500, 3)))
+    idx = LineIndex(LineCollection(lines), reverse=reverse)
+    points = rng.uniform(-50, 150, 400) + 1j * rng.uniform(-50, 150, 400)
+
+    for _ in range(3):
+        indices, reverses, dists = idx.find_nearest_many(points)
+        for p, i, r, d in zip(points, indices, reverses, dists):
+            assert idx.find_nearest(p) == (i, r)
+            assert d == pytest.approx(abs(p - (lines[i][-1] if r else lines[i][0])))
+
+        indices, reverses, dists = idx.find_nearest_many_within(points, 5.0)
+        for p, i, r, d in zip(points, indices, reverses, dists):
+            if i == -1:
+                assert idx.find_nearest_within(p, 5.0) == (None, False)
+                assert d == np.inf
+            else:
+                assert idx.find_nearest_within(p, 5.0) == (i, r)
+                assert d < 5.0
+
+        # popped lines are no longer found
+        idx.pop_many(np.unique(indices[indices >= 0]))
+        assert not np.any(np.isin(idx.find_nearest_many(points)[0], indices[indices >= 0]))
+
+
+def test_find_nearest_many_degenerate_bounds():
+    # hatch lines whose endpoints are aligned up to rounding errors
+    lc = LineCollection(np.arange(10000)[:, np.newaxis] * 0.1 + np.array([0, 100j]))
+    lc.rotate(0.5)
+    lc.rotate(-0.5)
+    starts = lc.line_starts()
+    idx = LineIndex(lc)
+    available = np.ones(len(lc), dtype=bool)
+    points = np.random.default_rng(0).uniform(-10, 1010, 200) + 0j
+
+    for _ in range(3):
+        indices, _, dists = idx.find_nearest_many(points)
+        all_dists = np.where(available, np.abs(points[:, np.newaxis] - starts), np.inf)
+        assert dists == pytest.approx(all_dists.min(axis=1))
+
+        popped = np.unique(indices)
+        idx.pop_many(popped)
+        available[popped] = False
+
+
+def test_pop_many():
+    lines = [random_line(5), random_line(3), random_line(7), random_line(4)]
+    idx = LineIndex(LineCollection(lines), reverse=True)
+
+    popped = idx.pop_many([2, 0, 2])
+    assert np.all(popped[0] == lines[2])
+    assert np.all(popped[1] == lines[0])
+    assert popped[2] is None
+    assert len(idx) == 2
+    assert idx.pop_many([0, 3])[0] is None
+    assert set(idx.find_nearest_many(np.array([lines[0][0], lines[2][-1]]))[0]) == {1}
+    assert idx.pop_many([]) == []
+
+
+def test_find_nearest_many_empty():
+    idx = LineIndex(LineCollection())
+    with pytest.raises(RuntimeError):
+        idx.find_nearest_many(np.array([0j]))
+
+    indices, reverses, dists = idx.find_nearest_many_within(np.array([0j, 1j]), 1.0)
+    assert indices.tolist() == [-1, -1]
+    assert not reverses.any()
+    assert np.all(dists == np.inf)
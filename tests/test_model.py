@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import copy
+import math
+import pickle
 import sys
 from collections.abc import Iterable, Sequence
 
@@ -160,6 +162,492 @@ def test_line_collection_flip_lines():
         assert np.all(lc[i] == np.array(line[::-1]))
 
 
+def test_line_collection_pack():
+    line_arr = [(0, 100j, 1000, 10), (5j, 3, 25j), (3 + 3j, 100, 10j)]
+    lc = LineCollection(line_arr)
+    lc.pack()
+    assert lc.is_packed
+
+    points, offsets = lc.as_arrays()
+    assert np.all(offsets == [0, 4, 7, 10])
+    assert np.all(points == np.hstack([np.array(line) for line in line_arr]))
+    assert len(lc) == 3
+    assert np.all(lc[1] == np.array(line_arr[1]))
+    assert np.all(lc[-1] == np.array(line_arr[-1]))
+    for line, ref in zip(lc, line_arr):
+        assert np.all(line == np.array(ref))
+    assert lc == LineCollection(line_arr)
+
+    # accessing the list of lines switches back to list storage
+    lc.lines.append(np.array([1, 2j]))
+    assert not lc.is_packed
+    assert len(lc) == 4
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_line_collection_packed_ops(packed):
+    line_arr = [(0, 100j, 1000, 10), (5j, 3, 25j), (3 + 3j, 100, 10j)]
+    ref = LineCollection(line_arr)
+    lc = LineCollection(line_arr)
+    if packed:
+        lc.pack()
+
+    assert lc.bounds() == ref.bounds()
+    assert lc.length() == pytest.approx(sum(vp.line_length(line) for line in ref))
+    assert lc.segment_count() == 7
+    assert lc.pen_up_length() == ref.pen_up_length()
+
+    lc.reverse()
+    lc.flip_lines()
+    assert lc.is_packed == packed
+
+    lc.translate(2, 3)
+    lc.scale(2, 4)
+    lc.rotate(0.3)
+    lc.skew(0.1, 0.2)
+    for line, ref_line in zip(lc, reversed(line_arr)):
+        ref_line = np.flip(np.array(ref_line, dtype=complex)) + (2 + 3j)
+        ref_line = 2 * ref_line.real + 4j * ref_line.imag
+        ref_line *= complex(np.cos(0.3), np.sin(0.3))
+        ref_line += np.tan(0.1) * ref_line.imag + 1j * np.tan(0.2) * ref_line.real
+        assert np.allclose(line, ref_line)
+
+
+def test_line_collection_extend_packed():
+    lc1 = LineCollection([(0, 1), (2, 3, 4)])
+    lc2 = LineCollection([(5j, 6j)])
+    lc1.pack()
+    lc2.pack()
+
+    lc = LineCollection(lc1)
+    assert lc.is_packed
+    lc.extend(lc2)
+    assert lc.is_packed
+    assert lc == LineCollection([(0, 1), (2, 3, 4), (5j, 6j)])
+
+    # data is copied
+    lc.translate(1, 1)
+    assert np.all(lc1[0] == np.array([0, 1]))
+
+
+def test_line_collection_extend_packed_repeatedly():
+    lc = LineCollection()
+    expected = []
+    for i in range(20):
+        lines = [np.array([i, i + 1j]), np.array([i, 2 * i, 3j])]
+        lc.extend(lines)
+        expected.extend(lines)
+        if i == 10:
+            lc_copy = copy.deepcopy(lc)
+    assert lc.is_packed
+    assert lc == LineCollection(expected)
+    assert lc_copy == LineCollection(expected[:22])
+    assert pickle.loads(pickle.dumps(lc)) == lc
+
+
+def test_line_collection_transform():
+    lc = LineCollection([(0, 1 + 1j), (2j, 3, 4 + 1j)])
+    lc.transform([[1, 2, 3], [4, 5, 6]])
+    assert lc == LineCollection([(3 + 6j, 6 + 15j), (7 + 16j, 6 + 18j, 9 + 27j)])
+
+    lc.transform(np.array([[0, -1, 0], [1, 0, 0], [0, 0, 1]]))
+    assert lc == LineCollection([(-6 + 3j, -15 + 6j), (-16 + 7j, -18 + 6j, -27 + 9j)])
+
+
+def test_line_collection_transform_bad_matrix():
+    lc = LineCollection([(0, 1 + 1j)])
+    with pytest.raises(ValueError):
+        lc.transform([[1, 0], [0, 1]])
+
+
+def test_line_collection_transform_is_lazy():
+    lc = LineCollection([(0, 1 + 1j), (2j, 3, 4 + 1j)])
+    lc.scale(2, 3)
+    lc.translate(1, 1)
+    assert lc.has_pending_transform
+    assert lc.bounds() == (1, 1, 9, 7)
+    assert lc.has_pending_transform
+
+    lc.rotate(0.5)
+    ref = LineCollection([(0, 1 + 1j), (2j, 3, 4 + 1j)])
+    ref.transform([[2, 0, 1], [0, 3, 1]])
+    ref.transform([[np.cos(0.5), -np.sin(0.5), 0], [np.sin(0.5), np.cos(0.5), 0]])
+    ref_points, _ = ref.as_arrays()
+    assert lc.bounds() == pytest.approx(
+        (
+            ref_points.real.min(),
+            ref_points.imag.min(),
+            ref_points.real.max(),
+            ref_points.imag.max(),
+        )
+    )
+    assert lc.has_pending_transform
+
+    for line, ref_line in zip(lc, ref):
+        assert np.allclose(line, ref_line)
+    assert not lc.has_pending_transform
+
+
+def test_line_collection_transform_copies_matrix():
+    lc = LineCollection([(0, 1 + 1j)])
+    matrix = np.array([[2.0, 0, 1], [0, 2, 0]])
+    lc.transform(matrix)
+    matrix[:] = 0
+    assert lc == LineCollection([(1, 3 + 2j)])
+
+
+def test_line_collection_transform_lazy_extend():
+    lc = LineCollection([(0, 1 + 1j)])
+    lc.translate(1, 0)
+    lc.append([0, 1j])
+    lc.extend(LineCollection([(0, 1)]))
+    assert len(lc) == 3
+    assert np.all(lc[0] == np.array([1, 2 + 1j]))
+    assert np.all(lc[1] == np.array([0, 1j]))
+    assert np.all(lc[2] == np.array([0, 1]))
+
+
+@pytest.mark.parametrize(
+    "lines", [[(0, 1 + 1j)], [(0, 1 + 1j, 2 + 2j)], [(1j, 1j)], [(0, 1, 1j, 3 + 2j)]]
+)
+def test_line_collection_lazy_bounds_degenerate(lines):
+    lc = LineCollection(lines)
+    lc.rotate(0.3)
+    bounds = lc.bounds()
+    assert lc.has_pending_transform
+
+    lc.as_arrays()
+    assert lc.bounds() == pytest.approx(bounds)
+
+
+def test_document_transform():
+    doc = Document()
+    doc.add([(0, 1 + 1j)], 1)
+    doc.add([(1j, 2)], 2)
+    doc.transform([[2, 0, 1], [0, -1, 0]])
+    assert np.all(doc.layers[1][0] == np.array([1, 3 - 1j]))
+    assert np.all(doc.layers[2][0] == np.array([1 - 1j, 5]))
+
+
+def test_line_collection_cached_stats(monkeypatch):
+    lc = LineCollection([(0, 10), (10 + 10j, 20j)])
+    calls = []
+    compute_length = lc._compute_length
+    monkeypatch.setattr(lc, "_compute_length", lambda: calls.append(1) or compute_length())
+    assert lc.length() == pytest.approx(10 + 10 * math.sqrt(2))
+    assert lc.length() == pytest.approx(10 + 10 * math.sqrt(2))
+    assert len(calls) == 1
+
+    # storage switches don't invalidate the cache
+    lc.pack()
+    lc.as_arrays()
+    lc.length()
+    assert len(calls) == 1
+
+    # mutable accesses do, as lines may be modified in-place
+    assert lc.lines is not None
+    lc.length()
+    assert len(calls) == 2
+
+    lc.append([0, 1j])
+    assert lc.length() == pytest.approx(11 + 10 * math.sqrt(2))
+    assert len(calls) == 3
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_line_collection_cache_invalidation(packed):
+    lc = LineCollection([(0, 1 + 1j), (2, 3j)])
+    if packed:
+        lc.pack()
+    assert lc.bounds() == (0, 0, 2, 3)
+    assert lc.segment_count() == 2
+
+    lc.lines.append(np.array([5, 6j]))
+    assert lc.bounds() == (0, 0, 5, 6)
+    assert lc.segment_count() == 3
+
+    lc.lines[0] = np.array([-1, 0, 1])
+    assert lc.bounds() == (-1, 0, 5, 6)
+    assert lc.segment_count() == 4
+
+    lc.lines.pop()
+    assert lc.bounds() == (-1, 0, 2, 3)
+
+    lc.translate(1, 1)
+    assert lc.bounds() == (0, 1, 3, 4)
+    assert lc.pen_up_length()[0] == pytest.approx(1.0)
+
+    lc.crop(0, 0, 2, 10)
+    assert lc.bounds() == pytest.approx((0, 1, 2, 4))
+
+    for line in lc:
+        line *= 2
+    assert lc.bounds() == pytest.approx((0, 2, 4, 8))
+
+    lc[0][0] = -2 + 2j
+    assert lc.bounds() == pytest.approx((-2, 2, 4, 8))
+
+    line = lc[1]
+    lc.bounds()
+    line *= 0.5
+    assert lc.bounds() == pytest.approx((-2, 2, 4, 8))
+    lc.invalidate()
+    assert lc.bounds() == pytest.approx((-2, 2, 4, 4))
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_line_collection_copy_on_write(packed):
+    lc1 = LineCollection([(0, 1 + 1j), (2, 3j)])
+    if packed:
+        lc1.pack()
+    lc2 = LineCollection(lc1)
+    lc3 = LineCollection([(5, 6)])
+    lc3.extend(lc1)
+    assert np.shares_memory(next(lc1._iter_lines()), next(lc2._iter_lines()))
+    assert np.shares_memory(next(lc1._iter_lines()), list(lc3._iter_lines())[1])
+
+    lc2.translate(1, 0)
+    for line in lc3.lines:
+        line *= 2
+    assert lc1 == LineCollection([(0, 1 + 1j), (2, 3j)])
+    assert lc2 == LineCollection([(1, 2 + 1j), (3, 1 + 3j)])
+    assert lc3 == LineCollection([(10, 12), (0, 2 + 2j), (4, 6j)])
+
+    for line in lc1.lines:
+        line *= -1
+    assert lc1 == LineCollection([(0, -1 - 1j), (-2, -3j)])
+    assert lc2 == LineCollection([(1, 2 + 1j), (3, 1 + 3j)])
+
+
+@pytest.mark.parametrize("packed", [False, True])
+@pytest.mark.parametrize("share", ["add", "extend", "deepcopy"])
+def test_line_collection_copy_on_write_in_place(packed, share):
+    lc = LineCollection([(0, 1 + 1j), (2, 3j)])
+    if packed:
+        lc.pack()
+    if share == "add":
+        doc = Document()
+        doc.add(lc, 1)
+        other = doc.layers[1]
+    elif share == "extend":
+        other = LineCollection()
+        other.extend(lc)
+    else:
+        other = copy.deepcopy(lc)
+
+    for line in lc:
+        line *= 2
+    lc[0][0] = 5
+    for line in other:
+        line += 1
+    other[1][1] = 7
+
+    assert lc == LineCollection([(5, 2 + 2j), (4, 6j)])
+    assert other == LineCollection([(1, 2 + 1j), (3, 7)])
+
+
+def test_document_deepcopy_shares_geometry():
+    doc = Document()
+    doc.add([(0, 1 + 1j), (2, 3j)], 1)
+    doc.layers[1].set_property("vp_name", "hello")
+    doc.layers[1].pack()
+    doc_copy = copy.deepcopy(doc)
+    assert doc_copy == doc
+    assert np.shares_memory(
+        next(doc.layers[1]._iter_lines()), next(doc_copy.layers[1]._iter_lines())
+    )
+
+    doc_copy.translate(1, 0)
+    doc_copy.layers[1].set_property("vp_name", "world")
+    doc_copy.layers[1].lines[0][0] = 10
+    assert np.all(doc.layers[1][0] == np.array([0, 1 + 1j]))
+    assert np.all(doc.layers[1][1] == np.array([2, 3j]))
+    assert doc.layers[1].property("vp_name") == "hello"
+
+
+@pytest.mark.parametrize("packed", [False, True])
+@pytest.mark.parametrize("dtype", [np.complex128, np.complex64])
+def test_line_collection_crop_matches_per_line_crop(packed, dtype):
+    rng = np.random.default_rng(0)
+    lines = [
+        (rng.integers(-3, 8, n) + 1j * rng.integers(-3, 8, n)).astype(dtype)
+        for n in rng.integers(2, 15, 200)
+    ] + [
+        (rng.uniform(-3, 8, n) + 1j * rng.uniform(-3, 8, n)).astype(dtype)
+        for n in rng.integers(2, 15, 200)
+    ]
+    lc = LineCollection(lines, dtype=dtype)
+    if packed:
+        lc.pack()
+    lc.crop(5, 4, 0, 0)
+
+    expected = [cropped for line in lines for cropped in vp.crop(line, 0, 0, 5, 4)]
+    assert len(lc) == len(expected)
+    for line, expected_line in zip(lc, expected):
+        assert line.dtype == dtype
+        assert np.array_equal(line, expected_line)
+
+
+def test_line_collection_crop_keeps_inside_lines():
+    lc = LineCollection([(-5, -6), (1 + 1j, 2 + 2j), (0, 5 + 5j), (10, 11)])
+    inside = lc[1]
+    lc.crop(0, 0, 3, 3)
+
+    assert lc[0] is inside
+    assert np.array_equal(lc[1], np.array([0, 3 + 3j]))
+    assert len(lc) == 2
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_line_collection_line_metrics(packed):
+    lines = [(0, 3, 3 + 4j), (1 + 1j, 2 + 1j, 1 + 1.01j), (5j, 5 + 5j)]
+    lc = LineCollection(lines)
+    if packed:
+        lc.pack()
+
+    assert np.allclose(lc.line_lengths(), [vp.line_length(line) for line in lc])
+    assert np.array_equal(lc.line_bounds(), [[0, 0, 3, 4], [1, 1, 2, 1.01], [0, 5, 5, 5]])
+    assert np.array_equal(lc.line_starts(), [0, 1 + 1j, 5j])
+    assert np.array_equal(lc.line_ends(), [3 + 4j, 1 + 1.01j, 5 + 5j])
+    assert np.array_equal(lc.line_point_counts(), [3, 3, 2])
+    assert np.array_equal(lc.line_closed(0.1), [False, True, False])
+    assert np.array_equal(lc.line_closed(0.1), [vp.is_closed(line, 0.1) for line in lc])
+    with pytest.raises(ValueError):
+        lc.line_lengths()[0] = 1.0
+
+    lc.translate(1, 0)
+    assert np.array_equal(lc.line_starts(), [1, 2 + 1j, 1 + 5j])
+    lc.lines.append(np.array([0, 1]))
+    assert np.array_equal(lc.line_point_counts(), [3, 3, 2, 2])
+    assert lc.line_lengths()[-1] == 1.0
+
+
+def test_line_collection_line_metrics_empty():
+    lc = LineCollection()
+    assert lc.line_lengths().shape == (0,)
+    assert lc.line_bounds().shape == (0, 4)
+    assert lc.line_closed(1.0).shape == (0,)
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_line_collection_filter_mask(packed):
+    lc = LineCollection([(0, 10), (0, 1j), (0, 10j, 10 + 10j)])
+    if packed:
+        lc.pack()
+    lc.filter(lc.line_lengths() >= 10)
+    assert lc == LineCollection([(0, 10), (0, 10j, 10 + 10j)])
+
+    with pytest.raises(ValueError):
+        lc.filter([True])
+
+
+def test_line_collection_dtype():
+    lc = LineCollection([(0, 1 + 1j), (2, 3j)], dtype=np.complex64)
+    lc.append(LineString([(1, 1), (3, 2)]))
+    lc.extend(LineCollection([(4, 5)]))
+    lc.translate(1, 1)
+    lc.rotate(0.5)
+    lc.crop(-10, -10, 1, 10)
+    lc.merge(1)
+    lc.reloop(0.1)
+    assert lc.dtype == np.complex64
+    assert all(line.dtype == np.complex64 for line in lc)
+
+    lc.set_dtype(np.complex128)
+    assert all(line.dtype == np.complex128 for line in lc)
+
+    with pytest.raises(ValueError):
+        LineCollection(dtype=float)
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_line_collection_set_dtype_pending_transform(packed):
+    # the pending transform must be applied before the precision is reduced
+    lc = LineCollection([[1e8 + 0.25, 1e8 + 1.25j]])
+    if packed:
+        lc.pack()
+    lc.translate(-1e8, 0)
+    lc.set_dtype(np.complex64)
+
+    assert lc.dtype == np.complex64
+    assert np.array_equal(lc[0], np.array([0.25, 1.25j], dtype=np.complex64))
+
+
+def test_document_setitem_dtype():
+    doc = Document(dtype=np.complex64)
+    doc[1] = LineCollection([(0, 1 + 1j)])
+    doc[2] = [(0, 1 + 1j)]
+
+    assert doc.layers[1].dtype == np.complex64
+    assert doc.layers[1][0].dtype == np.complex64
+    assert doc.layers[2].dtype == np.complex64
+
+
+def test_default_dtype():
+    vp.set_default_dtype(np.complex64)
+    try:
+        doc = Document()
+        doc.add([(0, 1 + 1j)])
+        assert doc.dtype == np.complex64
+        assert doc.layers[1].dtype == np.complex64
+        assert doc.clone().dtype == np.complex64
+        assert LineCollection([(0, 1)])[0].dtype == np.complex64
+    finally:
+        vp.set_default_dtype(np.complex128)
+
+    doc.set_dtype(np.complex128)
+    assert doc.layers[1][0].dtype == np.complex128
+
+
+@pytest.mark.parametrize("dtype", [np.complex128, np.complex64])
+def test_line_collection_from_arrays(dtype):
+    points = np.array([0, 1, 1 + 1j, 5, 2j, 3j])
+    offsets = [0, 3, 4, 4, 6]
+    expected = LineCollection([(0, 1, 1 + 1j), (2j, 3j)])
+
+    lc = LineCollection.from_arrays(points, offsets, dtype=dtype, metadata={"vp_name": "a"})
+    assert np.all(lc.as_arrays()[0] == expected.as_arrays()[0])
+    assert np.all(lc.as_arrays()[1] == [0, 3, 5])
+    assert lc.dtype == dtype
+    assert lc.property("vp_name") == "a"
+    assert not np.shares_memory(lc.as_arrays()[0], points)
+
+    lc = LineCollection.from_arrays(vp.as_vector(points), offsets, dtype=dtype)
+    assert np.all(lc.as_arrays()[0] == expected.as_arrays()[0])
+    assert lc.dtype == dtype
+
+
+@pytest.mark.parametrize(
+    ["points", "offsets"],
+    [
+        ([0, 1, 2], [0, 2]),
+        ([0, 1, 2], [1, 3]),
+        ([0, 1, 2], [0, 2, 1, 3]),
+        ([0, 1, 2], [0.0, 3.0]),
+        ([0, 1, 2], []),
+        (np.zeros((3, 3)), [0, 3]),
+    ],
+)
+def test_line_collection_from_arrays_invalid(points, offsets):
+    with pytest.raises(ValueError):
+        LineCollection.from_arrays(points, offsets)
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_line_collection_extend_arrays_fast_path(packed):
+    arrays = [np.array([0, 1 + 1j]), np.array([2j]), np.array([3, 4, 5j])]
+    lc = LineCollection([(10, 11)])
+    if packed:
+        lc.pack()
+    lc.extend(arrays)
+    assert lc == LineCollection([(10, 11), (0, 1 + 1j), (3, 4, 5j)])
+    assert not any(np.shares_memory(line, arrays[0]) for line in lc)
+
+    lc = LineCollection(np.array([[0, 1 + 1j], [2, 3j]]))
+    assert lc == LineCollection([(0, 1 + 1j), (2, 3j)])
+    assert len(LineCollection(np.zeros((5, 1), dtype=complex))) == 0
+
+
 def test_line_collection_clone():
     metadata = {"line_width": 0.3}
     lc = LineCollection(([0, 1, 10 + 10j], [0, 10]), metadata=metadata)
@@ -359,6 +847,81 @@ def test_line_collection_merge_no_flip(lines, merge_lines):
     assert _line_set_oriented(lc) == _line_set_oriented(merge_lines)
 
 
+def test_line_collection_merge_no_flip_closest_reversed():
+    # the closest ending is the end of a line, which cannot be used without flip, so the
+    # first line is not extended
+    lc = LineCollection([(0, 10), (20, 10.01), (10.02, 30)])
+    lc.merge(0.1, flip=False)
+
+    assert _line_set_oriented(lc) == _line_set_oriented([(0, 10), (20, 10.01, 10.02, 30)])
+
+
+def _reference_merge(lines: list[np.ndarray], tolerance: float, flip: bool) -> list:
+    """Line by line implementation of :meth:`LineCollection.merge` based on LineIndex."""
+    index = vp.LineIndex(lines, reverse=True)
+    new_lines = []
+    while len(index) > 0:
+        line = index.pop_front()
+        while True:
+            idx, reverse = index.find_nearest_within(line[-1], tolerance)
+            if idx is not None and (not reverse or flip):
+                new_line = index.pop(idx)
+                assert new_line is not None
+                line = np.hstack([line, np.flip(new_line) if reverse else new_line])
+                continue
+
+            idx, reverse = index.find_nearest_within(line[0], tolerance)
+            if idx is not None and (reverse or flip):
+                new_line = index.pop(idx)
+                assert new_line is not None
+                line = np.hstack([new_line if reverse else np.flip(new_line), line])
+                continue
+
+            break
+        new_lines.append(line)
+    return new_lines
+
+
+@pytest.mark.parametrize("flip", [True, False])
+@pytest.mark.parametrize("seed", range(20))
+def test_line_collection_merge_matches_reference(flip, seed):
+    rng = np.random.default_rng(seed)
+    lines = [
+        rng.uniform(0, 10, n) + 1j * rng.uniform(0, 10, n)
+        for n in rng.integers(2, 5, rng.integers(2, 150))
+    ]
+    lc = LineCollection(lines)
+    lc.merge(0.8, flip=flip)
+
+    expected = _reference_merge(lines, 0.8, flip)
+    assert len(lc) == len(expected)
+    assert all(np.array_equal(line, exp) for line, exp in zip(lc, expected))
+
+
+@pytest.mark.parametrize("flip", [True, False])
+def test_line_collection_merge_mesh(flip):
+    x, y = np.meshgrid(np.arange(20), np.arange(20))
+    p = x + 1j * y
+    segments = np.concatenate(
+        [
+            np.stack([p[:, :-1].ravel(), p[:, 1:].ravel()], axis=1),
+            np.stack([p[:-1, :].ravel(), p[1:, :].ravel()], axis=1),
+        ]
+    )
+    np.random.default_rng(0).shuffle(segments)
+    lc = LineCollection(segments)
+    lc.merge(0.01, flip=flip)
+
+    assert len(lc) < len(segments) / 2
+    assert lc.length() == pytest.approx(len(segments))
+    for line in lc:
+        assert np.all(np.abs(np.diff(line)[1::2]) < 0.01)
+    if not flip:
+        assert _line_set_oriented(segments) == {
+            tuple(line[i : i + 2]) for line in lc for i in range(0, len(line), 2)
+        }
+
+
 def test_document_clone():
     doc = Document()
     doc.add(LineCollection([(0, 1)]), 1)
@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+import vpype as vp
+import vpype.optimize
+from vpype.optimize import _hilbert_index, _morton_index
+
+
+def _random_segments(n: int, seed: int = 0) -> vp.LineCollection:
+    rng = np.random.default_rng(seed)
+    return vp.LineCollection(rng.uniform(0, 100, (n, 2)) + 1j * rng.uniform(0, 100, (n, 2)))
+
+
+def _line_set(lc: vp.LineCollection) -> set[tuple[complex, ...]]:
+    return {tuple(line) for line in lc} | {tuple(np.flip(line)) for line in lc}
+
+
+def test_sort_lines_keeps_better_original_order():
+    lc = vp.LineCollection([[0, 1], [1, 2], [2, 3]])
+    res = vp.sort_lines(lc)
+
+    assert res is not lc
+    assert res.pen_up_length()[0] == 0
+    assert all(np.array_equal(a, b) for a, b in zip(res, lc))
+
+
+@pytest.mark.parametrize("method", ["greedy", "hilbert", "morton"])
+@pytest.mark.parametrize("flip", [True, False])
+def test_sort_lines(method, flip):
+    lc = _random_segments(300)
+    res = vp.sort_lines(lc, flip=flip, method=method)
+
+    assert len(res) == len(lc)
+    assert res.pen_up_length()[0] <= lc.pen_up_length()[0]
+    if flip:
+        assert _line_set(res) == _line_set(lc)
+    else:
+        assert {tuple(line) for line in res} == {tuple(line) for line in lc}
+
+
+def test_sort_lines_bad_method():
+    with pytest.raises(ValueError):
+        vp.sort_lines(_random_segments(10), method="unknown")
+    with pytest.raises(ValueError):
+        vp.sort_lines(_random_segments(10), method="hilbert", closed_tolerance=0.05)
+
+
+def test_sort_lines_seam():
+    # the second square is entered at its corner closest to the first square's seam
+    square = np.array([0, 1j, 1 + 1j, 1, 0])
+    lc = vp.LineCollection([square, np.array([3 + 3j, 3 + 2j, 2 + 2j, 2 + 3j, 3 + 3j])])
+
+    assert vp.sort_lines(lc).pen_up_length()[0] == pytest.approx(3 * 2**0.5)
+    res = vp.sort_lines(lc, closed_tolerance=0.05)
+    assert res.pen_up_length()[0] == pytest.approx(2 * 2**0.5)
+    assert np.array_equal(res[0], lc[0])
+    assert np.array_equal(res[1], [2 + 2j, 2 + 3j, 3 + 3j, 3 + 2j, 2 + 2j])
+
+
+def test_sort_lines_seam_tolerance():
+    # an almost-closed path is only entered at an inner vertex when it is considered closed
+    lc = vp.LineCollection([[-10, 2 + 1j], [0, 1, 1 + 1j, 1j, 0.1j]])
+
+    res = vp.sort_lines(lc, closed_tolerance=0.05)
+    assert res.pen_up_length()[0] == pytest.approx(abs(2 + 0.9j))
+    res = vp.sort_lines(lc, closed_tolerance=0.1)
+    assert res.pen_up_length()[0] == pytest.approx(1)
+    assert res[1][0] == res[1][-1] == 1 + 1j
+
+
+@pytest.mark.parametrize("flip", [True, False])
+def test_sort_lines_seam_random(flip):
+    rng = np.random.default_rng(0)
+    lc = vp.LineCollection()
+    for center in rng.uniform(0, 100, 50) + 1j * rng.uniform(0, 100, 50):
+        lc.append(vp.circle(center.real, center.imag, rng.uniform(1, 5), 0.5))
+    lc.extend(_random_segments(50))
+
+    res = vp.sort_lines(lc, flip=flip, closed_tolerance=0.05)
+    assert len(res) == len(lc)
+    assert res.pen_up_length()[0] < vp.sort_lines(lc, flip=flip).pen_up_length()[0]
+    assert sorted(len(line) for line in res) == sorted(len(line) for line in lc)
+
+
+@pytest.mark.parametrize("flip", [True, False])
+def test_sort_lines_seam_aligned_endpoints(flip):
+    # hatch lines whose endpoints are aligned up to rounding errors, and a closed line
+    lc = vp.LineCollection(np.arange(10000)[:, np.newaxis] * 0.1 + np.array([0, 100j]))
+    lc.append([500, 501, 501 + 1j, 500])
+    lc.rotate(0.5)
+    lc.rotate(-0.5)
+
+    res = vp.sort_lines(lc, flip=flip, closed_tolerance=0.05)
+    assert len(res) == len(lc)
+    assert res.pen_up_length()[0] <= lc.pen_up_length()[0]
+    assert sorted(len(line) for line in res) == sorted(len(line) for line in lc)
+
+
+@pytest.mark.parametrize("order", [4, 8])
+def test_hilbert_index(order):
+    # consecutive indices are adjacent cells
+    x, y = np.meshgrid(np.arange(1 << order), np.arange(1 << order))
+    idx = _hilbert_index(x.ravel(), y.ravel(), order)
+    assert np.array_equal(np.sort(idx), np.arange(1 << (2 * order)))
+
+    path = np.argsort(idx)
+    steps = np.abs(np.diff(x.ravel()[path])) + np.abs(np.diff(y.ravel()[path]))
+    assert np.all(steps == 1)
+
+
+def test_morton_index():
+    x = np.array([0, 1, 0, 1, 2, 0xFFFF])
+    y = np.array([0, 0, 1, 1, 0, 0xFFFF])
+    assert _morton_index(x, y).tolist() == [0, 1, 2, 3, 4, 0xFFFFFFFF]
+
+
+def test_sort_lines_hilbert_grid():
+    # dots on a regular grid are visited along the Hilbert curve, one step at a time
+    rng = np.random.default_rng(0)
+    dots = [complex(x, y) for x in range(16) for y in range(16)]
+    rng.shuffle(dots)
+    res = vp.sort_lines(vp.LineCollection([[dot, dot] for dot in dots]), method="hilbert")
+
+    assert res.pen_up_length()[0] == pytest.approx(255)
+
+
+@pytest.mark.parametrize("flip", [True, False])
+def test_optimize_line_order(flip):
+    lc = _random_segments(300)
+    sorted_lc = vp.sort_lines(lc, flip=flip)
+    res = vp.optimize_line_order(sorted_lc, flip=flip)
+
+    assert len(res) == len(lc)
+    assert res.pen_up_length()[0] <= sorted_lc.pen_up_length()[0]
+    if flip:
+        assert _line_set(res) == _line_set(lc)
+    else:
+        assert {tuple(line) for line in res} == {tuple(line) for line in lc}
+
+
+def test_optimize_line_order_finds_optimum():
+    # shuffled and randomly reversed segments of a single line
+    rng = np.random.default_rng(0)
+    points = np.arange(21, dtype=complex)
+    lines = [points[i : i + 2] for i in range(20)]
+    rng.shuffle(lines)
+    lc = vp.LineCollection([np.flip(line) if rng.random() < 0.5 else line for line in lines])
+
+    res = vp.optimize_line_order(vp.sort_lines(lc))
+
+    assert res.pen_up_length()[0] == pytest.approx(0)
+
+
+def test_optimize_line_order_local_optimum():
+    # no improving 2-opt move remains when all line endings are considered as candidates
+    res = vp.optimize_line_order(_random_segments(100), neighbors=200)
+    starts, ends = res.line_starts(), res.line_ends()
+    pen_ups = np.abs(starts[1:] - ends[:-1])
+
+    for a in range(len(res)):
+        for b in range(a, len(res)):
+            before = (pen_ups[a - 1] if a > 0 else 0) + (pen_ups[b] if b < len(res) - 1 else 0)
+            after = (abs(ends[a - 1] - ends[b]) if a > 0 else 0) + (
+                abs(starts[a] - starts[b + 1]) if b < len(res) - 1 else 0
+            )
+            assert after >= before - 1e-9
+
+
+@pytest.mark.parametrize("n", [0, 1, 2])
+def test_optimize_line_order_few_lines(n):
+    lc = _random_segments(n)
+    res = vp.optimize_line_order(lc)
+
+    assert res is not lc
+    assert len(res) == n
+
+
+class _FakeTime:
+    """Stand-in for the :mod:`time` module whose clock advances by ``step`` at each reading."""
+
+    def __init__(self, step: float):
+        self.now = 0.0
+        self.step = step
+
+    def perf_counter(self) -> float:
+        self.now += self.step
+        return self.now
+
+
+def test_optimize_line_order_time_limit(monkeypatch):
+    lc = vp.sort_lines(_random_segments(300))
+    optimized = vp.optimize_line_order(lc)
+    reports = []
+
+    clock = _FakeTime(1e-5)
+    monkeypatch.setattr(vpype.optimize, "time", clock)
+    res = vp.optimize_line_order(
+        lc, time_limit=0.05, progress=lambda *args: reports.append(args)
+    )
+
+    # the optimization stops as soon as the deadline is reached
+    assert 0.05 <= clock.now < 0.05 + 4 * clock.step
+    assert _line_set(res) == _line_set(lc)
+    assert res.pen_up_length()[0] <= optimized.pen_up_length()[0] + 1e-9
+    assert reports[-1][1] == pytest.approx(res.pen_up_length()[0])
+    elapsed, lengths = zip(*reports)
+    assert list(elapsed) == sorted(elapsed)
+    assert list(lengths) == sorted(lengths, reverse=True)
+
+
+def test_optimize_line_order_time_limit_interrupts():
+    lc = _random_segments(300)
+
+    # the initial local search is interrupted and its current result returned
+    res = vp.optimize_line_order(lc, time_limit=0)
+
+    assert res.pen_up_length()[0] <= lc.pen_up_length()[0]
+    assert _line_set(res) == _line_set(lc)
+
+
+def _layer_doc() -> vp.Document:
+    doc = vp.Document()
+    doc.add(vp.LineCollection([[100, 101], [102, 103]]), 1)
+    doc.add(vp.LineCollection([[2, 3], [1, 0]]), 2)
+    doc.add(vp.LineCollection([[104, 105]]), 5)
+    doc.add(vp.LineCollection(), 6)
+    for layer_id, lc in doc.layers.items():
+        lc.set_property(vp.METADATA_FIELD_NAME, f"layer {layer_id}")
+    return doc
+
+
+def _names(doc: vp.Document) -> dict[int, str | None]:
+    return {lid: lc.property(vp.METADATA_FIELD_NAME) for lid, lc in doc.layers.items()}
+
+
+def test_sort_layers():
+    doc = _layer_doc()
+    res = vp.sort_layers(doc)
+
+    assert _names(res) == {1: "layer 2", 2: "layer 1", 3: "layer 5", 4: "layer 6"}
+    assert [list(line) for line in res.layers[1]] == [[0, 1], [2, 3]]
+    assert len(res.layers[4]) == 0
+
+
+def test_sort_layers_no_flip():
+    res = vp.sort_layers(_layer_doc(), flip=False)
+
+    assert _names(res)[1] == "layer 2"
+    assert [list(line) for line in res.layers[1]] == [[1, 0], [2, 3]]
+
+
+def test_sort_layers_pen_switch_cost():
+    # layers 1 and 5 share the same pen, which is preserved by the renumbering
+    doc = vp.Document()
+    for layer_id, x in [(1, 0), (2, 50), (5, 100)]:
+        doc.add(vp.LineCollection([[x, x + 1]]), layer_id)
+        doc.layers[layer_id].set_property(vp.METADATA_FIELD_NAME, f"layer {layer_id}")
+
+    res = vp.sort_layers(doc, pen_count=4)
+    assert _names(res) == {1: "layer 1", 2: "layer 2", 5: "layer 5"}
+
+    # with a large pen switch cost, the layers using the same pen are plotted consecutively
+    res = vp.sort_layers(doc, pen_count=4, pen_switch_cost=1000)
+    assert _names(res) == {1: "layer 1", 5: "layer 5", 6: "layer 2"}
+
+
+def test_sort_layers_keeps_better_original_order():
+    doc = vp.Document()
+    doc.add(vp.LineCollection([[0, 1]]), 3)
+    doc.add(vp.LineCollection([[2, 3]]), 7)
+    res = vp.sort_layers(doc)
+
+    assert list(res.layers) == [3, 7]
+    assert res.layers[3] is not doc.layers[3]
+    assert all(
+        np.array_equal(a, b)
+        for lid in (3, 7)
+        for a, b in zip(res.layers[lid], doc.layers[lid])
+    )
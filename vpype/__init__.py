@@ -3,12 +3,15 @@
 from __future__ import annotations
 
 from .config import *
+from .estimate import *
 from .filters import *
 from .geometry import *
 from .io import *
+from .line_graph import *
 from .line_index import *
 from .metadata import *
 from .model import *
+from .optimize import *
 from .primitives import *
 from .text import *
 from .utils import *
@@ -99,15 +99,32 @@ class PlotterConfig:
     pen_count: int  #: number of pen supported by the plotter
 
     info: str = ""  #: information printed to the user when plotter is used
+    pen_switch_time: float = 0.0  #: time needed to change pen (in seconds)
+    pen_lift_time: float = 0.0  #: time needed to raise or lower the pen (in seconds)
+    pen_up_speed: float = convert_length("200mm")  #: pen-up travel speed (in pixel/s)
+    pen_down_speed: float = convert_length("100mm")  #: drawing speed (in pixel/s)
+    acceleration: float = convert_length("1000mm")  #: acceleration (in pixel/s²)
 
     @classmethod
     def from_config(cls, data: dict[str, Any]) -> PlotterConfig:
+        times = {
+            key: float(data[key])
+            for key in ("pen_switch_time", "pen_lift_time")
+            if key in data
+        }
+        kinematics = {
+            key: convert_length(data[key])
+            for key in ("pen_up_speed", "pen_down_speed", "acceleration")
+            if key in data
+        }
         return cls(
             name=data["name"],
             paper_configs=[PaperConfig.from_config(d) for d in data["paper"]],
             plotter_unit_length=convert_length(data["plotter_unit_length"]),
             pen_count=data["pen_count"],
             info=data.get("info", ""),
+            **times,
+            **kinematics,
         )
 
     def paper_config(self, paper: str) -> PaperConfig | None:
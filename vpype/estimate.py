@@ -0,0 +1,172 @@
+"""Estimation of the time needed to plot a document."""
+
+from __future__ import annotations
+
+import dataclasses
+
+import numpy as np
+
+from .config import PlotterConfig
+from .model import Document, LineCollection
+
+# REMINDER: anything added here must be added to docs/api.rst
+__all__ = ["PlotTime", "estimate_plot_time"]
+
+
+@dataclasses.dataclass(frozen=True)
+class PlotTime:
+    """Breakdown of an estimated plot time (all values are in seconds)."""
+
+    pen_down: float = 0.0  #: time spent drawing
+    pen_up: float = 0.0  #: time spent travelling with the pen up
+    pen_lift: float = 0.0  #: time spent raising and lowering the pen
+    pen_switch: float = 0.0  #: time spent changing pen
+
+    @property
+    def total(self) -> float:
+        """Total plot time."""
+        return self.pen_down + self.pen_up + self.pen_lift + self.pen_switch
+
+    def __add__(self, other: PlotTime) -> PlotTime:
+        return PlotTime(
+            pen_down=self.pen_down + other.pen_down,
+            pen_up=self.pen_up + other.pen_up,
+            pen_lift=self.pen_lift + other.pen_lift,
+            pen_switch=self.pen_switch + other.pen_switch,
+        )
+
+
+def _move_times(
+    lengths: np.ndarray,
+    entry_sq: np.ndarray,
+    exit_sq: np.ndarray,
+    speed: float,
+    acceleration: float,
+) -> np.ndarray:
+    """Compute the time of straight moves with a trapezoidal velocity profile.
+
+    The entry and exit speeds (provided squared) must be reachable from one another within
+    the move's length.
+    """
+
+    if not np.isfinite(acceleration):
+        return lengths / speed
+
+    entry, exit_ = np.sqrt(entry_sq), np.sqrt(exit_sq)
+
+    # the peak speed is reached where the acceleration and deceleration phases meet, unless
+    # the maximum speed is reached first, in which case there is a cruise phase
+    peak_sq = 0.5 * (entry_sq + exit_sq) + acceleration * lengths
+    triangle = (2 * np.sqrt(peak_sq) - entry - exit_) / acceleration
+    cruise_length = lengths - (2 * speed**2 - entry_sq - exit_sq) / (2 * acceleration)
+    trapezoid = (2 * speed - entry - exit_) / acceleration + cruise_length / speed
+    return np.where(peak_sq <= speed**2, triangle, trapezoid)
+
+
+def _pen_down_time(lines: LineCollection, speed: float, acceleration: float) -> float:
+    """Compute the time needed to draw the lines.
+
+    The speed is limited by the acceleration along each line, which starts and ends at rest,
+    and at each vertex by the turn angle: the speed is not limited for straight continuations,
+    and proportionally to the cosine of the turn angle otherwise, down to zero for turns of
+    90 degrees or more.
+    """
+
+    points, offsets = lines.as_arrays()
+    if len(points) == 0:
+        return 0.0
+
+    # segment i joins points i and i + 1, and has zero length across line boundaries
+    vectors = np.diff(points)
+    vectors[offsets[1:-1] - 1] = 0
+    lengths = np.abs(vectors)
+    if not np.isfinite(acceleration):
+        return float(lengths.sum() / speed)
+
+    # squared speed limit at each vertex
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cos = (vectors[:-1].conj() * vectors[1:]).real / (lengths[:-1] * lengths[1:])
+    limit_sq = np.empty(len(points))
+    limit_sq[1:-1] = (speed * np.clip(np.nan_to_num(cos, nan=1.0), 0.0, 1.0)) ** 2
+    limit_sq[offsets[:-1]] = 0.0
+    limit_sq[offsets[1:] - 1] = 0.0
+
+    # The reachable squared speed at vertex i is min(limit_sq[i], reachable[i - 1] + 2 * a *
+    # lengths[i - 1]) when accelerating forward, which expands to a cumulative minimum. The
+    # same applies backward for the deceleration.
+    reach = np.zeros(len(points))
+    np.cumsum(2 * acceleration * lengths, out=reach[1:])
+    forward = reach + np.minimum.accumulate(limit_sq - reach)
+    reach = reach[-1] - reach
+    backward = reach + np.minimum.accumulate((limit_sq - reach)[::-1])[::-1]
+    speed_sq = np.minimum(forward, backward).clip(0.0, speed**2)
+
+    return float(_move_times(lengths, speed_sq[:-1], speed_sq[1:], speed, acceleration).sum())
+
+
+def estimate_plot_time(
+    document: Document, profile: PlotterConfig | None = None
+) -> dict[int, PlotTime]:
+    """Estimate the time needed to plot a document.
+
+    Layers are plotted in order of their layer ID, starting from the origin, and their lines
+    in their order of appearance. All moves follow a trapezoidal velocity profile, with
+    the kinematics defined by ``profile``, i.e. the plotter's acceleration, pen-down speed and
+    pen-up speed (see :class:`PlotterConfig`). Pen-up moves start and end at rest. Lines also
+    start and end at rest, and the drawing speed at each vertex is limited proportionally to
+    the cosine of the turn angle, down to zero for turns of 90 degrees or more. The
+    computation is vectorized over all the segments of each layer. The time to raise and
+    lower the pen is accounted for each line, and the time to change pen for each layer whose
+    pen differs from the previous layer's (layer ``i`` uses pen ``1 + (i - 1) % pen_count``,
+    as for :func:`write_hpgl`).
+
+    If ``profile`` is not provided, the default values of :class:`PlotterConfig` are used, and
+    each layer is considered to use a different pen.
+
+    Args:
+        document: document to estimate
+        profile: plotter configuration providing the kinematics
+
+    Returns:
+        dictionary mapping each layer ID to its :class:`PlotTime` (the travel to a layer's
+        first line and the pen change, if any, are accounted to that layer)
+    """
+
+    if profile is None:
+        profile = PlotterConfig(
+            name="default", paper_configs=[], plotter_unit_length=1.0, pen_count=0
+        )
+
+    def pen(layer_id: int) -> int:
+        return layer_id if profile.pen_count <= 0 else (layer_id - 1) % profile.pen_count
+
+    times = {}
+    position = 0j
+    current_pen: int | None = None
+    for layer_id in sorted(document.layers):
+        lines = document.layers[layer_id]
+        if len(lines) == 0:
+            times[layer_id] = PlotTime()
+            continue
+
+        starts, ends = lines.line_starts(), lines.line_ends()
+        pen_up_lengths = np.abs(starts - np.concatenate([[position], ends[:-1]]))
+        zero = np.zeros(len(lines))
+
+        times[layer_id] = PlotTime(
+            pen_down=_pen_down_time(lines, profile.pen_down_speed, profile.acceleration),
+            pen_up=float(
+                _move_times(
+                    pen_up_lengths, zero, zero, profile.pen_up_speed, profile.acceleration
+                ).sum()
+            ),
+            pen_lift=2 * len(lines) * profile.pen_lift_time,
+            pen_switch=(
+                profile.pen_switch_time
+                if current_pen is not None and pen(layer_id) != current_pen
+                else 0.0
+            ),
+        )
+        position, current_pen = ends[-1], pen(layer_id)
+
+    return times
@@ -169,6 +169,161 @@ def crop(line: np.ndarray, x1: float, y1: float, x2: float, y2: float) -> list[n
     return _crop_half_plane_mult(line_list, y2, axis=1, keep_smaller=True)
 
 
+def _gather_ranges(
+    points: np.ndarray, starts: np.ndarray, stops: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Gather the ``points[starts[i]:stops[i]]`` ranges into a packed buffer.
+
+    Returns:
+        tuple (points, offsets) of the packed ranges
+    """
+    counts = stops - starts
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    idx = np.arange(offsets[-1]) + np.repeat(starts - offsets[:-1], counts)
+    return points[idx], offsets
+
+
+def _interpolate_crop_packed(
+    start: np.ndarray, stop: np.ndarray, loc: float, axis: int
+) -> np.ndarray:
+    """Vectorized version of :func:`_interpolate_crop`."""
+
+    start_dim, stop_dim = (start.real, stop.real) if axis == 0 else (start.imag, stop.imag)
+    r = (loc - start_dim) / (stop_dim - start_dim)
+    return np.where(r < 0.5, start + (stop - start) * r, stop - (stop - start) * (1.0 - r))
+
+
+def _crop_half_plane_packed(
+    points: np.ndarray,
+    offsets: np.ndarray,
+    line_ids: np.ndarray,
+    loc: float,
+    axis: int,
+    keep_smaller: bool,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Vectorized version of :func:`crop_half_plane` operating on packed lines.
+
+    Each line's streaks of kept points are extracted at once, with the interpolated entry and
+    exit points added where the line crosses ``loc``. The output is identical to applying
+    :func:`crop_half_plane` to each line in turn.
+
+    Returns:
+        tuple (points, offsets, line_ids) where ``line_ids`` maps each output line to its input
+        line's ID
+    """
+
+    n = len(points)
+    test_dim = points.real if axis == 0 else points.imag
+    outside = test_dim > loc if keep_smaller else test_dim < loc
+    inside = ~outside
+
+    lengths = np.diff(offsets)
+    nonempty = lengths > 0
+    is_first = np.zeros(n, dtype=bool)
+    is_first[offsets[:-1][nonempty]] = True
+    is_last = np.zeros(n, dtype=bool)
+    is_last[offsets[1:][nonempty] - 1] = True
+
+    # streaks of kept points
+    (starts,) = np.nonzero(inside & (is_first | np.roll(outside, 1)))
+    (ends,) = np.nonzero(inside & (is_last | np.roll(outside, -1)))
+    has_entry = ~is_first[starts]
+    has_exit = ~is_last[ends]
+    counts = ends - starts + 1
+
+    out_offsets = np.zeros(len(starts) + 1, dtype=np.int64)
+    np.cumsum(counts + has_entry + has_exit, out=out_offsets[1:])
+    out = np.empty(out_offsets[-1], dtype=points.dtype)
+
+    kept, kept_offsets = _gather_ranges(points, starts, ends + 1)
+    out[
+        np.arange(len(kept))
+        + np.repeat(out_offsets[:-1] + has_entry - kept_offsets[:-1], counts)
+    ] = kept
+    entry_idx = starts[has_entry]
+    out[out_offsets[:-1][has_entry]] = _interpolate_crop_packed(
+        points[entry_idx - 1], points[entry_idx], loc, axis
+    )
+    exit_idx = ends[has_exit]
+    out[out_offsets[1:][has_exit] - 1] = _interpolate_crop_packed(
+        points[exit_idx], points[exit_idx + 1], loc, axis
+    )
+
+    # check cases where coordinate lie on threshold (uncut lines are left untouched)
+    cut = has_entry | has_exit
+    first = out_offsets[:-1]
+    last = out_offsets[1:] - 1
+    trim_start = cut & (out[first] == out[np.minimum(first + 1, last)])
+    trim_stop = cut & (out[last] == out[np.maximum(last - 1, first)])
+    sub_starts = first + trim_start
+    sub_stops = last + 1 - trim_stop
+    keep = ~cut | (sub_stops >= sub_starts + 2)
+
+    line_index = np.repeat(np.arange(len(lengths)), lengths)
+    out, out_offsets = _gather_ranges(out, sub_starts[keep], sub_stops[keep])
+    return out, out_offsets, line_ids[line_index[starts[keep]]]
+
+
+def _crop_packed(
+    points: np.ndarray, offsets: np.ndarray, x1: float, y1: float, x2: float, y2: float
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Crop packed lines to a rectangular area.
+
+    Lines are first classified using their bounding box. Lines fully inside the crop area are
+    reported as is, lines fully outside are discarded, and only lines crossing the crop area
+    boundary are actually cropped. The result is identical to applying :func:`crop` to each
+    line in turn.
+
+    Args:
+        points: packed points of all lines
+        offsets: offset array such that line ``i`` is ``points[offsets[i]:offsets[i + 1]]``
+        x1: left coordinate of the crop area
+        y1: bottom coordinate of the crop area
+        x2: right coordinate of the crop area
+        y2: top coordinate of the crop area
+
+    Returns:
+        tuple (inside, points, offsets, line_ids), where ``inside`` contains the indices of
+        the lines fully inside the crop area, and (points, offsets) are the packed lines
+        resulting from cropping the crossing lines, ``line_ids`` being the index of the source
+        line of each of them
+    """
+
+    lengths = np.diff(offsets)
+    nonempty = lengths > 0
+    x_min = np.full(len(lengths), np.inf)
+    x_max = np.full(len(lengths), -np.inf)
+    y_min = np.full(len(lengths), np.inf)
+    y_max = np.full(len(lengths), -np.inf)
+    if np.any(nonempty):
+        starts = offsets[:-1][nonempty]
+        x = points.real[: offsets[-1]]
+        y = points.imag[: offsets[-1]]
+        x_min[nonempty] = np.minimum.reduceat(x, starts)
+        x_max[nonempty] = np.maximum.reduceat(x, starts)
+        y_min[nonempty] = np.minimum.reduceat(y, starts)
+        y_max[nonempty] = np.maximum.reduceat(y, starts)
+
+    inside = (x_min >= x1) & (x_max <= x2) & (y_min >= y1) & (y_max <= y2)
+    outside = (x_max < x1) | (x_min > x2) | (y_max < y1) | (y_min > y2)
+    (crossing,) = np.nonzero(~inside & ~outside)
+
+    lines, line_offsets = _gather_ranges(points, offsets[:-1][crossing], offsets[1:][crossing])
+    line_ids = crossing
+    for loc, axis, keep_smaller in (
+        (x1, 0, False),
+        (x2, 0, True),
+        (y1, 1, False),
+        (y2, 1, True),
+    ):
+        lines, line_offsets, line_ids = _crop_half_plane_packed(
+            lines, line_offsets, line_ids, loc, axis, keep_smaller
+        )
+
+    return np.nonzero(inside)[0], lines, line_offsets, line_ids
+
+
 def reloop(line: np.ndarray, loc: int | None = None) -> np.ndarray:
     """Change the seam of a closed path. Closed-ness is not checked. Beginning and end points
     are averaged to compute a new point. A new seam location can be provided or will be chosen
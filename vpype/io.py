@@ -6,23 +6,33 @@ import collections
 import copy
 import dataclasses
 import datetime
+import io
+import itertools
+import json
+import logging
 import math
+import os
 import pathlib
 import re
-from collections.abc import Iterable, Iterator
-from typing import Any, TextIO, Union, cast
+import stat
+import struct
+import tempfile
+import warnings
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any, BinaryIO, TextIO, Union, cast
 from xml.etree import ElementTree
 
 import click
 import numpy as np
+import shapely
 import svgelements
 import svgwrite
 import svgwrite.base
 from multiprocess import Pool
-from shapely.geometry import LineString
 from svgwrite.extensions import Inkscape
 
 from .config import PaperConfig, PlotterConfig, config_manager
+from .geometry import _gather_ranges
 from .metadata import (
     METADATA_DEFAULT_COLOR_SCHEME,
     METADATA_FIELD_COLOR,
@@ -39,51 +49,15 @@ from .utils import UNITS
 __all__ = [
     "read_svg",
     "read_multilayer_svg",
+    "iter_multilayer_svg",
     "read_svg_by_attributes",
     "write_svg",
     "write_hpgl",
+    "read_vpype",
+    "write_vpype",
 ]
 
 
-class _ComplexStack:
-    """Complex number stack implemented with a numpy array"""
-
-    def __init__(self):
-        self._alloc = 100
-        self._stack = np.empty(shape=self._alloc, dtype=complex)
-        self._len = 0
-
-    def __len__(self) -> int:
-        return self._len
-
-    def _realloc(self, min_free: int = 1) -> None:
-        self._alloc = max(self._alloc * 2, self._len + min_free)
-        # noinspection PyTypeChecker
-        self._stack.resize(self._alloc, refcheck=False)
-
-    def append(self, c: complex) -> None:
-        if self._len == self._alloc:
-            self._realloc()
-        self._stack[self._len] = c
-        self._len += 1
-
-    def extend(self, a: np.ndarray) -> None:
-        len_a = len(a)
-        if self._len + len_a > self._alloc:
-            self._realloc(len_a)
-        self._stack[self._len : self._len + len_a] = a
-        self._len += len_a
-
-    def ends_with(self, c: complex) -> bool:
-        return self._stack[self._len - 1] == c if self._len > 0 else False
-
-    def get(self) -> np.ndarray:
-        self._alloc = self._len
-        # noinspection PyTypeChecker
-        self._stack.resize(self._alloc, refcheck=False)
-        return self._stack
-
-
 _PathType = Union[  # noqa: UP007
     # for actual paths and shapes transformed into paths
     svgelements.Path,
@@ -194,10 +168,23 @@ def _element_to_paths(elem: svgelements.SVGElement) -> _PathType | None:
     return None
 
 
+def _element_to_placeholder(elem: svgelements.SVGElement) -> svgelements.Shape | None:
+    """Return the element if it is a placeholder of a simple SVG's skeleton (see
+    :func:`_simplify_svg`), or None if it should be ignored.
+    """
+    if isinstance(elem, svgelements.Shape) and _SIMPLE_SVG_KEY_ATTRIBUTE in elem.values:
+        return elem
+    return None
+
+
 def _extract_paths(
-    group: svgelements.Group, recursive
-) -> tuple[_PathListType, dict[str, Any] | None]:
-    """Extract everything from the provided SVG group."""
+    group: svgelements.Group, recursive, shapes: _SimpleShapes | None = None
+) -> tuple[_PathListType | _PackedPaths, dict[str, Any] | None]:
+    """Extract everything from the provided SVG group.
+
+    If ``shapes`` is provided, the group belongs to the skeleton of a simple SVG, and the
+    paths are gathered from its shapes (see :func:`_simplify_svg`).
+    """
 
     if recursive:
         everything = group.select()
@@ -212,7 +199,7 @@ def _extract_paths(
         ):
             continue
 
-        path = _element_to_paths(elem)
+        path = _element_to_paths(elem) if shapes is None else _element_to_placeholder(elem)
         if path is None:
             continue
         else:
@@ -221,12 +208,16 @@ def _extract_paths(
         # apply union on metadata
         metadata = _merge_metadata(metadata, _extract_metadata_from_element(elem))
 
+    if shapes is not None:
+        return shapes.select(paths), metadata
     return paths, metadata
 
 
 def _extract_paths_by_attributes(
-    group: svgelements.Group, attributes: Iterable[str]
-) -> list[tuple[_PathListType, dict[str, Any] | None]]:
+    group: svgelements.Group,
+    attributes: Iterable[str],
+    shapes: _SimpleShapes | None = None,
+) -> list[tuple[_PathListType | _PackedPaths, dict[str, Any] | None]]:
     """Extract everything from the provided SVG group, grouped by the specified attributes.
 
     The paths are grouped by unique combinations of the provided attributes.
@@ -234,6 +225,8 @@ def _extract_paths_by_attributes(
     Args:
         group: SVG group from which to extract paths
         attributes: attributes by which to group paths
+        shapes: if provided, the group belongs to the skeleton of a simple SVG, and the paths
+            are gathered from its shapes (see :func:`_simplify_svg`)
 
     Returns:
         list of tuple containing the list of paths and the associated metadata
@@ -256,7 +249,7 @@ def _extract_paths_by_attributes(
 
         key = tuple(elem.values.get(attr, None) for attr in attributes)
 
-        path = _element_to_paths(elem)
+        path = _element_to_paths(elem) if shapes is None else _element_to_placeholder(elem)
         if path is None:
             continue
         else:
@@ -267,15 +260,569 @@ def _extract_paths_by_attributes(
             results[key].metadata, _extract_metadata_from_element(elem)
         )
 
-    return [(desc.paths, desc.metadata) for desc in results.values()]
+    return [
+        (desc.paths if shapes is None else shapes.select(desc.paths), desc.metadata)
+        for desc in results.values()
+    ]
+
+
+# Paths are packed into arrays of segments before being flattened, such that batches of paths
+# can be cheaply shipped to worker processes. Each segment has a kind and up to
+# _SEGMENT_PARAM_COUNT complex parameters: the end point for moves, lines and polyline points,
+# the start, control(s) and end points for Bézier curves, and the start, end, center, prx and
+# pry points, and the sweep, for arcs (see :class:`svgelements.Arc`).
+_SEGMENT_MOVE = 0
+_SEGMENT_LINE = 1
+_SEGMENT_POLYLINE_START = 2
+_SEGMENT_POLYLINE_POINT = 3
+_SEGMENT_QUADRATIC = 4
+_SEGMENT_CUBIC = 5
+_SEGMENT_ARC = 6
+_SEGMENT_PARAM_COUNT = 6
+
+# minimum number of curved segments per batch processed by a worker
+_MIN_BATCH_CURVE_COUNT = 64
+
+
+@dataclasses.dataclass
+class _PackedPaths:
+    """Paths packed as segment arrays.
+
+    Path ``i`` is made of segments ``path_offsets[i]`` to ``path_offsets[i + 1]``.
+    """
+
+    kinds: np.ndarray
+    params: np.ndarray
+    path_offsets: np.ndarray
+
+    def batch(self, start: int, stop: int) -> _PackedPaths:
+        """Extract paths ``start`` to ``stop``."""
+        first, last = self.path_offsets[start], self.path_offsets[stop]
+        return _PackedPaths(
+            self.kinds[first:last],
+            self.params[first:last],
+            self.path_offsets[start : stop + 1] - first,
+        )
+
+
+def _pack_segment(seg: svgelements.PathSegment) -> tuple[int, tuple]:
+    # handle cases of zero radius Arc
+    if isinstance(seg, svgelements.Arc) and (seg.rx == 0 or seg.ry == 0):
+        return _SEGMENT_LINE, (complex(seg.start), complex(seg.end))
+    elif isinstance(seg, svgelements.Move):
+        return _SEGMENT_MOVE, (complex(seg.end),)
+    elif isinstance(seg, svgelements.Line | svgelements.Close):
+        return _SEGMENT_LINE, (complex(seg.start), complex(seg.end))
+    elif isinstance(seg, svgelements.QuadraticBezier):
+        return _SEGMENT_QUADRATIC, (
+            complex(seg.start),
+            complex(seg.control),
+            complex(seg.end),
+        )
+    elif isinstance(seg, svgelements.CubicBezier):
+        return _SEGMENT_CUBIC, (
+            complex(seg.start),
+            complex(seg.control1),
+            complex(seg.control2),
+            complex(seg.end),
+        )
+    elif isinstance(seg, svgelements.Arc):
+        return _SEGMENT_ARC, (
+            complex(seg.start),
+            complex(seg.end),
+            complex(seg.center),
+            complex(seg.prx),
+            complex(seg.pry),
+            seg.sweep,
+        )
+    else:
+        raise TypeError(f"unsupported path segment {type(seg).__name__}")
+
+
+def _pack_paths(paths: _PathListType) -> _PackedPaths:
+    """Pack paths into segment arrays."""
+
+    kinds: list[int] = []
+    params: list[tuple] = []
+    polylines: list[tuple[int, np.ndarray]] = []
+    path_offsets = [0]
+    for path in paths:
+        for seg in path:
+            if isinstance(seg, svgelements.Polygon | svgelements.Polyline):
+                # polyline points are inserted in bulk below
+                points = np.array(seg.points, dtype=float).view(dtype=complex).reshape(-1)
+                polylines.append((len(kinds), points))
+                kinds.append(_SEGMENT_POLYLINE_START)
+                params.append(())
+            else:
+                kind, param = _pack_segment(seg)
+                kinds.append(kind)
+                params.append(param)
+        path_offsets.append(len(kinds))
+
+    kind_arr = np.array(kinds, dtype=np.int8)
+    param_arr = np.zeros((len(kinds), _SEGMENT_PARAM_COUNT), dtype=complex)
+    for kind in (
+        _SEGMENT_MOVE,
+        _SEGMENT_LINE,
+        _SEGMENT_QUADRATIC,
+        _SEGMENT_CUBIC,
+        _SEGMENT_ARC,
+    ):
+        (idx,) = np.nonzero(kind_arr == kind)
+        if len(idx) > 0:
+            values = np.array([params[i] for i in idx], dtype=complex)
+            param_arr[idx, : values.shape[1]] = values
+    offset_arr = np.array(path_offsets, dtype=np.int64)
+
+    if polylines:
+        # each polyline segment expands to its points
+        counts = np.ones(len(kinds), dtype=np.int64)
+        for i, points in polylines:
+            counts[i] = len(points)
+        starts = np.cumsum(counts) - counts
+        kind_arr = np.repeat(kind_arr, counts)
+        param_arr = np.repeat(param_arr, counts, axis=0)
+        for i, points in polylines:
+            kind_arr[starts[i] + 1 : starts[i] + len(points)] = _SEGMENT_POLYLINE_POINT
+            param_arr[starts[i] : starts[i] + len(points), 0] = points
+        offset_arr = np.concatenate([starts, [len(kind_arr)]])[offset_arr]
+
+    return _PackedPaths(kind_arr, param_arr, offset_arr)
+
+
+# Curve lengths are estimated with a composite Gauss-Legendre quadrature of the curves'
+# derivative norm, over _LENGTH_INTERVAL_COUNT sub-intervals of [0, 1].
+_LENGTH_INTERVAL_COUNT = 16
+_legendre_nodes, _legendre_weights = np.polynomial.legendre.leggauss(8)
+_LENGTH_T = (
+    (_legendre_nodes + 1) / 2 + np.arange(_LENGTH_INTERVAL_COUNT)[:, np.newaxis]
+).reshape(-1) / _LENGTH_INTERVAL_COUNT
+_LENGTH_WEIGHTS = np.tile(_legendre_weights, _LENGTH_INTERVAL_COUNT) / (
+    2 * _LENGTH_INTERVAL_COUNT
+)
+
+# index of the end point in the packed parameters of each kind of curve
+_CURVE_END_PARAM = np.array([0, 0, 0, 0, 2, 3, 1])
+
+# maximum number of curve points evaluated at once, to bound the memory usage
+_CURVE_BLOCK_SIZE = 1 << 18
+
+
+def _arc_frames(params: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Compute the axes and start parameter of packed arcs.
+
+    As for :class:`svgelements.Arc`, the points of an arc are ``center + u * cos(t) + v *
+    sin(t)``, for ``t`` from ``start_t`` to ``start_t + sweep``, with ``u`` and ``v`` the
+    ellipse's semi-axes.
+
+    Returns:
+        tuple (u, v, start_t)
+    """
+    start, center, prx, pry = params[:, 0], params[:, 2], params[:, 3], params[:, 4]
+    u = prx - center
+    rx, ry = np.abs(u), np.abs(pry - center)
+    v = 1j * u * (ry / rx)
+    local_start = (start - center) * u.conj() / rx
+    return u, v, np.angle(local_start.real / rx + 1j * local_start.imag / ry)
+
+
+def _curve_derivatives(kinds: np.ndarray, params: np.ndarray, t: np.ndarray) -> np.ndarray:
+    """Evaluate the derivative of packed curves at the provided parameters.
+
+    Args:
+        kinds: kind of each curve
+        params: packed parameters of each curve
+        t: parameter at which to evaluate each curve's derivative
+
+    Returns:
+        derivatives
+    """
+
+    result = np.empty(len(kinds), dtype=complex)
+    s = 1 - t
+
+    (idx,) = np.nonzero(kinds == _SEGMENT_QUADRATIC)
+    p, ti, si = params[idx], t[idx], s[idx]
+    result[idx] = 2 * si * (p[:, 1] - p[:, 0]) + 2 * ti * (p[:, 2] - p[:, 1])
+
+    (idx,) = np.nonzero(kinds == _SEGMENT_CUBIC)
+    p, ti, si = params[idx], t[idx], s[idx]
+    result[idx] = (
+        3 * si * si * (p[:, 1] - p[:, 0])
+        + 6 * si * ti * (p[:, 2] - p[:, 1])
+        + 3 * ti * ti * (p[:, 3] - p[:, 2])
+    )
+
+    (idx,) = np.nonzero(kinds == _SEGMENT_ARC)
+    if len(idx) > 0:
+        p = params[idx]
+        u, v, start_t = _arc_frames(p)
+        angle = start_t + p[:, 5].real * t[idx]
+        result[idx] = p[:, 5].real * (v * np.cos(angle) - u * np.sin(angle))
+
+    return result
+
+
+def _point_blocks(counts: np.ndarray) -> Iterator[tuple[int, int]]:
+    """Split items into consecutive blocks of about _CURVE_BLOCK_SIZE points.
+
+    Returns:
+        iterator over the (first, last) item indices of each block
+    """
+
+    if len(counts) == 0:
+        return
+
+    ends = np.cumsum(counts)
+    bounds = np.unique(
+        np.searchsorted(ends, np.arange(0, ends[-1], _CURVE_BLOCK_SIZE), side="right")
+    ).tolist()
+    yield from zip(bounds, bounds[1:] + [len(counts)])
+
+
+def _curve_interval_lengths(kinds: np.ndarray, params: np.ndarray) -> np.ndarray:
+    """Estimate the length of packed curves over each of their length quadrature intervals.
+
+    Returns:
+        array of shape (len(kinds), _LENGTH_INTERVAL_COUNT) of lengths
+    """
+
+    node_count = len(_LENGTH_T)
+    lengths = np.empty((len(kinds), _LENGTH_INTERVAL_COUNT))
+    for first, last in _point_blocks(np.full(len(kinds), node_count)):
+        speeds = np.abs(
+            _curve_derivatives(
+                np.repeat(kinds[first:last], node_count),
+                np.repeat(params[first:last], node_count, axis=0),
+                np.tile(_LENGTH_T, last - first),
+            )
+        )
+        lengths[first:last] = (
+            (speeds * np.tile(_LENGTH_WEIGHTS, last - first))
+            .reshape(-1, _LENGTH_INTERVAL_COUNT, len(_legendre_nodes))
+            .sum(axis=2)
+        )
+    return lengths
+
+
+def _curve_max_second_derivatives(kinds: np.ndarray, params: np.ndarray) -> np.ndarray:
+    """Bound the second derivative's norm of packed curves over each of their length
+    quadrature intervals.
+
+    The bound is exact for Bézier curves, whose second derivative is linear, and uses the
+    ellipse's major semi-axis for arcs.
+
+    Returns:
+        array of shape (len(kinds), _LENGTH_INTERVAL_COUNT) of bounds
+    """
+
+    bounds = np.empty((len(kinds), _LENGTH_INTERVAL_COUNT))
+    p = params.T
+    t = np.linspace(0, 1, _LENGTH_INTERVAL_COUNT + 1)
+
+    idx = kinds == _SEGMENT_QUADRATIC
+    bounds[idx] = 2 * np.abs(p[0, idx] - 2 * p[1, idx] + p[2, idx])[:, np.newaxis]
+
+    idx = kinds == _SEGMENT_CUBIC
+    a = (p[0, idx] - 2 * p[1, idx] + p[2, idx])[:, np.newaxis]
+    b = (p[1, idx] - 2 * p[2, idx] + p[3, idx])[:, np.newaxis]
+    values = 6 * np.abs((1 - t) * a + t * b)
+    bounds[idx] = np.maximum(values[:, :-1], values[:, 1:])
+
+    idx = kinds == _SEGMENT_ARC
+    u, v, _ = _arc_frames(params[idx])
+    bounds[idx] = (p[5, idx].real ** 2 * np.maximum(np.abs(u), np.abs(v)))[:, np.newaxis]
+
+    return bounds
+
+
+def _curve_max_speeds(
+    kinds: np.ndarray, params: np.ndarray, second_derivatives: np.ndarray
+) -> np.ndarray:
+    """Bound the first derivative's norm of packed curves over each of their length
+    quadrature intervals.
+
+    Over an interval of width ``h`` whose second derivative's norm is bounded by ``M``, the
+    speed is bounded by ``(s0 + s1 + h * M) / 2``, where ``s0`` and ``s1`` are the speeds at
+    the interval's boundaries.
+
+    Args:
+        kinds: kind of each curve
+        params: packed parameters of each curve
+        second_derivatives: bounds computed by :func:`_curve_max_second_derivatives`
+
+    Returns:
+        array of shape (len(kinds), _LENGTH_INTERVAL_COUNT) of bounds
+    """
+
+    node_count = _LENGTH_INTERVAL_COUNT + 1
+    t = np.linspace(0, 1, node_count)
+    speeds = np.empty((len(kinds), node_count))
+    for first, last in _point_blocks(np.full(len(kinds), node_count)):
+        speeds[first:last] = np.abs(
+            _curve_derivatives(
+                np.repeat(kinds[first:last], node_count),
+                np.repeat(params[first:last], node_count, axis=0),
+                np.tile(t, last - first),
+            )
+        ).reshape(-1, node_count)
+    return (speeds[:, :-1] + speeds[:, 1:] + second_derivatives / _LENGTH_INTERVAL_COUNT) / 2
+
+
+def _adaptive_parameters(
+    kinds: np.ndarray, params: np.ndarray, tolerance: float, max_length: float
+) -> tuple[np.ndarray, np.ndarray]:
+    """Compute the parameters of the points approximating packed curves within a tolerance.
+
+    Each of the curves' length quadrature intervals is split in regularly spaced steps, as
+    few as needed for the approximation to deviate by at most ``tolerance`` from the curve
+    (which, for a step ``h``, is bounded by ``h**2 / 8`` times the second derivative's norm)
+    and for the segments to be no longer than ``max_length`` (which is guaranteed if ``h``
+    times the speed is at most ``max_length``).
+
+    Returns:
+        tuple (counts, t) of the number of points of each curve and of the concatenated
+        parameters of all points
+    """
+
+    h = 1 / _LENGTH_INTERVAL_COUNT
+    second_derivatives = _curve_max_second_derivatives(kinds, params)
+    steps = np.maximum(
+        1,
+        np.maximum(
+            np.ceil(h * np.sqrt(second_derivatives / (8 * tolerance))),
+            np.ceil(h * _curve_max_speeds(kinds, params, second_derivatives) / max_length),
+        ),
+    ).astype(np.int64)
+
+    # regularly spaced parameters within each interval, and the end of each curve
+    interval_steps = steps.reshape(-1)
+    k = np.arange(interval_steps.sum()) - np.repeat(
+        np.cumsum(interval_steps) - interval_steps, interval_steps
+    )
+    t = h * (
+        np.repeat(np.tile(np.arange(_LENGTH_INTERVAL_COUNT), len(kinds)), interval_steps)
+        + k / np.repeat(interval_steps, interval_steps)
+    )
+    counts = steps.sum(axis=1) + 1
+    return counts, np.insert(t, np.cumsum(counts - 1), 1.0)
+
+
+def _sample_curves(
+    kinds: np.ndarray,
+    params: np.ndarray,
+    counts: np.ndarray,
+    out: np.ndarray,
+    out_starts: np.ndarray,
+    t: np.ndarray | None = None,
+) -> None:
+    """Sample packed curves at the provided or at regularly spaced parameters.
+
+    Curve ``i`` is sampled with ``counts[i]`` points, which are written in the ``out`` buffer
+    from index ``out_starts[i]``. If provided, ``t`` contains the concatenated parameters of
+    all points.
+    The first and last points are exactly the curve's endpoints. Bézier curves are evaluated
+    in power basis with Horner's method, using per-curve coefficients repeated for each
+    point.
+    """
+
+    p = params.T
+    coefficients = {
+        _SEGMENT_QUADRATIC: [p[0], 2 * (p[1] - p[0]), p[0] - 2 * p[1] + p[2]],
+        _SEGMENT_CUBIC: [
+            p[0],
+            3 * (p[1] - p[0]),
+            3 * (p[0] - 2 * p[1] + p[2]),
+            3 * (p[1] - p[2]) + p[3] - p[0],
+        ],
+    }
+    u, v, start_t = _arc_frames(params[kinds == _SEGMENT_ARC])
+    t_starts = np.cumsum(counts) - counts
+
+    for kind in (_SEGMENT_QUADRATIC, _SEGMENT_CUBIC, _SEGMENT_ARC):
+        (idx,) = np.nonzero(kinds == kind)
+        for first, last in _point_blocks(counts[idx]):
+            block = idx[first:last]
+            block_counts = counts[block]
+            block_starts = np.cumsum(block_counts) - block_counts
+            k = np.arange(block_counts.sum()) - np.repeat(block_starts, block_counts)
+            if t is None:
+                block_t = k / np.repeat(block_counts - 1, block_counts)
+            else:
+                block_t = t[np.repeat(t_starts[block], block_counts) + k]
+            positions = np.repeat(out_starts[block], block_counts) + k
+
+            if kind == _SEGMENT_ARC:
+                angle = np.repeat(start_t[first:last], block_counts) + block_t * np.repeat(
+                    params[block, 5].real, block_counts
+                )
+                out[positions] = (
+                    np.repeat(params[block, 2], block_counts)
+                    + np.repeat(u[first:last], block_counts) * np.cos(angle)
+                    + np.repeat(v[first:last], block_counts) * np.sin(angle)
+                )
+            else:
+                *lower, highest = coefficients[kind]
+                values = np.repeat(highest[block], block_counts)
+                for coefficient in reversed(lower):
+                    values *= block_t
+                    values += np.repeat(coefficient[block], block_counts)
+                out[positions] = values
+
+    out[out_starts] = params[:, 0]
+    out[out_starts + counts - 1] = params[np.arange(len(kinds)), _CURVE_END_PARAM[kinds]]
+
+
+def _flatten_packed_paths(
+    paths: _PackedPaths, quantization: float, simplify: bool, tolerance: float | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """Flatten packed paths.
+
+    All curved segments are approximated at once using vectorized operations: their length is
+    estimated, they are sampled with the required number of points (regularly, or adaptively
+    if ``tolerance`` is provided), and optionally simplified.
+    Each segment then contributes its points, except its first point if it duplicates the
+    current line's last point. Lines start at each move and at the beginning of each path.
+
+    This function is executed by worker processes when reading in parallel.
+
+    Returns:
+        tuple (points, offsets) of the lines obtained, packed as for
+        :meth:`LineCollection.from_arrays`
+    """
+
+    kinds, params = paths.kinds, paths.params
+    if len(kinds) == 0:
+        return np.empty(0, dtype=complex), np.zeros(1, dtype=np.int64)
+
+    # approximate curved elements with small segments (paths made of straight segments only
+    # may be packed with fewer parameters)
+    (curves,) = np.nonzero(kinds >= _SEGMENT_QUADRATIC)
+    curve_kinds, curve_params = kinds[curves], params[curves]
+    curve_t = None
+    if len(curves) == 0:
+        curve_counts = np.empty(0, dtype=np.int64)
+    elif tolerance is None:
+        curve_lengths = _curve_interval_lengths(curve_kinds, curve_params).sum(axis=1)
+        curve_counts = np.maximum(2, np.ceil(curve_lengths / quantization)).astype(np.int64)
+    else:
+        curve_counts, curve_t = _adaptive_parameters(
+            curve_kinds, curve_params, tolerance, quantization
+        )
+
+    curve_points = None
+    if simplify and len(curves) > 0:
+        curve_points = np.empty(curve_counts.sum(), dtype=complex)
+        curve_starts = np.cumsum(curve_counts) - curve_counts
+        _sample_curves(
+            curve_kinds, curve_params, curve_counts, curve_points, curve_starts, curve_t
+        )
+        geoms = shapely.simplify(
+            shapely.linestrings(
+                curve_points.real,
+                curve_points.imag,
+                indices=np.repeat(np.arange(len(curves)), curve_counts),
+            ),
+            tolerance=quantization,
+        )
+        coords, indices = shapely.get_coordinates(geoms, return_index=True)
+        curve_points = coords.view(dtype=complex).reshape(-1)
+        curve_counts = np.bincount(indices, minlength=len(curves))
+
+    # each segment contributes its candidate points to a common buffer
+    counts = np.ones(len(kinds), dtype=np.int64)
+    counts[kinds == _SEGMENT_LINE] = 2
+    counts[curves] = curve_counts
+    seg_ends = np.cumsum(counts)
+    seg_starts = seg_ends - counts
+    buffer = np.empty(seg_ends[-1], dtype=complex)
+
+    (idx,) = np.nonzero(kinds < _SEGMENT_QUADRATIC)
+    buffer[seg_starts[idx]] = params[idx, 0]
+    (lines,) = np.nonzero(kinds == _SEGMENT_LINE)
+    buffer[seg_starts[lines] + 1] = params[lines, 1]
+    if curve_points is None:
+        if len(curves) > 0:
+            _sample_curves(
+                curve_kinds, curve_params, curve_counts, buffer, seg_starts[curves], curve_t
+            )
+    else:
+        buffer[
+            np.repeat(
+                seg_starts[curves] - (np.cumsum(curve_counts) - curve_counts), curve_counts
+            )
+            + np.arange(len(curve_points))
+        ] = curve_points
+
+    # Lines start at moves and at the beginning of paths, and the other segments skip their
+    # first point if it is identical to the previous segment's last point. Zero-length line
+    # segments also skip their end point.
+    path_firsts = paths.path_offsets[:-1]
+    new_line = kinds == _SEGMENT_MOVE
+    new_line[path_firsts[path_firsts < len(kinds)]] = True
+    (idx,) = np.nonzero(~new_line & (kinds != _SEGMENT_POLYLINE_POINT))
+    idx = idx[buffer[seg_starts[idx]] == buffer[seg_ends[idx - 1] - 1]]
+    lines = lines[params[lines, 1] == params[lines, 0]]
+    keep = np.ones(len(buffer), dtype=bool)
+    keep[seg_starts[idx]] = False
+    keep[seg_starts[lines] + 1] = False
+
+    kept_counts = counts.copy()
+    kept_counts[idx] -= 1
+    kept_counts[lines] -= 1
+    offsets = np.zeros(int(new_line.sum()) + 1, dtype=np.int64)
+    line_counts = np.bincount(
+        np.cumsum(new_line) - 1, weights=kept_counts, minlength=len(offsets) - 1
+    )
+    np.cumsum(line_counts.astype(np.int64), out=offsets[1:])
+    return buffer[keep], offsets
+
+
+class _WorkerPool:
+    """Pool of worker processes used by a parallel read.
+
+    The underlying process pool is only created when first needed, reused for all the
+    layers of a read, and shut down when the read completes (the instance is a context
+    manager). No worker process thus outlives a read. If ``enabled`` is False, the paths are
+    never flattened in parallel.
+    """
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._pool: Any = None
+
+    def map(self, func: Callable, items: list) -> list:
+        if self._pool is None:
+            self._pool = Pool()
+        return self._pool.map(func, items)
+
+    def __enter__(self) -> _WorkerPool:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if self._pool is not None:
+            if exc_type is None:
+                self._pool.close()
+            else:
+                self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+
+def _flatten_packed_paths_star(
+    args: tuple[_PackedPaths, float, bool, float | None],
+) -> tuple[np.ndarray, np.ndarray]:
+    return _flatten_packed_paths(*args)
 
 
 def _flattened_paths_to_line_collection(
-    paths: _PathListType,
+    paths: _PathListType | _PackedPaths,
     quantization: float,
     simplify: bool,
-    parallel: bool,
+    pool: _WorkerPool,
     metadata: dict[str, Any] | None = None,
+    tolerance: float | None = None,
 ) -> LineCollection:
     """Convert a path list to a :class:`LineCollection`.
 
@@ -286,82 +833,59 @@ def _flattened_paths_to_line_collection(
     Note: group-level properties are not explicitly added to the metadata since they are
     propagated to enclosed elements by svgelements.
 
+    The paths are first packed into segment arrays. With multiprocessing, these arrays are
+    split into batches of paths with a balanced number of curved segments, which are
+    flattened by the worker processes of ``pool``. Multiprocessing is not used on single-CPU
+    machines or for too few curved segments, as its overhead would then outweigh its benefit.
+
     Args:
-        paths: paths to process
+        paths: paths to process, possibly already packed
         quantization: maximum length of linear elements to approximate curve paths
         simplify: should Shapely's simplify be run on curved elements after quantization
-        parallel: enable multiprocessing
+        pool: worker pool of the read, used if enabled
         metadata: if provided, metadata to include in the returned
             :class:`vpype.LineCollection` instance
+        tolerance: if provided, curves are approximated adaptively with this maximum
+            deviation, and ``quantization`` is used as maximum segment length
 
     Returns:
         new :class:`LineCollection` instance containing the converted geometries and the
         provided metadata
     """
 
-    def _process_path(path):
-        if len(path) == 0:
-            return []
-
-        result = []
-        point_stack = _ComplexStack()
-        for seg in path:
-            # handle cases of zero radius Arc
-            if isinstance(seg, svgelements.Arc) and (seg.rx == 0 or seg.ry == 0):
-                seg = svgelements.Line(start=seg.start, end=seg.end)
-
-            if isinstance(seg, svgelements.Move):
-                if len(point_stack) > 0:
-                    result.append(point_stack.get())
-                    point_stack = _ComplexStack()
-
-                point_stack.append(complex(seg.end))
-            elif isinstance(seg, svgelements.Line | svgelements.Close):
-                start = complex(seg.start)
-                end = complex(seg.end)
-                if not point_stack.ends_with(start):
-                    point_stack.append(start)
-                if end != start:
-                    point_stack.append(end)
-            elif isinstance(seg, svgelements.Polygon | svgelements.Polyline):
-                line = np.array(seg.points, dtype=float)
-                line = line.view(dtype=complex).reshape(len(line))
-                if point_stack.ends_with(line[0]):
-                    point_stack.extend(line[1:])
-                else:
-                    point_stack.extend(line)
-            else:
-                # This is a curved element that we approximate with small segments
-                step = max(2, int(math.ceil(seg.length() / quantization)))
-                line = seg.npoint(np.linspace(0, 1, step))
+    if tolerance is not None and tolerance <= 0:
+        raise ValueError("tolerance must be strictly positive")
 
-                if simplify:
-                    line = LineString(line).simplify(tolerance=quantization)
-                    line = np.array(line.coords, dtype=float)
+    packed = paths if isinstance(paths, _PackedPaths) else _pack_paths(paths)
 
-                line = line.view(dtype=complex).reshape(len(line))
+    # the paths are split in batches of similar number of curved segments
+    is_curve = packed.kinds >= _SEGMENT_QUADRATIC
+    curve_counts = np.concatenate([[0], np.cumsum(is_curve)])[packed.path_offsets]
+    cpu_count = os.cpu_count() or 1
+    batch_count = 1
+    if pool.enabled and cpu_count > 1:
+        batch_count = min(4 * cpu_count, int(curve_counts[-1]) // _MIN_BATCH_CURVE_COUNT)
 
-                if point_stack.ends_with(line[0]):
-                    point_stack.extend(line[1:])
-                else:
-                    point_stack.extend(line)
-
-        if len(point_stack) > 0:
-            result.append(point_stack.get())
-
-        return result
-
-    # benchmarking indicated that parallel processing only makes sense if simplify is used
-    if parallel:
-        with Pool() as p:
-            results = p.map(_process_path, paths)
+    if batch_count > 1:
+        bounds = np.searchsorted(
+            curve_counts, np.linspace(0, curve_counts[-1], batch_count + 1)[1:-1]
+        )
+        bounds = np.unique(np.concatenate([[0], bounds, [len(packed.path_offsets) - 1]]))
+        results = pool.map(
+            _flatten_packed_paths_star,
+            [
+                (packed.batch(start, stop), quantization, simplify, tolerance)
+                for start, stop in zip(bounds[:-1], bounds[1:])
+            ],
+        )
     else:
-        results = map(_process_path, paths)
+        results = [_flatten_packed_paths(packed, quantization, simplify, tolerance)]
 
-    lc = LineCollection(metadata=metadata)
-    for res in results:
-        lc.extend(res)
-    return lc
+    points = np.concatenate([points for points, _ in results])
+    line_counts = np.concatenate([np.diff(offsets) for _, offsets in results])
+    offsets = np.zeros(len(line_counts) + 1, dtype=np.int64)
+    np.cumsum(line_counts, out=offsets[1:])
+    return LineCollection.from_arrays(points, offsets, metadata=metadata)
 
 
 def _get_source(file: str | TextIO) -> pathlib.Path | None:
@@ -375,6 +899,450 @@ def _get_source(file: str | TextIO) -> pathlib.Path | None:
     return None
 
 
+_SVG_NAMESPACE = "{http://www.w3.org/2000/svg}"
+
+# XML whitespace, which separates numbers along with commas
+_SVG_WHITESPACE = " \t\n\r\f"
+
+# elements of simple SVGs which are copied verbatim to their skeleton
+_SIMPLE_SVG_COPIED_TAGS = frozenset({"defs", "metadata", "title", "desc", "style"})
+
+# geometry attributes of the shapes of simple SVGs, and of their placeholders
+_SIMPLE_SVG_SHAPE_ATTRIBUTES = {
+    "line": ("x1", "y1", "x2", "y2"),
+    "polyline": ("points",),
+    "polygon": ("points",),
+    "path": ("d",),
+}
+_SIMPLE_SVG_PLACEHOLDER_ATTRIBUTES = {
+    "line": {},
+    "polyline": {"points": "0,0"},
+    "polygon": {"points": "0,0"},
+    "path": {"d": "M0,0"},
+}
+
+# attribute identifying the shapes a placeholder stands for
+_SIMPLE_SVG_KEY_ATTRIBUTE = "vpype-shape-key"
+
+_SIMPLE_PATH_COMMAND_RE = re.compile(r"([MmLlHhVvZz])([^MmLlHhVvZz]*)")
+
+# bytes allowed in the numbers and separators of simple shapes
+_NUMBER_BYTES = np.zeros(256, dtype=bool)
+_NUMBER_BYTES[np.frombuffer(b"0123456789.eE+-," + _SVG_WHITESPACE.encode(), np.uint8)] = True
+
+
+def _parse_numbers(text: str) -> tuple[np.ndarray, np.ndarray] | None:
+    """Parse a string of numbers separated by whitespace.
+
+    The string is tokenized with vectorized operations and converted with a single call to
+    :func:`numpy.fromstring`. A token which is not a well-formed number either makes the
+    conversion fail or yields a different number of values than there are tokens, in which
+    case the string is rejected.
+
+    Returns:
+        tuple (values, token_starts), where token_starts is a boolean array marking the first
+        character of each token, or None if the string is not made of numbers only
+    """
+
+    data = np.frombuffer(text.encode(), dtype=np.uint8)
+    if len(data) != len(text) or not _NUMBER_BYTES[data].all():
+        return None
+
+    # tokens are separated by whitespace and commas
+    is_separator = data <= ord(" ")
+    is_separator |= data == ord(",")
+    token_starts = ~is_separator
+    token_starts[1:] &= is_separator[:-1]
+    token_count = np.count_nonzero(token_starts)
+    if token_count == 0:
+        return np.empty(0), token_starts
+
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", DeprecationWarning)
+            values = np.fromstring(text.replace(",", " "), sep=" ")
+    except (DeprecationWarning, ValueError):
+        return None
+    if len(values) != token_count:
+        return None
+
+    return values, token_starts
+
+
+def _complex_array(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    points = np.empty(x.shape, dtype=complex)
+    points.real = x
+    points.imag = y
+    return points
+
+
+def _parse_simple_path(d: str) -> tuple[np.ndarray, np.ndarray] | None:
+    """Parse the ``d`` attribute of a path made of straight segments.
+
+    Only the M, L, H, V and Z commands (and their relative counterparts) are supported.
+    Relative coordinates are accumulated in the same order as svgelements does.
+
+    Returns:
+        tuple (kinds, params) of the path's segments, packed as for :class:`_PackedPaths`
+        with two parameters, or None if the path is not supported
+    """
+
+    kinds: list[np.ndarray] = []
+    starts: list[np.ndarray] = []
+    ends: list[np.ndarray] = []
+    current: complex | None = None
+    subpath_start = 0j
+    position = len(d) - len(d.lstrip(_SVG_WHITESPACE))
+    for match in _SIMPLE_PATH_COMMAND_RE.finditer(d, position):
+        if match.start() != position:
+            return None
+        position = match.end()
+        command, args = match.groups()
+        parsed = _parse_numbers(args)
+        if parsed is None:
+            return None
+        values = parsed[0]
+
+        upper = command.upper()
+        if upper == "M":
+            if len(values) == 0 or len(values) % 2:
+                return None
+            points = values.view(dtype=complex)
+            if command == "m":
+                points = np.cumsum(np.concatenate([[current or 0j], points]))[1:]
+        elif current is None:
+            return None
+        elif upper == "Z":
+            if len(values) != 0:
+                return None
+            points = np.array([subpath_start])
+        elif upper == "L":
+            if len(values) == 0 or len(values) % 2:
+                return None
+            points = values.view(dtype=complex)
+            if command == "l":
+                points = np.cumsum(np.concatenate([[current], points]))[1:]
+        else:
+            if len(values) == 0:
+                return None
+            is_horizontal = upper == "H"
+            start_coord = current.real if is_horizontal else current.imag
+            if command.islower():
+                values = np.cumsum(np.concatenate([[start_coord], values]))[1:]
+            other = np.full(len(values), current.imag if is_horizontal else current.real)
+            points = (
+                _complex_array(values, other)
+                if is_horizontal
+                else _complex_array(other, values)
+            )
+
+        segment_kinds = np.full(len(points), _SEGMENT_LINE, dtype=np.int8)
+        if upper == "M":
+            # subsequent pairs are implicit line commands
+            segment_kinds[0] = _SEGMENT_MOVE
+            subpath_start = points[0]
+        kinds.append(segment_kinds)
+        starts.append(np.concatenate([[current or 0j], points[:-1]]))
+        ends.append(points)
+        current = complex(points[-1])
+
+    if position != len(d):
+        return None
+
+    if not kinds:
+        return np.empty(0, dtype=np.int8), np.empty((0, 2), dtype=complex)
+
+    # lines are packed as (start, end) and moves as (end,)
+    kind_arr = np.concatenate(kinds)
+    start_arr, end_arr = np.concatenate(starts), np.concatenate(ends)
+    is_line = kind_arr == _SEGMENT_LINE
+    params = np.zeros((len(kind_arr), 2), dtype=complex)
+    params[:, 0] = np.where(is_line, start_arr, end_arr)
+    params[is_line, 1] = end_arr[is_line]
+    return kind_arr, params
+
+
+@dataclasses.dataclass
+class _SimpleShapes:
+    """Geometry of the shapes of a simple SVG (see :func:`_simplify_svg`).
+
+    Shape ``i`` is path ``i`` of ``paths``, expressed in the shape's own coordinates, and is
+    represented by the placeholder whose key is ``keys[i]``. Being made of straight segments
+    only, its segments have two parameters.
+    """
+
+    keys: np.ndarray
+    paths: _PackedPaths
+
+    def select(self, placeholders: list[svgelements.Shape]) -> _PackedPaths:
+        """Gather the shapes represented by the provided placeholders.
+
+        The shapes are gathered in document order, and transformed by their placeholder's
+        transform, which svgelements computed from the shapes' attributes and ancestors.
+        """
+
+        matrices = {
+            int(elem.values[_SIMPLE_SVG_KEY_ATTRIBUTE]): svgelements.Matrix(
+                elem.values.get("transform", "")
+            )
+            for elem in placeholders
+        }
+        (shapes,) = np.nonzero(np.isin(self.keys, list(matrices)))
+        starts = self.paths.path_offsets[shapes]
+        stops = self.paths.path_offsets[shapes + 1]
+        kinds, path_offsets = _gather_ranges(self.paths.kinds, starts, stops)
+        params, _ = _gather_ranges(self.paths.params, starts, stops)
+
+        if not all(matrix.is_identity() for matrix in matrices.values()):
+            # same operations as svgelements' Matrix.point_in_matrix_space()
+            coefficients = np.zeros((max(matrices) + 1, 6))
+            for key, matrix in matrices.items():
+                coefficients[key] = (
+                    matrix.a,
+                    matrix.b,
+                    matrix.c,
+                    matrix.d,
+                    matrix.e,
+                    matrix.f,
+                )
+            a, b, c, d, e, f = np.repeat(
+                coefficients[self.keys[shapes]], stops - starts, axis=0
+            ).T[..., np.newaxis]
+            x, y = params.real, params.imag
+            params = _complex_array(x * a + y * c + e, x * b + y * d + f)
+
+        return _PackedPaths(kinds, params, path_offsets)
+
+
+def _svg_local_tag(elem: ElementTree.Element) -> str | None:
+    """Return the tag of an SVG element without namespace, or None for foreign elements."""
+
+    if elem.tag.startswith(_SVG_NAMESPACE):
+        return elem.tag[len(_SVG_NAMESPACE) :]
+    elif elem.tag.startswith("{"):
+        return None
+    else:
+        return elem.tag
+
+
+def _simplify_svg(
+    root: ElementTree.Element,
+) -> tuple[ElementTree.Element, _SimpleShapes] | None:
+    """Split a simple SVG into a skeleton and the geometry of its shapes.
+
+    An SVG is simple if it is made of groups and straight shapes only, i.e. lines,
+    polylines, polygons, and paths with M, L, H, V and Z commands, as written by
+    :func:`write_svg`. Its skeleton has the same structure, except that, in each group, the
+    shapes with identical attributes (other than their geometry) are replaced by a single
+    placeholder shape with a dummy geometry. Parsing the skeleton with svgelements thus
+    yields the layer structure, the metadata and the transforms of all shapes, at a fraction
+    of the cost, and the shapes' geometry is parsed with vectorized operations instead.
+
+    Returns:
+        tuple (skeleton, shapes), or None if the SVG is not simple
+    """
+
+    shape_keys: list[int] = []
+    shape_tags: list[str] = []
+    texts: list[str] = []
+    paths: list[tuple[np.ndarray, np.ndarray]] = []
+    placeholders: dict[tuple, int] = {}
+
+    def _add_children(elem: ElementTree.Element, skeleton: ElementTree.Element) -> bool:
+        for child in elem:
+            tag = _svg_local_tag(child)
+            if tag is None:
+                # svgelements renders the SVG descendants of foreign elements
+                if any(_svg_local_tag(e) is not None for e in child.iter()):
+                    return False
+                skeleton.append(child)
+            elif tag in _SIMPLE_SVG_COPIED_TAGS:
+                skeleton.append(child)
+            elif tag == "g":
+                group = ElementTree.SubElement(skeleton, child.tag, child.attrib)
+                if not _add_children(child, group):
+                    return False
+            elif tag in _SIMPLE_SVG_SHAPE_ATTRIBUTES:
+                if any(_svg_local_tag(e) not in ("title", "desc") for e in child):
+                    return False
+
+                # empty shapes are ignored by svgelements or by _element_to_paths()
+                geometry_attributes = _SIMPLE_SVG_SHAPE_ATTRIBUTES[tag]
+                if tag == "path":
+                    segments = _parse_simple_path(child.get("d", ""))
+                    if segments is None:
+                        return False
+                    if len(segments[0]) == 0:
+                        continue
+                    paths.append(segments)
+                elif tag == "line":
+                    texts.append(
+                        " ".join(child.get(attr, "0") for attr in geometry_attributes)
+                    )
+                else:
+                    points = child.get("points", "")
+                    if not points.strip(_SVG_WHITESPACE + ","):
+                        continue
+                    texts.append(points)
+
+                attributes = tuple(
+                    sorted(
+                        item
+                        for item in child.attrib.items()
+                        if item[0] not in geometry_attributes
+                    )
+                )
+                key = placeholders.get((id(skeleton), tag, attributes))
+                if key is None:
+                    key = placeholders[id(skeleton), tag, attributes] = len(placeholders)
+                    ElementTree.SubElement(
+                        skeleton,
+                        child.tag,
+                        {
+                            **dict(attributes),
+                            **_SIMPLE_SVG_PLACEHOLDER_ATTRIBUTES[tag],
+                            _SIMPLE_SVG_KEY_ATTRIBUTE: str(key),
+                        },
+                    )
+                shape_keys.append(key)
+                shape_tags.append(tag)
+            else:
+                return False
+
+        return True
+
+    if _svg_local_tag(root) != "svg":
+        return None
+    skeleton = ElementTree.Element(root.tag, root.attrib)
+    if not _add_children(root, skeleton):
+        return None
+
+    # the numbers of all lines, polylines and polygons are parsed at once
+    tags = np.array(shape_tags)
+    (text_shapes,) = np.nonzero(tags != "path")
+    text_tags = tags[text_shapes]
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts)) + 1
+    parsed = _parse_numbers(" ".join(texts) + " ")
+    if parsed is None:
+        return None
+    values, token_starts = parsed
+    text_bounds = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=text_bounds[1:])
+    token_counts = np.diff(np.searchsorted(np.flatnonzero(token_starts), text_bounds))
+    if np.any(token_counts % 2) or np.any(token_counts[text_tags == "line"] != 4):
+        return None
+    points = values.view(dtype=complex)
+    point_counts = token_counts // 2
+    point_starts = np.cumsum(point_counts) - point_counts
+
+    # shapes are packed as by _pack_paths(), with polylines and polygons starting with a move,
+    # polygons ending with a closing line, and lines made of a move and a line
+    (path_shapes,) = np.nonzero(tags == "path")
+    seg_counts = np.empty(len(tags), dtype=np.int64)
+    seg_counts[text_shapes] = (
+        point_counts + 1 - (text_tags == "line") + (text_tags == "polygon")
+    )
+    seg_counts[path_shapes] = [len(path_kinds) for path_kinds, _ in paths]
+    path_offsets = np.zeros(len(tags) + 1, dtype=np.int64)
+    np.cumsum(seg_counts, out=path_offsets[1:])
+    kinds = np.full(path_offsets[-1], _SEGMENT_POLYLINE_POINT, dtype=np.int8)
+    params = np.zeros((path_offsets[-1], 2), dtype=complex)
+
+    starts = path_offsets[text_shapes]
+    kinds[starts] = _SEGMENT_MOVE
+    params[starts, 0] = points[point_starts]
+
+    is_line = text_tags == "line"
+    kinds[starts[is_line] + 1] = _SEGMENT_LINE
+    params[starts[is_line] + 1, 0] = points[point_starts[is_line]]
+    params[starts[is_line] + 1, 1] = points[point_starts[is_line] + 1]
+
+    poly_starts, poly_point_starts = starts[~is_line], point_starts[~is_line]
+    poly_counts = point_counts[~is_line]
+    poly_points, poly_offsets = _gather_ranges(
+        points, poly_point_starts, poly_point_starts + poly_counts
+    )
+    kinds[poly_starts + 1] = _SEGMENT_POLYLINE_START
+    params[
+        np.repeat(poly_starts + 1 - poly_offsets[:-1], poly_counts)
+        + np.arange(len(poly_points)),
+        0,
+    ] = poly_points
+
+    is_polygon = text_tags[~is_line] == "polygon"
+    closes = poly_starts[is_polygon] + poly_counts[is_polygon] + 1
+    kinds[closes] = _SEGMENT_LINE
+    params[closes, 0] = points[poly_point_starts[is_polygon] + poly_counts[is_polygon] - 1]
+    params[closes, 1] = points[poly_point_starts[is_polygon]]
+
+    if paths:
+        path_counts = seg_counts[path_shapes]
+        idx = np.repeat(
+            path_offsets[path_shapes] - (np.cumsum(path_counts) - path_counts), path_counts
+        ) + np.arange(path_counts.sum())
+        kinds[idx] = np.concatenate([path_kinds for path_kinds, _ in paths])
+        params[idx] = np.concatenate([path_params for _, path_params in paths])
+
+    return skeleton, _SimpleShapes(
+        np.array(shape_keys, dtype=np.int64), _PackedPaths(kinds, params, path_offsets)
+    )
+
+
+def _parse_svg_element(
+    root: ElementTree.Element, default_width: float | None, default_height: float | None
+) -> tuple[svgelements.SVG, _SimpleShapes | None]:
+    """Parse an SVG XML tree with svgelements, using the skeleton of simple SVGs.
+
+    Returns:
+        tuple (svg, shapes), where shapes is the geometry of the placeholders of the parsed
+        skeleton, or None if the SVG is not simple
+    """
+
+    simple = _simplify_svg(root)
+    shapes = None
+    if simple is not None:
+        root, shapes = simple
+
+    svg = svgelements.SVG.parse(
+        io.BytesIO(ElementTree.tostring(root)), width=default_width, height=default_height
+    )
+    return svg, shapes
+
+
+def _parse_svg(
+    file: str | TextIO, default_width: float | None, default_height: float | None
+) -> tuple[svgelements.SVG, _SimpleShapes | None]:
+    """Parse an SVG file with svgelements, using the skeleton of simple SVGs.
+
+    SVGs which are not simple are parsed from the file's content by svgelements directly.
+
+    Returns:
+        tuple (svg, shapes), where shapes is the geometry of the placeholders of the parsed
+        skeleton, or None if the SVG is not simple
+    """
+
+    if hasattr(file, "read"):
+        data = file.read()
+    else:
+        with open(file, "rb") as fp:
+            data = fp.read()
+
+    try:
+        simple = _simplify_svg(ElementTree.fromstring(data))
+    except ElementTree.ParseError:
+        simple = None
+
+    if simple is None:
+        source = io.BytesIO(data) if isinstance(data, bytes) else io.StringIO(data)
+        return svgelements.SVG.parse(source, width=default_width, height=default_height), None
+
+    skeleton, shapes = simple
+    svg = svgelements.SVG.parse(
+        io.BytesIO(ElementTree.tostring(skeleton)), width=default_width, height=default_height
+    )
+    return svg, shapes
+
+
 def read_svg(
     file: str | TextIO,
     quantization: float,
@@ -383,6 +1351,7 @@ def read_svg(
     parallel: bool = False,
     default_width: float | None = None,
     default_height: float | None = None,
+    tolerance: float | None = None,
 ) -> tuple[LineCollection, float, float]:
     """Read an SVG file and return its content as a :class:`LineCollection` instance.
 
@@ -390,6 +1359,15 @@ def read_svg(
     Optionally, the geometries are simplified using Shapely, using the value of *quantization*
     as tolerance.
 
+    Alternatively, if *tolerance* is provided, curved geometries are approximated adaptively:
+    flat portions use fewer, longer segments, such that the approximation deviates from the
+    curve by at most *tolerance*, while segments remain no longer than *quantization*. This
+    yields far fewer points than a regular chopping for the same accuracy.
+
+    SVGs made of lines, polylines, polygons and straight paths only, such as those written by
+    :func:`write_svg`, are read through a faster code path which parses their geometry with
+    vectorized operations.
+
     The page size is set based on the ``width`` and ``height`` attributes of the ``<svg>`` tag.
     If these attributes are missing or expressed in percent, ``svgelements`` attempts to use
     the ``viewBox`` attribute instead, or reverts to a 1000x1000px page size. This behaviour
@@ -401,11 +1379,12 @@ def read_svg(
         quantization: maximum size of segment used to approximate curved geometries
         crop: crop the geometries to the SVG boundaries
         simplify: run Shapely's simplify on loaded geometry
-        parallel: enable multiprocessing (only recommended for ``simplify=True`` and SVG with
-            many curves)
+        parallel: enable multiprocessing (only recommended for SVG with many curves)
         default_width: default width if not provided by SVG or if a percent width is provided
         default_height: default height if not provided by SVG or if a percent height is
             provided
+        tolerance: if provided, curved geometries are approximated adaptively, with a maximum
+            deviation of *tolerance*, and *quantization* only sets the maximum segment length
 
     Returns:
         tuple containing a :class:`LineCollection` with the imported geometries as well as the
@@ -413,9 +1392,12 @@ def read_svg(
     """
 
     # default width is for SVG with % width/height
-    svg = svgelements.SVG.parse(file, width=default_width, height=default_height)
-    paths, metadata = _extract_paths(svg, True)
-    lc = _flattened_paths_to_line_collection(paths, quantization, simplify, parallel, metadata)
+    svg, shapes = _parse_svg(file, default_width, default_height)
+    paths, metadata = _extract_paths(svg, True, shapes)
+    with _WorkerPool(parallel) as pool:
+        lc = _flattened_paths_to_line_collection(
+            paths, quantization, simplify, pool, metadata, tolerance
+        )
 
     if crop:
         lc.crop(0, 0, svg.width, svg.height)
@@ -442,6 +1424,185 @@ def _extract_digit_group(label: str) -> str | None:
         return None
 
 
+def _find_groups(group: svgelements.Group) -> Iterator[svgelements.Group]:
+    for elem in group:
+        if isinstance(elem, svgelements.Group):
+            yield elem
+
+
+def _svg_layers(
+    svg: svgelements.SVG,
+    shapes: _SimpleShapes | None,
+    group_offset: int,
+    quantization: float,
+    simplify: bool,
+    pool: _WorkerPool,
+    tolerance: float | None,
+) -> Iterator[tuple[int, LineCollection, bool]]:
+    """Convert the top-level elements and groups of a parsed SVG into layers.
+
+    The non-group top-level elements are loaded in layer 1, and each top-level group in the
+    layer ID derived from its label, its ID, or its index offset by ``group_offset``. The name
+    of group layers is set. If ``shapes`` is provided, ``svg`` is the skeleton of a simple SVG
+    (see :func:`_simplify_svg`).
+
+    Returns:
+        iterator of (layer ID, line collection, is group) tuples
+    """
+
+    paths, metadata = _extract_paths(svg, False, shapes)
+    yield (
+        1,
+        _flattened_paths_to_line_collection(
+            paths, quantization, simplify, pool, metadata, tolerance
+        ),
+        False,
+    )
+
+    for i, g in enumerate(_find_groups(svg), start=group_offset):
+        # noinspection HttpUrlsUsage
+        layer_name = g.values.get("{http://www.inkscape.org/namespaces/inkscape}label", None)
+
+        # compute a decent layer ID
+        lid_str = _extract_digit_group(layer_name or "")
+        if not lid_str:
+            lid_str = _extract_digit_group(g.values.get("id") or "")
+        if lid_str:
+            lid = int(lid_str)
+            if lid == 0:
+                lid = 1
+        else:
+            lid = i + 1
+
+        paths, metadata = _extract_paths(g, True, shapes)
+        lc = _flattened_paths_to_line_collection(
+            paths, quantization, simplify, pool, metadata, tolerance
+        )
+        lc.set_property(METADATA_FIELD_NAME, layer_name)
+        yield lid, lc, True
+
+
+def _add_svg_layer(document: Document, lid: int, lc: LineCollection, is_group: bool) -> None:
+    """Add a layer read from an SVG to a document.
+
+    If the layer already exists (e.g. layer 1, which may already contain top-level
+    elements), only the metadata common to both is kept, except for the name of groups.
+    """
+
+    if lid in document.layers:
+        metadata = _intersect_dict(document.layers[lid].metadata, lc.metadata)
+    else:
+        metadata = lc.metadata
+
+    document.add(lc, lid)
+    document.layers[lid].metadata = metadata
+    if is_group:
+        document.layers[lid].set_property(
+            METADATA_FIELD_NAME, lc.property(METADATA_FIELD_NAME)
+        )
+
+
+# top-level elements which are included with every group when streaming
+_STREAM_DEFINITION_TAGS = frozenset({"defs", "style", "symbol"})
+
+# top-level elements which are parsed on their own when streaming
+_STREAM_GROUP_TAGS = frozenset({"g", "svg"})
+
+# maximum number of top-level non-group elements parsed at once when streaming
+_STREAM_CHUNK_SIZE = 1000
+
+_XLINK_HREF = "{http://www.w3.org/1999/xlink}href"
+
+
+def _stream_svg(
+    file: str | TextIO, default_width: float | None, default_height: float | None
+) -> Iterator[tuple[svgelements.SVG, _SimpleShapes | None]]:
+    """Parse an SVG file incrementally.
+
+    The file is read with incremental XML parsing. Each top-level group, and each chunk of
+    consecutive top-level non-group elements, is parsed by svgelements as a standalone SVG
+    made of the root ``<svg>`` element, the top-level definitions read so far, and the
+    group or elements. Their XML elements are then released.
+
+    As a consequence, ``<use>`` elements may only reference elements from the same group or
+    from definitions appearing before them. Other references cannot be resolved and are
+    ignored with a warning.
+
+    Returns:
+        iterator of (svg, shapes) tuples as returned by :func:`_parse_svg_element`, with at
+        least one item
+    """
+
+    root: ElementTree.Element | None = None
+    definitions: list[ElementTree.Element] = []
+    definition_ids: set[str] = set()
+    pending: list[ElementTree.Element] = []
+
+    def _parse(
+        elements: list[ElementTree.Element],
+    ) -> tuple[svgelements.SVG, _SimpleShapes | None]:
+        assert root is not None
+        ids = definition_ids.union(
+            e.attrib["id"] for elem in elements for e in elem.iter() if "id" in e.attrib
+        )
+        for elem in elements:
+            for e in elem.iter():
+                href = e.get(_XLINK_HREF, e.get("href"))
+                if (
+                    href is not None
+                    and href.startswith("#")
+                    and e.tag.rsplit("}", 1)[-1] == "use"
+                    and href[1:] not in ids
+                ):
+                    logging.warning(
+                        f"read: <use> element references '{href}', which is not defined "
+                        "in a previous definition or in the same group, ignoring it "
+                        "(streaming mode)"
+                    )
+
+        svg = ElementTree.Element(root.tag, root.attrib)
+        svg.extend(definitions)
+        svg.extend(elements)
+        return _parse_svg_element(svg, default_width, default_height)
+
+    parsed_count = 0
+    depth = 0
+    for event, elem in ElementTree.iterparse(file, events=("start", "end")):
+        if event == "start":
+            if depth == 0:
+                root = elem
+            depth += 1
+            continue
+
+        depth -= 1
+        if depth != 1:
+            continue
+
+        tag = elem.tag.rsplit("}", 1)[-1]
+        if tag in _STREAM_DEFINITION_TAGS:
+            definitions.append(elem)
+            definition_ids.update(e.attrib["id"] for e in elem.iter() if "id" in e.attrib)
+            continue
+
+        assert root is not None
+        root.remove(elem)
+        if tag in _STREAM_GROUP_TAGS:
+            if pending:
+                yield _parse(pending)
+                pending = []
+            yield _parse([elem])
+            parsed_count += 1
+        else:
+            pending.append(elem)
+            if len(pending) >= _STREAM_CHUNK_SIZE:
+                yield _parse(pending)
+                pending = []
+                parsed_count += 1
+
+    if pending or parsed_count == 0:
+        yield _parse(pending)
+
+
 def read_multilayer_svg(
     file: str | TextIO,
     quantization: float,
@@ -450,6 +1611,8 @@ def read_multilayer_svg(
     parallel: bool = False,
     default_width: float | None = None,
     default_height: float | None = None,
+    tolerance: float | None = None,
+    streaming: bool = False,
 ) -> Document:
     """Read a multilayer SVG file and return its content as a :class:`Document` instance
     retaining the SVG's layer structure and its dimension.
@@ -466,79 +1629,67 @@ def read_multilayer_svg(
     Optionally, the geometries are simplified using Shapely, using the value of *quantization*
     as tolerance.
 
+    Alternatively, if *tolerance* is provided, curved geometries are approximated adaptively:
+    flat portions use fewer, longer segments, such that the approximation deviates from the
+    curve by at most *tolerance*, while segments remain no longer than *quantization*. This
+    yields far fewer points than a regular chopping for the same accuracy.
+
+    SVGs made of lines, polylines, polygons and straight paths only, such as those written by
+    :func:`write_svg`, are read through a faster code path which parses their geometry with
+    vectorized operations.
+
     The page size is set based on the ``width`` and ``height`` attributes of the ``<svg>`` tag.
     If these attributes are missing or expressed in percent, ``svgelements`` attempts to use
     the ``viewBox`` attribute instead, or reverts to a 1000x1000px page size. This behaviour
     can be overridden by providing values for the ``default_width`` and ``default_height``
     arguments.
 
+    With ``streaming=True``, the SVG is read one top-level group at a time using
+    :func:`iter_multilayer_svg`, such that the SVG elements of only one layer are held in
+    memory at once. In this mode, top-level non-group elements are added to layer 1 in their
+    order of appearance among the groups.
+
     Args:
         file: path of the SVG file or stream object
         quantization: maximum size of segment used to approximate curved geometries
         crop: crop the geometries to the SVG boundaries
         simplify: run Shapely's simplify on loaded geometry
-        parallel: enable multiprocessing (only recommended for ``simplify=True`` and SVG with
-            many curves)
+        parallel: enable multiprocessing (only recommended for SVG with many curves)
         default_width: default width if not provided by SVG or if a percent width is provided
         default_height: default height if not provided by SVG or if a percent height is
             provided
+        tolerance: if provided, curved geometries are approximated adaptively, with a maximum
+            deviation of *tolerance*, and *quantization* only sets the maximum segment length
+        streaming: read the SVG incrementally to limit the memory usage (see
+            :func:`iter_multilayer_svg`)
 
     Returns:
          :class:`Document` instance with the imported geometries and its page size set the SVG
          dimensions
     """
 
-    svg = svgelements.SVG.parse(file, width=default_width, height=default_height)
-    document = Document(metadata=_extract_metadata_from_element(svg, False))
-
-    # non-group top level elements are loaded in layer 1
-    paths, metadata = _extract_paths(svg, False)
-    lc = _flattened_paths_to_line_collection(paths, quantization, simplify, parallel, metadata)
-    if not lc.is_empty():
-        document.add(lc, 1)
-        document.layers[1].metadata = lc.metadata
-
-    def _find_groups(group: svgelements.Group) -> Iterator[svgelements.Group]:
-        for elem in group:
-            if isinstance(elem, svgelements.Group):
-                yield elem
-
-    for i, g in enumerate(_find_groups(svg)):
-        # noinspection HttpUrlsUsage
-        layer_name = g.values.get("{http://www.inkscape.org/namespaces/inkscape}label", None)
-
-        # compute a decent layer ID
-        lid_str = _extract_digit_group(layer_name or "")
-        if not lid_str:
-            lid_str = _extract_digit_group(g.values.get("id") or "")
-        if lid_str:
-            lid = int(lid_str)
-            if lid == 0:
-                lid = 1
-        else:
-            lid = i + 1
-
-        paths, metadata = _extract_paths(g, True)
-        lc = _flattened_paths_to_line_collection(
-            paths, quantization, simplify, parallel, metadata
-        )
-
-        if not lc.is_empty():
-            # deal with the case of layer 1, which may already be initialized with top-level
-            # paths
-            if lid in document.layers:
-                metadata = _intersect_dict(document.layers[lid].metadata, lc.metadata)
-            else:
-                metadata = lc.metadata
-
-            document.add(lc, lid)
-            document.layers[lid].metadata = metadata
-            document.layers[lid].set_property(METADATA_FIELD_NAME, layer_name)
+    if streaming:
+        svgs = _stream_svg(file, default_width, default_height)
+    else:
+        svgs = iter([_parse_svg(file, default_width, default_height)])
 
-    document.page_size = (svg.width, svg.height)
+    svg, shapes = next(svgs)
+    width, height = svg.width, svg.height
+    document = Document(metadata=_extract_metadata_from_element(svg, False))
+    document.page_size = (width, height)
+
+    group_count = 0
+    with _WorkerPool(parallel) as pool:
+        for svg, shapes in itertools.chain([(svg, shapes)], svgs):
+            for lid, lc, is_group in _svg_layers(
+                svg, shapes, group_count, quantization, simplify, pool, tolerance
+            ):
+                group_count += is_group
+                if not lc.is_empty():
+                    _add_svg_layer(document, lid, lc, is_group)
 
     if crop:
-        document.crop(0, 0, svg.width, svg.height)
+        document.crop(0, 0, width, height)
 
     # Because of how svgelements works, all the <svg> level metadata is propagated to every
     # nested tag. As a result, we need to subtract global properties from the layer ones.
@@ -552,6 +1703,85 @@ def read_multilayer_svg(
     return document
 
 
+def iter_multilayer_svg(
+    file: str | TextIO,
+    quantization: float,
+    crop: bool = True,
+    simplify: bool = False,
+    parallel: bool = False,
+    default_width: float | None = None,
+    default_height: float | None = None,
+    tolerance: float | None = None,
+) -> Iterator[Document]:
+    """Read a multilayer SVG file incrementally, yielding its layers as soon as they are read.
+
+    This function reads the SVG with incremental XML parsing, one top-level group at a time,
+    and releases the SVG elements of each group once it is converted. As a result, the memory
+    usage is bounded by the largest layer rather than by the whole file, which is useful for
+    very large SVGs.
+
+    Each layer is yielded as a single-layer :class:`Document` instance, with the SVG's page
+    size, metadata and source, such that the layers may be accumulated using
+    :meth:`Document.extend`. If the SVG contains no geometries, a single empty
+    :class:`Document` is yielded. Each top-level group yields a layer, and consecutive
+    top-level, non-group elements yield layer 1. Layer IDs, names and metadata are otherwise
+    determined as for :func:`read_multilayer_svg`, and the same layer ID may be yielded
+    multiple times.
+
+    Each top-level group is parsed along with the top-level ``<defs>``, ``<style>`` and
+    ``<symbol>`` elements read so far. Elements which reference other parts of the SVG (e.g.
+    a ``<use>`` element referencing an element of another group) are thus not supported. Use
+    :func:`read_multilayer_svg` for such SVGs.
+
+    Args:
+        file: path of the SVG file or stream object
+        quantization: maximum size of segment used to approximate curved geometries
+        crop: crop the geometries to the SVG boundaries
+        simplify: run Shapely's simplify on loaded geometry
+        parallel: enable multiprocessing (only recommended for SVG with many curves)
+        default_width: default width if not provided by SVG or if a percent width is provided
+        default_height: default height if not provided by SVG or if a percent height is
+            provided
+        tolerance: if provided, curved geometries are approximated adaptively, with a maximum
+            deviation of *tolerance*, and *quantization* only sets the maximum segment length
+
+    Returns:
+        iterator of single-layer :class:`Document` instances
+    """
+
+    source = _get_source(file)
+    group_count = 0
+    document = None
+    with _WorkerPool(parallel) as pool:
+        for svg, shapes in _stream_svg(file, default_width, default_height):
+            for lid, lc, is_group in _svg_layers(
+                svg, shapes, group_count, quantization, simplify, pool, tolerance
+            ):
+                group_count += is_group
+                if lc.is_empty():
+                    continue
+
+                document = Document(metadata=_extract_metadata_from_element(svg, False))
+                _add_svg_layer(document, lid, lc, is_group)
+                document.page_size = (svg.width, svg.height)
+                if crop:
+                    document.crop(0, 0, svg.width, svg.height)
+                lc.metadata = dict(lc.metadata.items() - document.metadata.items())
+                if source:
+                    document.add_to_sources(source)
+                yield document
+
+            if document is None:
+                # empty documents are only yielded to provide the page size and metadata
+                empty = Document(metadata=_extract_metadata_from_element(svg, False))
+                empty.page_size = (svg.width, svg.height)
+                if source:
+                    empty.add_to_sources(source)
+
+    if document is None:
+        yield empty
+
+
 def read_svg_by_attributes(
     file: str | TextIO,
     attributes: Iterable[str],
@@ -561,6 +1791,7 @@ def read_svg_by_attributes(
     parallel: bool = False,
     default_width: float | None = None,
     default_height: float | None = None,
+    tolerance: float | None = None,
 ) -> Document:
     """Read an SVG file by sorting geometries by unique combination of provided attributes.
 
@@ -568,6 +1799,11 @@ def read_svg_by_attributes(
     Optionally, the geometries are simplified using Shapely, using the value of *quantization*
     as tolerance.
 
+    Alternatively, if *tolerance* is provided, curved geometries are approximated adaptively:
+    flat portions use fewer, longer segments, such that the approximation deviates from the
+    curve by at most *tolerance*, while segments remain no longer than *quantization*. This
+    yields far fewer points than a regular chopping for the same accuracy.
+
     The page size is set based on the ``width`` and ``height`` attributes of the ``<svg>`` tag.
     If these attributes are missing or expressed in percent, ``svgelements`` attempts to use
     the ``viewBox`` attribute instead, or reverts to a 1000x1000px page size. This behaviour
@@ -580,29 +1816,31 @@ def read_svg_by_attributes(
         quantization: maximum size of segment used to approximate curved geometries
         crop: crop the geometries to the SVG boundaries
         simplify: run Shapely's simplify on loaded geometry
-        parallel: enable multiprocessing (only recommended for ``simplify=True`` and SVG with
-            many curves)
+        parallel: enable multiprocessing (only recommended for SVG with many curves)
         default_width: default width if not provided by SVG or if a percent width is provided
         default_height: default height if not provided by SVG or if a percent height is
             provided
+        tolerance: if provided, curved geometries are approximated adaptively, with a maximum
+            deviation of *tolerance*, and *quantization* only sets the maximum segment length
 
     Returns:
          :class:`Document` instance with the imported geometries and its page size set the SVG
          dimensions
     """
 
-    svg = svgelements.SVG.parse(file, width=default_width, height=default_height)
+    svg, shapes = _parse_svg(file, default_width, default_height)
     document = Document(metadata=_extract_metadata_from_element(svg, False))
 
-    for paths, metadata in _extract_paths_by_attributes(svg, attributes):
-        lc = _flattened_paths_to_line_collection(
-            paths, quantization, simplify, parallel, metadata
-        )
+    with _WorkerPool(parallel) as pool:
+        for paths, metadata in _extract_paths_by_attributes(svg, attributes, shapes):
+            lc = _flattened_paths_to_line_collection(
+                paths, quantization, simplify, pool, metadata, tolerance
+            )
 
-        if not lc.is_empty():
-            lid = document.free_id()
-            document.add(lc, lid)
-            document.layers[lid].metadata = lc.metadata
+            if not lc.is_empty():
+                lid = document.free_id()
+                document.add(lc, lid)
+                document.layers[lid].metadata = lc.metadata
 
     document.page_size = (svg.width, svg.height)
 
@@ -1013,3 +2251,213 @@ def write_hpgl(
     output.write(f"PU{paper_config.final_pu_params if paper_config.final_pu_params else ''};")
     output.write("SP0;IN;\n")
     output.flush()
+
+
+# Native binary document format. Layout:
+#   - magic bytes (8 bytes)
+#   - header length N (little endian uint64)
+#   - header (N bytes): UTF-8 JSON, padded with spaces such that the data section is aligned
+#   - data section: the points and offsets buffers of each layer, each aligned on
+#     _VPYPE_ALIGNMENT bytes, at the locations specified in the header (relative to the data
+#     section start)
+_VPYPE_MAGIC = b"VPYPEDOC"
+_VPYPE_FORMAT_VERSION = 1
+_VPYPE_ALIGNMENT = 64
+_VPYPE_TYPE_KEY = "__vp_type__"
+
+
+def _metadata_to_json(value: Any) -> Any:
+    """Convert a metadata value to a JSON-compatible value, tagging non-JSON types."""
+    if value is None or isinstance(value, bool | int | float | str):
+        return value
+    elif isinstance(value, Color):
+        return {_VPYPE_TYPE_KEY: "color", "value": value.as_hex()}
+    elif isinstance(value, pathlib.Path):
+        return {_VPYPE_TYPE_KEY: "path", "value": str(value)}
+    elif isinstance(value, tuple):
+        return {_VPYPE_TYPE_KEY: "tuple", "value": [_metadata_to_json(v) for v in value]}
+    elif isinstance(value, set | frozenset):
+        return {_VPYPE_TYPE_KEY: "set", "value": [_metadata_to_json(v) for v in value]}
+    elif isinstance(value, list):
+        return [_metadata_to_json(v) for v in value]
+    elif isinstance(value, dict) and all(isinstance(k, str) for k in value):
+        return {k: _metadata_to_json(v) for k, v in value.items()}
+    else:
+        raise TypeError(f"unsupported type {type(value).__name__}")
+
+
+def _metadata_from_json(value: Any) -> Any:
+    """Inverse of :func:`_metadata_to_json`."""
+    if isinstance(value, list):
+        return [_metadata_from_json(v) for v in value]
+    elif isinstance(value, dict):
+        value_type = value.get(_VPYPE_TYPE_KEY)
+        if value_type == "color":
+            return Color(value["value"])
+        elif value_type == "path":
+            return pathlib.Path(value["value"])
+        elif value_type == "tuple":
+            return tuple(_metadata_from_json(v) for v in value["value"])
+        elif value_type == "set":
+            return {_metadata_from_json(v) for v in value["value"]}
+        else:
+            return {k: _metadata_from_json(v) for k, v in value.items()}
+    else:
+        return value
+
+
+def _serialize_metadata(metadata: dict[str, Any]) -> dict[str, Any]:
+    result = {}
+    for name, value in metadata.items():
+        try:
+            result[name] = _metadata_to_json(value)
+        except TypeError as exc:
+            logging.warning(
+                f"write_vpype: property {name!r} cannot be saved ({exc}), skipping"
+            )
+    return result
+
+
+def write_vpype(output: str | pathlib.Path | BinaryIO, document: Document) -> None:
+    """Save a document to vpype's native binary format.
+
+    For each layer, the packed point and offset buffers (see
+    :meth:`LineCollection.as_arrays`) are stored along with the layer metadata. The document
+    metadata (including page size and sources) is stored as well. Contrary to SVG, the
+    geometries are saved with their full precision and are loaded back without any parsing
+    (see :func:`read_vpype`).
+
+    Metadata values may be of any JSON-compatible type, as well as :class:`Color`,
+    :class:`pathlib.Path`, tuple and set. Properties with other types are skipped with a
+    warning.
+
+    When writing to the path of an existing file, the document is first written to a
+    temporary file which then replaces the existing one. The document may thus be saved to the
+    file it was memory-mapped from (see :func:`read_vpype`).
+
+    Args:
+        output: path or binary file object to write to
+        document: the document to save
+    """
+
+    if isinstance(output, str | pathlib.Path):
+        path = pathlib.Path(output)
+        if not path.exists():
+            with open(path, "wb") as fp:
+                write_vpype(fp, document)
+            return
+
+        # the existing file must not be truncated, as it may be memory-mapped by `document`
+        fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                write_vpype(fp, document)
+            os.chmod(temp_path, stat.S_IMODE(path.stat().st_mode))
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return
+
+    layers = []
+    buffers = []
+    position = 0
+    for layer_id, lc in document.layers.items():
+        points, offsets = lc.as_arrays()
+        layer_header: dict[str, Any] = {
+            "id": layer_id,
+            "metadata": _serialize_metadata(lc.metadata),
+            "dtype": points.dtype.str,
+            "line_count": len(offsets) - 1,
+            "point_count": len(points),
+        }
+        for name, buffer in (("points", points), ("offsets", offsets.astype("<i8"))):
+            layer_header[name] = position
+            buffers.append(np.ascontiguousarray(buffer))
+            position += buffer.nbytes + (-buffer.nbytes % _VPYPE_ALIGNMENT)
+        layers.append(layer_header)
+
+    header = json.dumps(
+        {
+            "version": _VPYPE_FORMAT_VERSION,
+            "dtype": document.dtype.str,
+            "metadata": _serialize_metadata(document.metadata),
+            "layers": layers,
+        }
+    ).encode()
+    header += b" " * (-(len(_VPYPE_MAGIC) + 8 + len(header)) % _VPYPE_ALIGNMENT)
+
+    output.write(_VPYPE_MAGIC)
+    output.write(struct.pack("<Q", len(header)))
+    output.write(header)
+    for buffer in buffers:
+        output.write(buffer.data)
+        output.write(bytes(-buffer.nbytes % _VPYPE_ALIGNMENT))
+    output.flush()
+
+
+def _buffer_view(data: np.ndarray, start: int, dtype: str, count: int) -> np.ndarray:
+    dtype_obj = np.dtype(dtype)
+    end = start + count * dtype_obj.itemsize
+    if end > len(data):
+        raise ValueError("invalid vpype file (truncated data)")
+    return np.asarray(data[start:end]).view(dtype_obj)
+
+
+def read_vpype(file: str | pathlib.Path | BinaryIO, mmap: bool = True) -> Document:
+    """Read a document saved with :func:`write_vpype`.
+
+    When reading from a path with ``mmap`` enabled (the default), the file is memory-mapped
+    and the layers directly use the mapped buffers. Opening a file is thus nearly free, and
+    the data is only read from disk when the layers' content is accessed. The buffers are
+    read-only and copied when the layers are modified (see :class:`LineCollection`). The file
+    must not be modified in-place while the document is in use, but it may be replaced, e.g.
+    by saving the document to the same path with :func:`write_vpype`.
+
+    Args:
+        file: path or binary file object to read from
+        mmap: use memory-mapping when reading from a path
+
+    Returns:
+        the loaded document
+    """
+
+    data: np.ndarray
+    if isinstance(file, str | pathlib.Path):
+        path = pathlib.Path(file)
+        if mmap and path.stat().st_size > 0:
+            data = np.memmap(path, dtype=np.uint8, mode="r")
+        else:
+            data = np.frombuffer(path.read_bytes(), dtype=np.uint8)
+    else:
+        data = np.frombuffer(file.read(), dtype=np.uint8)
+
+    header_start = len(_VPYPE_MAGIC) + 8
+    if len(data) < header_start or bytes(data[: len(_VPYPE_MAGIC)]) != _VPYPE_MAGIC:
+        raise ValueError("not a vpype file")
+    (header_length,) = struct.unpack("<Q", bytes(data[len(_VPYPE_MAGIC) : header_start]))
+    header = json.loads(bytes(data[header_start : header_start + header_length]))
+    if header.get("version") != _VPYPE_FORMAT_VERSION:
+        raise ValueError(f"unsupported vpype file version {header.get('version')}")
+    data_start = header_start + header_length
+
+    document = Document(
+        metadata=_metadata_from_json(header["metadata"]), dtype=header["dtype"]
+    )
+    for layer in header["layers"]:
+        points = _buffer_view(
+            data, data_start + layer["points"], layer["dtype"], layer["point_count"]
+        )
+        offsets = _buffer_view(
+            data, data_start + layer["offsets"], "<i8", layer["line_count"] + 1
+        )
+        if offsets[0] != 0 or offsets[-1] != len(points):
+            raise ValueError("invalid vpype file (inconsistent offsets)")
+
+        lc = LineCollection(
+            metadata=_metadata_from_json(layer["metadata"]), dtype=points.dtype
+        )
+        lc._set_packed(points, offsets, shared=True)
+        document[layer["id"]] = lc
+
+    return document
@@ -0,0 +1,297 @@
+"""Merging of lines by covering their segment graph with trails."""
+
+from __future__ import annotations
+
+import logging
+from typing import cast
+
+import numpy as np
+from scipy.spatial import KDTree
+
+from .line_index import _PointGrid
+from .model import LineCollection, _drop_short_lines, as_vector
+
+# REMINDER: anything added here must be added to docs/api.rst
+__all__ = ["merge_line_graph"]
+
+
+# below this fraction of paired nodes, odd-degree nodes are paired one by one
+_MIN_PAIRED_FRACTION = 0.1
+
+
+def _graph_nodes(
+    points: np.ndarray, offsets: np.ndarray, tolerance: float
+) -> tuple[np.ndarray, np.ndarray]:
+    """Snap points to graph nodes.
+
+    Identical points are always the same node. Besides, each line endpoint is snapped to the
+    closest node within ``tolerance`` which belongs to another line, and which is either made
+    of interior points only or of endpoints appearing earlier. Snapping is not transitive:
+    a node is only merged into a node which is not itself merged, such that consecutive points
+    of densely sampled lines do not collapse into a single node.
+
+    Returns:
+        tuple (nodes, positions), where nodes is the node of each point and positions is the
+        location of each node
+    """
+
+    positions, first, nodes = np.unique(points, return_index=True, return_inverse=True)
+    nodes = nodes.reshape(-1)
+    if tolerance <= 0 or len(positions) < 2:
+        return nodes, positions
+
+    # lines going through each node, as sorted node * line_count + line keys
+    line_count = len(offsets) - 1
+    line_ids = np.repeat(np.arange(line_count), np.diff(offsets))
+    node_lines = np.unique(nodes * line_count + line_ids)
+    is_end_node = np.zeros(len(positions), dtype=bool)
+    is_end_node[nodes[offsets[:-1]]] = is_end_node[nodes[offsets[1:] - 1]] = True
+
+    # candidate (endpoint node, node) pairs, the latter being made of interior points only or
+    # of endpoints appearing earlier
+    pairs = KDTree(as_vector(positions)).query_pairs(tolerance, output_type="ndarray")
+    src_nodes = np.concatenate([pairs[:, 0], pairs[:, 1]])
+    dst_nodes = np.concatenate([pairs[:, 1], pairs[:, 0]])
+    valid = is_end_node[src_nodes] & (
+        ~is_end_node[dst_nodes] | (first[dst_nodes] < first[src_nodes])
+    )
+    src_nodes, dst_nodes = src_nodes[valid], dst_nodes[valid]
+    if len(src_nodes) == 0:
+        return nodes, positions
+
+    # the candidate must belong to a line which does not go through the endpoint node, which
+    # excludes the neighboring points of the endpoint's own line
+    starts = np.searchsorted(node_lines, dst_nodes * line_count)
+    counts = np.searchsorted(node_lines, (dst_nodes + 1) * line_count) - starts
+    group_starts = np.cumsum(counts) - counts
+    candidate_lines = (
+        node_lines[np.arange(counts.sum()) + np.repeat(starts - group_starts, counts)]
+        % line_count
+    )
+    keys = np.repeat(src_nodes, counts) * line_count + candidate_lines
+    shared = node_lines[np.minimum(np.searchsorted(node_lines, keys), len(node_lines) - 1)]
+    other_line = np.add.reduceat(shared != keys, group_starts) > 0
+    src_nodes, dst_nodes = src_nodes[other_line], dst_nodes[other_line]
+
+    dists = np.abs(positions[dst_nodes] - positions[src_nodes])
+    order = np.lexsort((dst_nodes, dists, first[src_nodes]))
+
+    # endpoint nodes are processed in order of appearance, each being merged into its
+    # closest candidate which is not merged itself
+    representative = np.arange(len(positions))
+    for src_node, dst_node in zip(src_nodes[order].tolist(), dst_nodes[order].tolist()):
+        if representative[src_node] == src_node and representative[dst_node] == dst_node:
+            representative[src_node] = dst_node
+
+    kept = representative == np.arange(len(positions))
+    relabel = np.cumsum(kept) - 1
+    return relabel[representative[nodes]], positions[kept]
+
+
+def _pair_odd_nodes(odd: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """Pair the odd-degree nodes by proximity.
+
+    Mutual nearest neighbors are paired in vectorized rounds, until a round pairs too few
+    nodes, at which point each remaining node is greedily paired with the closest unpaired
+    one.
+
+    Returns:
+        array of shape (len(odd) // 2, 2) of paired nodes
+    """
+
+    pairs = [np.empty((0, 2), dtype=np.int64)]
+    while len(odd) > 1:
+        _, neighbors = KDTree(as_vector(positions[odd])).query(as_vector(positions[odd]), k=2)
+        nearest = neighbors[:, 1]
+        mutual = nearest[nearest] == np.arange(len(odd))
+        (first,) = np.nonzero(mutual & (np.arange(len(odd)) < nearest))
+        pairs.append(np.column_stack((odd[first], odd[nearest[first]])))
+        odd = odd[~mutual]
+        if 2 * len(first) < _MIN_PAIRED_FRACTION * (len(odd) + 2 * len(first)):
+            break
+
+    grid = _PointGrid(positions[odd])
+    paired = np.zeros(len(odd), dtype=bool)
+    for i in range(len(odd)):
+        if paired[i]:
+            continue
+        grid.remove(i)
+        j = cast(int, grid.nearest(positions[odd[i]])[0])
+        grid.remove(j)
+        paired[i] = paired[j] = True
+        pairs.append(np.array([[odd[i], odd[j]]]))
+
+    return np.vstack(pairs)
+
+
+def _euler_circuits(
+    edge_nodes: np.ndarray, node_count: int
+) -> list[tuple[list[int], list[int]]]:
+    """Compute an Eulerian circuit of each connected component using Hierholzer's algorithm.
+
+    All nodes must have an even degree.
+
+    Returns:
+        list of (nodes, edges) tuples, where nodes are the successive nodes of the circuit
+        (the first and last being the same) and edges[k] connects nodes[k] and nodes[k + 1]
+    """
+
+    # adjacency lists in CSR format, each edge appearing in the list of both its nodes
+    half_nodes = edge_nodes.T.reshape(-1)
+    half_edges = np.tile(np.arange(len(edge_nodes)), 2)
+    order = np.argsort(half_nodes, kind="stable")
+    adjacency = half_edges[order].tolist()
+    ends = np.cumsum(np.bincount(half_nodes, minlength=node_count))
+    pointers = (ends - np.bincount(half_nodes, minlength=node_count)).tolist()
+    ends = ends.tolist()
+    first, second = edge_nodes[:, 0].tolist(), edge_nodes[:, 1].tolist()
+    used = [False] * len(edge_nodes)
+
+    circuits = []
+    for start in range(node_count):
+        if pointers[start] == ends[start]:
+            continue
+
+        nodes: list[int] = []
+        edges: list[int] = []
+        stack = [(start, -1)]
+        while stack:
+            node, edge = stack[-1]
+            ptr, end = pointers[node], ends[node]
+            while ptr < end and used[adjacency[ptr]]:
+                ptr += 1
+            pointers[node] = ptr
+
+            if ptr == end:
+                stack.pop()
+                nodes.append(node)
+                if edge >= 0:
+                    edges.append(edge)
+            else:
+                next_edge = adjacency[ptr]
+                used[next_edge] = True
+                a = first[next_edge]
+                stack.append((second[next_edge] if a == node else a, next_edge))
+
+        circuits.append((nodes, edges))
+
+    return circuits
+
+
+def merge_line_graph(lines: LineCollection, tolerance: float = 0.0) -> LineCollection:
+    """Merge lines into a minimal number of continuous strokes.
+
+    The lines' segments are considered as the edges of a graph whose nodes are the segments'
+    endpoints, where identical points are the same node and line endpoints are snapped to the
+    closest point of another line within ``tolerance``. Each
+    connected component of this graph is then covered by the minimum number of trails (i.e.
+    continuous strokes drawing each segment exactly once), which is half its number of
+    odd-degree nodes, or one if it has none. This is achieved by pairing odd-degree nodes with
+    virtual edges, computing an Eulerian circuit of each component, and splitting the circuits
+    at the virtual edges. Odd-degree nodes are greedily paired with their closest unpaired
+    counterpart, such that successive strokes tend to be close to each other.
+
+    Compared to merging lines by their endings (see :meth:`LineCollection.merge`), this
+    approach is able to traverse densely connected geometries, such as meshes made of touching
+    polygons, with far fewer strokes. Segments which cross each other without sharing an
+    endpoint are not connected. Lines may be reversed and snapped endpoints are moved to the
+    location of the point they are snapped to. Lines with less than two points are passed
+    through unchanged.
+
+    Args:
+        lines: lines to merge
+        tolerance: max distance between an endpoint and the point it is snapped to
+
+    Returns:
+        new line collection with the merged lines
+    """
+
+    points, offsets = lines.as_arrays()
+
+    # lines with less than two points have no segment and are passed through unchanged
+    point_counts = np.diff(offsets)
+    short = point_counts < 2
+    if np.any(short):
+        short_points = points[np.repeat(short, point_counts)]
+        short_offsets = np.zeros(np.count_nonzero(short) + 1, dtype=np.int64)
+        np.cumsum(point_counts[short], out=short_offsets[1:])
+        points, offsets = _drop_short_lines(points, offsets)
+    if len(points) == 0:
+        return lines.clone(lines)
+
+    # segments are the pairs of consecutive points that belong to the same line
+    is_segment = np.ones(len(points), dtype=bool)
+    is_segment[offsets[1:] - 1] = False
+    seg_starts = np.flatnonzero(is_segment)
+
+    point_nodes, positions = _graph_nodes(points, offsets, tolerance)
+    degrees = np.bincount(
+        np.concatenate([point_nodes[seg_starts], point_nodes[seg_starts + 1]]),
+        minlength=len(positions),
+    )
+
+    # Lines are only split at junctions (i.e. points whose node has a degree other than 2),
+    # and the resulting pieces are the actual edges of the graph. Piece i spans points
+    # boundaries[i] to boundaries[i + 1].
+    is_boundary = degrees[point_nodes] != 2
+    is_boundary[offsets[:-1]] = True
+    is_boundary[offsets[1:] - 1] = True
+    boundaries = np.flatnonzero(is_boundary)
+    (pieces,) = np.nonzero(is_segment[boundaries[:-1]])
+    piece_starts, piece_ends = boundaries[pieces], boundaries[pieces + 1]
+    piece_count = len(pieces)
+    edge_nodes = np.column_stack((point_nodes[piece_starts], point_nodes[piece_ends]))
+
+    odd = np.flatnonzero(degrees & 1)
+    edge_nodes = np.vstack([edge_nodes, _pair_odd_nodes(odd, positions)])
+
+    # walk the circuits, starting new strokes after virtual edges
+    stroke_edges: list[int] = []
+    entry_nodes: list[int] = []
+    stroke_firsts: list[bool] = []
+    for nodes, edges in _euler_circuits(edge_nodes, len(positions)):
+        virtual = [k for k, edge in enumerate(edges) if edge >= piece_count]
+        if virtual:
+            k = virtual[-1] + 1
+            edges = edges[k:] + edges[:k]
+            nodes = nodes[k:-1] + nodes[:k]
+
+        new_stroke = True
+        for edge, node in zip(edges, nodes):
+            if edge >= piece_count:
+                new_stroke = True
+            else:
+                stroke_edges.append(edge)
+                entry_nodes.append(node)
+                stroke_firsts.append(new_stroke)
+                new_stroke = False
+
+    # assemble the pieces, omitting their first point unless they start a stroke
+    edges_arr = np.array(stroke_edges, dtype=np.int64)
+    firsts = np.array(stroke_firsts, dtype=np.int64)
+    starts, ends = piece_starts[edges_arr], piece_ends[edges_arr]
+    forward = point_nodes[starts] == np.array(entry_nodes, dtype=np.int64)
+    counts = ends - starts + firsts
+    k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    indices = np.where(
+        np.repeat(forward, counts),
+        np.repeat(starts + 1 - firsts, counts) + k,
+        np.repeat(ends - 1 + firsts, counts) - k,
+    )
+    stroke_counts = np.bincount(np.cumsum(firsts) - 1, weights=counts).astype(np.int64)
+    new_offsets = np.zeros(len(stroke_counts) + 1, dtype=np.int64)
+    np.cumsum(stroke_counts, out=new_offsets[1:])
+
+    logging.info(
+        f"merge_line_graph: {len(lines)} lines merged into {len(stroke_counts)} strokes "
+        f"({piece_count} graph edges, {len(odd)} odd-degree nodes)"
+    )
+    result = LineCollection.from_arrays(
+        positions[point_nodes[indices]],
+        new_offsets,
+        metadata=lines.metadata,
+        dtype=lines.dtype,
+    )
+    if np.any(short):
+        result._extend_arrays(short_points, short_offsets)
+    return result
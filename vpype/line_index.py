@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import logging
+import math
 from collections.abc import Iterable
+from typing import cast
 
 import numpy as np
 from scipy.spatial import KDTree
@@ -10,12 +12,271 @@ from scipy.spatial import KDTree
 __all__ = ["LineIndex"]
 
 
+class _PointGrid:
+    """Dynamic spatial index of points based on a uniform grid hash.
+
+    Points are bucketed in a uniform grid whose cell size is chosen to hold a couple of points
+    on average. Each cell's live points are stored contiguously (in a single array, ordered by
+    cell), such that removing a point is a constant time swap with the cell's last live point.
+    The grid is rebuilt for the live points only when half of them have been removed, which
+    keeps the query cost bounded as points are removed, with an amortized linear rebuild
+    cost.
+
+    Nearest neighbor queries search a square window of cells around the query point, whose
+    size is doubled until a point is found closer than any point outside the window could be.
+    Batched queries are instead answered by a KD-tree, which is not updated on removal but
+    rebuilt once a fraction of its points have been removed.
+    """
+
+    _POINTS_PER_CELL = 2.0
+    _SMALL_WINDOW = 25
+
+    # fraction of removed points after which the KD-tree is rebuilt
+    _TREE_STALE_FRACTION = 0.25
+
+    # number of candidates queried from the KD-tree, among which removed points are skipped
+    _TREE_CANDIDATES = 8
+
+    def __init__(self, points: np.ndarray):
+        self._x = np.ascontiguousarray(points.real, dtype=float)
+        self._y = np.ascontiguousarray(points.imag, dtype=float)
+        self.count = len(points)
+        self._tree: tuple[KDTree, np.ndarray] | None = None
+        self._build(np.arange(len(points)))
+
+    def _build(self, items: np.ndarray) -> None:
+        self._built_count = len(items)
+        x, y = self._x[items], self._y[items]
+
+        if len(items) > 0:
+            self._x0, self._y0 = float(x.min()), float(y.min())
+            width = float(x.max()) - self._x0
+            height = float(y.max()) - self._y0
+        else:
+            self._x0 = self._y0 = width = height = 0.0
+
+        # cell size such that the grid has about len(items) / _POINTS_PER_CELL cells, and no
+        # more than a few times that when the points are (nearly) aligned
+        cell_count = max(len(items) / self._POINTS_PER_CELL, 1.0)
+        cell_size = max(
+            math.sqrt(width * height / cell_count), max(width, height) / cell_count
+        )
+        self._cell_size = cell_size if cell_size > 0 else 1.0
+        self._nx = int(width / self._cell_size) + 1
+        self._ny = int(height / self._cell_size) + 1
+
+        cells = self._cell_of(x, y)
+        order = np.argsort(cells, kind="stable")
+        self._order = items[order]
+        self._count = np.bincount(cells, minlength=self._nx * self._ny)
+        self._start = np.zeros_like(self._count)
+        np.cumsum(self._count[:-1], out=self._start[1:])
+        self._count2d = self._count.reshape(self._ny, self._nx)
+        self._start2d = self._start.reshape(self._ny, self._nx)
+        self._pos = np.full(len(self._x), -1, dtype=np.int64)
+        self._pos[self._order] = np.arange(len(self._order))
+        self._cells = np.full(len(self._x), -1, dtype=np.int64)
+        self._cells[items] = cells
+
+    def _cell_of(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        cx = np.clip(((x - self._x0) / self._cell_size).astype(np.int64), 0, self._nx - 1)
+        cy = np.clip(((y - self._y0) / self._cell_size).astype(np.int64), 0, self._ny - 1)
+        return cy * self._nx + cx
+
+    def remove(self, item: int) -> None:
+        """Remove a point from the index (the point must be present)."""
+
+        cell = self._cells[item]
+        pos = self._pos[item]
+        last_pos = self._start[cell] + self._count[cell] - 1
+        last_item = self._order[last_pos]
+        self._order[pos] = last_item
+        self._pos[last_item] = pos
+        self._order[last_pos] = item
+        self._pos[item] = -1
+        self._count[cell] -= 1
+        self.count -= 1
+
+        if self.count < self._built_count // 2:
+            self._build(self._order[self._pos[self._order] >= 0])
+
+    def remove_many(self, items: np.ndarray) -> None:
+        """Remove several distinct points from the index (the points must be present)."""
+
+        if len(items) == 0:
+            return
+
+        cells, removed = np.unique(self._cells[items], return_counts=True)
+        self._pos[items] = -1
+
+        # the affected cells are compacted such that their live points come first
+        counts = self._count[cells]
+        offsets = np.cumsum(counts) - counts
+        group = np.repeat(np.arange(len(cells)), counts)
+        slots = np.arange(len(group)) + np.repeat(self._start[cells] - offsets, counts)
+        cell_items = self._order[slots]
+        cell_items = cell_items[np.lexsort((self._pos[cell_items] < 0, group))]
+        self._order[slots] = cell_items
+        live = self._pos[cell_items] >= 0
+        self._pos[cell_items[live]] = slots[live]
+
+        self._count[cells] -= removed
+        self.count -= len(items)
+
+        if self.count < self._built_count // 2:
+            self._build(self._order[self._pos[self._order] >= 0])
+
+    def _window(self, cx0: int, cx1: int, cy0: int, cy1: int) -> np.ndarray:
+        """Returns the live points of a rectangular window of cells (bounds included)."""
+
+        counts = self._count2d[cy0 : cy1 + 1, cx0 : cx1 + 1].ravel()
+        starts = self._start2d[cy0 : cy1 + 1, cx0 : cx1 + 1].ravel()
+        if len(counts) <= self._SMALL_WINDOW:
+            # for small windows, slicing cell by cell has less overhead
+            chunks = [
+                self._order[start : start + count]
+                for start, count in zip(starts.tolist(), counts.tolist())
+                if count
+            ]
+            return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+        total = int(counts.sum())
+        offsets = np.cumsum(counts) - counts
+        return self._order[np.arange(total) + np.repeat(starts - offsets, counts)]
+
+    def _closest(self, items: np.ndarray, x: float, y: float) -> tuple[int, float]:
+        """Returns the closest item to (x, y), the lowest one in case of ties."""
+        dists = np.hypot(self._x[items] - x, self._y[items] - y)
+        i = int(np.argmin(dists))
+        dist = dists[i]
+        ties = items[dists == dist]
+        return int(ties.min() if len(ties) > 1 else items[i]), float(dist)
+
+    def nearest(self, p: complex, max_dist: float = math.inf) -> tuple[int | None, float]:
+        """Find the nearest live point, optionally within some maximum distance.
+
+        Returns:
+            tuple (item, dist), where item is None if no suitable point is found
+        """
+
+        if self.count == 0:
+            return None, math.inf
+
+        x, y = p.real, p.imag
+        cs = self._cell_size
+        fx = (x - self._x0) / cs
+        fy = (y - self._y0) / cs
+
+        if max_dist < math.inf:
+            # a single window is sufficient to cover the admissible area
+            cx0, cx1 = int(math.floor(fx - max_dist / cs)), int(math.floor(fx + max_dist / cs))
+            cy0, cy1 = int(math.floor(fy - max_dist / cs)), int(math.floor(fy + max_dist / cs))
+            if cx1 < 0 or cy1 < 0 or cx0 >= self._nx or cy0 >= self._ny:
+                return None, math.inf
+            items = self._window(
+                max(cx0, 0), min(cx1, self._nx - 1), max(cy0, 0), min(cy1, self._ny - 1)
+            )
+            if len(items) == 0:
+                return None, math.inf
+            item, dist = self._closest(items, x, y)
+            return (item, dist) if dist < max_dist else (None, math.inf)
+
+        # the query point may be outside the grid, in which case the window always includes
+        # the closest grid row and/or column
+        cx = min(max(int(math.floor(fx)), -1), self._nx)
+        cy = min(max(int(math.floor(fy)), -1), self._ny)
+        radius = 1
+        while True:
+            cx0, cx1 = max(cx - radius, 0), min(cx + radius, self._nx - 1)
+            cy0, cy1 = max(cy - radius, 0), min(cy + radius, self._ny - 1)
+
+            # any point outside the window is further away than this bound
+            bounds = []
+            if cx0 > 0:
+                bounds.append(fx - cx0)
+            if cx1 < self._nx - 1:
+                bounds.append(cx1 + 1 - fx)
+            if cy0 > 0:
+                bounds.append(fy - cy0)
+            if cy1 < self._ny - 1:
+                bounds.append(cy1 + 1 - fy)
+
+            items = self._window(cx0, cx1, cy0, cy1)
+            if len(items) > 0:
+                item, dist = self._closest(items, x, y)
+                if not bounds or dist <= min(bounds) * cs:
+                    return item, dist
+            elif not bounds:
+                return None, math.inf
+            radius *= 2
+
+    def nearest_many(
+        self, points: np.ndarray, max_dist: float = math.inf
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Find the nearest live point of each query point, optionally within some maximum
+        distance.
+
+        Batched queries are answered by a KD-tree of the points, which is built on demand. The
+        tree is kept as points are removed: the closest few candidates are queried and the
+        removed ones skipped, while queries whose candidates were all removed fall back to
+        :meth:`nearest`. The tree is rebuilt once a fraction of its points have been removed,
+        such that the rebuild cost is amortized over the removals.
+
+        Returns:
+            tuple (items, dists) of arrays, where items is -1 (and dist is infinite) if no
+            suitable point is found
+        """
+
+        points = np.asarray(points, dtype=complex).reshape(-1)
+        items = np.full(len(points), -1, dtype=np.int64)
+        result_dists = np.full(len(points), math.inf)
+        if self.count == 0 or len(points) == 0:
+            return items, result_dists
+
+        if self._tree is None or self.count < len(self._tree[1]) * (
+            1 - self._TREE_STALE_FRACTION
+        ):
+            live = np.flatnonzero(self._pos >= 0)
+            self._tree = KDTree(np.column_stack((self._x[live], self._y[live]))), live
+        tree, tree_items = self._tree
+
+        k = min(self._TREE_CANDIDATES, len(tree_items))
+        dists, idx = tree.query(
+            np.column_stack((points.real, points.imag)),
+            k=k,
+            distance_upper_bound=max_dist,
+        )
+        dists = dists.reshape(len(points), k)
+        candidates = tree_items[np.minimum(idx, len(tree_items) - 1)].reshape(len(points), k)
+
+        # the first live candidate within range is the nearest live point
+        valid = (dists < max_dist) & (self._pos[candidates] >= 0)
+        first = np.argmax(valid, axis=1)
+        found = valid[np.arange(len(points)), first]
+        items[found] = candidates[found, first[found]]
+        result_dists[found] = dists[found, first[found]]
+
+        # queries whose candidates are all removed but may have a live point further away
+        for i in np.flatnonzero(~found & (dists[:, -1] < max_dist)).tolist():
+            item, dist = self.nearest(complex(points[i]), max_dist)
+            if item is not None:
+                items[i] = item
+                result_dists[i] = dist
+
+        return items, result_dists
+
+
 class LineIndex:
-    """Wrapper to scipy.spatial.KDTree to facilitate systematic processing of a line
+    """Spatial index of line endings to facilitate systematic processing of a line
     collection.
 
-    Implementation note: we use the `available` bool array because deleting stuff from the
-    index is costly.
+    Line starts (and ends, if ``reverse`` is True) are stored in a dynamic spatial index from
+    which lines are actually removed when popped, such that the cost of queries remains
+    bounded as lines are processed. Line indices are stable for the lifetime of the index.
+
+    Besides single-point queries, batched variants (:meth:`find_nearest_many` and
+    :meth:`find_nearest_many_within`) answer queries for arrays of points in a single
+    vectorized call, and :meth:`pop_many` pops several lines at once.
     """
 
     def __init__(self, lines: Iterable[np.ndarray], reverse: bool = False):
@@ -26,26 +287,17 @@ class LineIndex:
     def _make_index(self) -> None:
         logging.info(f"LineIndex: creating index for {len(self.lines)} lines")
         self.available = np.ones(shape=len(self.lines), dtype=bool)
+        self._count = len(self.lines)
+        self._front = 0
 
-        # create rtree index
-        self.index = KDTree(
-            np.array([(line[0].real, line[0].imag) for line in self.lines]).reshape(-1, 2)
-        )
-
-        # create reverse index
+        # with reverse, item i is the start of line i and item i + n the end of line i
+        points = [line[0] for line in self.lines]
         if self.reverse:
-            self.rindex = KDTree(
-                np.array([(line[-1].real, line[-1].imag) for line in self.lines]).reshape(
-                    -1, 2
-                )
-            )
-
-    def _reindex(self) -> None:
-        self.lines = [line for idx, line in enumerate(self.lines) if self.available[idx]]
-        self._make_index()
+            points.extend(line[-1] for line in self.lines)
+        self._grid = _PointGrid(np.array(points, dtype=complex))
 
     def __len__(self) -> int:
-        return int(np.count_nonzero(self.available))
+        return self._count
 
     def __getitem__(self, item):
         return self.lines[item]
@@ -53,16 +305,47 @@ class LineIndex:
     def pop_front(self) -> np.ndarray:
         if len(self) == 0:
             raise RuntimeError
-        idx = int(np.argmax(self.available))
-        self.available[idx] = False
-        return self.lines[idx]
+        while not self.available[self._front]:
+            self._front += 1
+        return cast(np.ndarray, self.pop(self._front))
 
     def pop(self, idx: int) -> np.ndarray | None:
         if not self.available[idx]:
             return None
         self.available[idx] = False
+        self._count -= 1
+        self._grid.remove(idx)
+        if self.reverse:
+            self._grid.remove(idx + len(self.lines))
         return self.lines[idx]
 
+    def pop_many(self, indices: Iterable[int]) -> list[np.ndarray | None]:
+        """Pop several lines at once.
+
+        Args:
+            indices: indices of the lines to pop
+
+        Returns:
+            list of the popped lines, with None for lines which are not available (including
+            duplicated indices)
+        """
+
+        popped: list[np.ndarray | None] = []
+        items = []
+        for idx in indices:
+            if self.available[idx]:
+                self.available[idx] = False
+                items.append(idx)
+                popped.append(self.lines[idx])
+            else:
+                popped.append(None)
+
+        self._count -= len(items)
+        if self.reverse:
+            items.extend([idx + len(self.lines) for idx in items])
+        self._grid.remove_many(np.array(items, dtype=np.int64))
+        return popped
+
     def find_nearest_within(self, p: complex, max_dist: float) -> tuple[int | None, bool]:
         """Find the closest line, assuming a maximum admissible distance.
         Returns a tuple of (idx, reverse), where `idx` may be None if nothing is found.
@@ -70,91 +353,56 @@ class LineIndex:
         False is always returned if index was created with `reverse=False`.
         """
 
-        ridx = None
-        rdist: float | None = 0.0
-
-        while True:
-            reindex, idx, dist = self._find_nearest_within_in_index(p, max_dist, self.index)
-            if reindex:
-                self._reindex()
-                continue
-
-            if self.reverse:
-                reindex, ridx, rdist = self._find_nearest_within_in_index(
-                    p, max_dist, self.rindex
-                )
-                if reindex:
-                    self._reindex()
-                    continue
-            break
-
-        if self.reverse:
-            if idx is None and ridx is None:
-                return None, False
-            elif idx is not None and ridx is None:
-                return idx, False
-            elif idx is None and ridx is not None:
-                return ridx, True
-            elif rdist < dist:  # type: ignore
-                return ridx, True
-            else:
-                return idx, False
+        item, _ = self._grid.nearest(p, max_dist)
+        if item is None:
+            return None, False
+        elif item >= len(self.lines):
+            return item - len(self.lines), True
         else:
-            return idx, False
+            return item, False
 
-    def _find_nearest_within_in_index(
-        self, p: complex, max_dist: float, index: KDTree
-    ) -> tuple[bool, int | None, float | None]:
-        """Find nearest in specific index. Return (reindex, idx, dist) tuple, where
-        reindex indicates if a reindex is needed.
+    def find_nearest(self, p: complex) -> tuple[int, bool]:
+        """Find the closest line. The index must not be empty.
+        Returns a tuple of (idx, reverse), where `reverse` indicates whether or not a line
+        ending has been matched instead of a start.
         """
 
-        # For performance reason, we query only a max of k candidates. In the special case
-        # where all distances are not inf and none are available, we might have more than k
-        # suitable candidate, so we reindex and loop. Otherwise, we check the query results
-        # for availability and not inf and return anything found
-        dists, idxs = index.query((p.real, p.imag), k=50, distance_upper_bound=max_dist)
-        dists = np.array(dists)
+        idx, reverse = self.find_nearest_within(p, math.inf)
+        if idx is None:
+            raise RuntimeError("cannot find nearest line in empty index")
+        return idx, reverse
 
-        not_inf = ~np.isinf(dists)
-        if np.all(not_inf) and np.all(~self.available[idxs[not_inf]]):
-            return True, None, 0
+    def find_nearest_many_within(
+        self, points: np.ndarray, max_dist: float
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Batched version of :meth:`find_nearest_within`.
 
-        candidates = self.available[idxs[not_inf]]
+        Args:
+            points: 1D array of query points
+            max_dist: maximum admissible distance
 
-        if np.any(candidates):
-            idx = np.argmax(candidates)
-            return False, idxs[not_inf][idx], dists[not_inf][idx]
-        else:
-            return False, None, 0
-
-    # noinspection PyUnboundLocalVariable
-    def find_nearest(self, p: complex) -> tuple[int, bool]:
-        while True:
-            idx, dist = self._find_nearest_in_index(p, self.index)
-            if self.reverse:
-                ridx, rdist = self._find_nearest_in_index(p, self.rindex)
+        Returns:
+            tuple of arrays (idx, reverse, dist), with one item per query point, where `idx`
+            is -1 (and `dist` infinite) if nothing is found
+        """
 
-                if ridx is not None and idx is not None:
-                    break
-            elif idx is not None:
-                break
-            self._reindex()
+        items, dists = self._grid.nearest_many(points, max_dist)
+        reverse = items >= len(self.lines)
+        idx = np.where(reverse, items - len(self.lines), items)
+        return idx, reverse, dists
 
-        if self.reverse:
-            if rdist < dist:
-                return ridx, True  # type: ignore
-            else:
-                return idx, False
-        else:
-            return idx, False
+    def find_nearest_many(
+        self, points: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Batched version of :meth:`find_nearest`. The index must not be empty.
 
-    def _find_nearest_in_index(self, p: complex, index: KDTree) -> tuple[int | None, float]:
-        """Check the N nearest lines, hopefully find one that is active."""
+        Args:
+            points: 1D array of query points
 
-        dists, idxs = index.query((p.real, p.imag), k=100)
-        for dist, idx in zip(dists, idxs):
-            if ~np.isinf(dist) and self.available[idx]:
-                return idx, dist
+        Returns:
+            tuple of arrays (idx, reverse, dist), with one item per query point
+        """
 
-        return None, 0.0
+        if len(self) == 0:
+            raise RuntimeError("cannot find nearest line in empty index")
+        return self.find_nearest_many_within(points, math.inf)
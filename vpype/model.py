@@ -2,17 +2,21 @@
 
 from __future__ import annotations
 
+import collections
+import copy
+import functools
 import math
 import pathlib
-from collections.abc import Callable, Iterable, Iterator
+from collections.abc import Callable, Iterable, Iterator, Sequence
 from typing import Any, Union, cast
 
 import numpy as np
+import numpy.typing as npt
+from scipy.spatial import ConvexHull, KDTree, QhullError
 from shapely import GeometryCollection, MultiPoint, Point, Polygon
 from shapely.geometry import LinearRing, LineString, MultiLineString
 
-from .geometry import crop, reloop
-from .line_index import LineIndex
+from .geometry import _crop_packed, reloop
 from .metadata import (
     METADATA_FIELD_PAGE_SIZE,
     METADATA_FIELD_SOURCE,
@@ -27,6 +31,8 @@ __all__ = [
     "LineLike",
     "LineCollectionLike",
     "as_vector",
+    "get_default_dtype",
+    "set_default_dtype",
     "_MetadataMixin",  # for documentation
 ]
 
@@ -39,9 +45,260 @@ LineCollectionLike = Union[
 ]
 
 
+_default_dtype = np.dtype(np.complex128)
+
+
+def _as_geometry_dtype(dtype: npt.DTypeLike) -> np.dtype:
+    dtype = np.dtype(dtype)
+    if dtype not in (np.complex64, np.complex128):
+        raise ValueError(f"expected complex64 or complex128 dtype, got {dtype}")
+    return dtype
+
+
+def get_default_dtype() -> np.dtype:
+    """Returns the dtype used by default to store geometries (see :func:`set_default_dtype`).
+
+    Returns:
+        the default dtype (``complex128`` or ``complex64``)
+    """
+    return _default_dtype
+
+
+def set_default_dtype(dtype: npt.DTypeLike) -> None:
+    """Sets the dtype used by default to store geometries.
+
+    By default, points are stored with double precision (``complex128``). Single precision
+    (``complex64``) is more than sufficient for plotting purposes and halves the memory
+    usage. This setting applies to :class:`LineCollection` and :class:`Document` instances
+    created afterward, unless they are created with an explicit ``dtype``.
+
+    Args:
+        dtype: ``complex128`` or ``complex64``
+    """
+    global _default_dtype
+    _default_dtype = _as_geometry_dtype(dtype)
+
+
 def as_vector(a: np.ndarray):
     """Return a view of a complex line array that behaves as an Nx2 real array"""
-    return a.view(dtype=float).reshape(len(a), 2)
+    return a.view(dtype=a.real.dtype).reshape(len(a), 2)
+
+
+def _pack_lines(lines: Sequence[np.ndarray], dtype: np.dtype) -> tuple[np.ndarray, np.ndarray]:
+    """Pack a list of lines into a single point buffer and an offset array.
+
+    The offset array has ``len(lines) + 1`` items, such that line ``i`` corresponds to
+    ``points[offsets[i]:offsets[i + 1]]``.
+    """
+    offsets = np.zeros(len(lines) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, lines), dtype=np.int64, count=len(lines)), out=offsets[1:])
+    if lines:
+        points = np.concatenate(lines).astype(dtype, copy=False)
+    else:
+        points = np.empty(0, dtype=dtype)
+    return points, offsets
+
+
+def _drop_short_lines(
+    points: np.ndarray, offsets: np.ndarray
+) -> tuple[np.ndarray, np.ndarray]:
+    """Remove the lines with less than two points from packed buffers."""
+    lengths = np.diff(offsets)
+    keep = lengths >= 2
+    if not np.all(keep):
+        points = points[np.repeat(keep, lengths)]
+        offsets = np.zeros(np.count_nonzero(keep) + 1, dtype=np.int64)
+        np.cumsum(lengths[keep], out=offsets[1:])
+    return points, offsets
+
+
+def _read_only(array: np.ndarray) -> np.ndarray:
+    """Flag an array as read-only (e.g. before caching it) and return it."""
+    array.flags.writeable = False
+    return array
+
+
+def _reduce_lines(
+    ufunc: np.ufunc, values: np.ndarray, offsets: np.ndarray, empty: Any
+) -> np.ndarray:
+    """Reduce a per-point array for each line of a packed buffer with ``ufunc``.
+
+    Lines without points are assigned the ``empty`` value.
+    """
+    lengths = np.diff(offsets)
+    result = np.full(len(lengths), empty, dtype=values.dtype)
+    nonempty = lengths > 0
+    if np.any(nonempty):
+        result[nonempty] = ufunc.reduceat(values[: offsets[-1]], offsets[:-1][nonempty])
+    return result
+
+
+def _merge_chains(
+    starts: np.ndarray, ends: np.ndarray, tolerance: float, flip: bool
+) -> list[list[int]]:
+    """Compute the chains of lines to be merged.
+
+    Each line ``i`` has two endings, with ID ``2 * i`` for its start and ``2 * i + 1`` for its
+    end. All pairs of endings closer than ``tolerance`` are found with a single query to build
+    an adjacency graph of the endings, which is then walked to build chains. Starting from the
+    first unused line, a chain is extended at its end, or otherwise at its beginning, with
+    the unused line whose ending is the closest, until no line can be added. Without
+    ``flip``, the chain is not extended on a side whose closest ending would require flipping
+    a line. This reproduces the line-by-line search formerly done with :class:`LineIndex`.
+
+    Returns:
+        list of chains, each a list of the ending IDs by which each line is entered (a line
+        entered by its end must be flipped)
+    """
+    n = len(starts)
+    endings = np.empty(2 * n, dtype=complex)
+    endings[0::2] = starts
+    endings[1::2] = ends
+
+    pairs = KDTree(as_vector(endings)).query_pairs(tolerance, output_type="ndarray")
+    a, b = pairs[:, 0], pairs[:, 1]
+    dists = np.abs(endings[a] - endings[b])
+    valid = (dists < tolerance) & (a >> 1 != b >> 1)
+
+    # adjacency lists sorted by distance, then starts first, then by line index
+    src = np.concatenate([a[valid], b[valid]])
+    dst = np.concatenate([b[valid], a[valid]])
+    dists = np.concatenate([dists[valid], dists[valid]])
+    order = np.lexsort((dst >> 1, dst & 1, dists, src))
+    neighbors = dst[order].tolist()
+    stops = np.cumsum(np.bincount(src, minlength=2 * n)).tolist()
+    cursors = [0, *stops[:-1]]
+    used = [False] * n
+
+    def _closest(ending: int) -> int:
+        """Returns the closest ending of an unused line, or -1."""
+        i, stop = cursors[ending], stops[ending]
+        while i < stop and used[neighbors[i] >> 1]:
+            i += 1
+        cursors[ending] = i
+        return neighbors[i] if i < stop else -1
+
+    chains = []
+    for first in range(n):
+        if used[first]:
+            continue
+        used[first] = True
+        chain = collections.deque([2 * first])
+        head, tail = 2 * first, 2 * first + 1
+        while True:
+            # the tail must connect to a start and the head to an end, unless flipping
+            ending = _closest(tail)
+            if ending != -1 and (flip or ending & 1 == 0):
+                used[ending >> 1] = True
+                chain.append(ending)
+                tail = ending ^ 1
+                continue
+
+            ending = _closest(head)
+            if ending != -1 and (flip or ending & 1 == 1):
+                used[ending >> 1] = True
+                head = ending ^ 1
+                chain.appendleft(head)
+                continue
+
+            break
+        chains.append(list(chain))
+
+    return chains
+
+
+def _unpack_lines(points: np.ndarray, offsets: np.ndarray) -> list[np.ndarray]:
+    """Split a packed point buffer into a list of lines (as views into the buffer)."""
+    bounds = offsets.tolist()
+    return [points[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+def _as_affine_matrix(matrix: np.ndarray | Iterable[Iterable[float]]) -> np.ndarray:
+    """Validate an affine transform matrix and return it as a 2x3 array of float."""
+    matrix = np.asarray(matrix, dtype=float)
+    if matrix.shape not in ((2, 3), (3, 3)):
+        raise ValueError(f"expected a 2x3 or 3x3 affine matrix, got shape {matrix.shape}")
+    # copy, such that a pending transform is not affected by later changes to the argument
+    return np.array(matrix[:2], dtype=float)
+
+
+def _apply_affine(points: np.ndarray, matrix: np.ndarray) -> None:
+    """Apply a 2x3 affine transform in-place to a complex point buffer.
+
+    Pure scaling and rotation matrices are special-cased such that they are applied with the
+    same floating point operations as :meth:`LineCollection.scale` and
+    :meth:`LineCollection.rotate` used to.
+    """
+    (a, b, tx), (c, d, ty) = matrix.tolist()
+    if b == 0 and c == 0:
+        if a != 1:
+            points.real *= a
+        if d != 1:
+            points.imag *= d
+    elif a == d and b == -c:
+        points *= complex(a, c)
+    else:
+        x = points.real.copy()
+        if a != 1:
+            points.real *= a
+        points.real += b * points.imag
+        if d != 1:
+            points.imag *= d
+        points.imag += c * x
+
+    if tx != 0 or ty != 0:
+        points += complex(tx, ty)
+
+
+def _compose_affine(second: np.ndarray, first: np.ndarray) -> np.ndarray:
+    """Return the 2x3 matrix equivalent to applying ``first`` then ``second``."""
+    return second[:, :2] @ first + np.array([[0, 0, second[0, 2]], [0, 0, second[1, 2]]])
+
+
+def _flip_packed_lines(points: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Return a copy of a packed point buffer where each line's direction is flipped."""
+    line_ids = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+    idx = offsets[line_ids] + offsets[line_ids + 1] - 1 - np.arange(len(points))
+    return points[idx]
+
+
+class _LineList(list):
+    """List of lines which counts the modifications made to it.
+
+    The :attr:`version` counter is incremented by every method altering the list, which lets
+    :class:`LineCollection` detect changes made through its :attr:`LineCollection.lines`
+    attribute and invalidate its cached statistics accordingly.
+    """
+
+    version = 0
+
+
+def _make_versioned_method(name: str) -> Callable:
+    method = getattr(list, name)
+
+    @functools.wraps(method)
+    def versioned_method(self, *args, **kwargs):
+        self.version += 1
+        return method(self, *args, **kwargs)
+
+    return versioned_method
+
+
+for _name in (
+    "__setitem__",
+    "__delitem__",
+    "__iadd__",
+    "__imul__",
+    "append",
+    "extend",
+    "insert",
+    "pop",
+    "remove",
+    "clear",
+    "sort",
+    "reverse",
+):
+    setattr(_LineList, _name, _make_versioned_method(_name))
 
 
 class _MetadataMixin:
@@ -150,28 +407,285 @@ class LineCollection(_MetadataMixin):
     Finally, :py:class:`LineCollection` implements a number of operations such as geometrical
     transformation, cropping, merging, etc. (see member function documentation for details).
 
+    Derived statistics such as :meth:`bounds`, :meth:`length`, or :meth:`pen_up_length` are
+    cached and only recomputed when the geometry changes. Changes made through the methods of
+    this class or to the :attr:`lines` list itself (e.g. appending or replacing lines) are
+    tracked automatically. As line arrays obtained by iterating or indexing the collection may
+    be modified in-place, these accesses invalidate the cache as well::
+
+        >>> lc = vpype.LineCollection([[0, 1+1j]])
+        >>> lc.bounds()
+        (0.0, 0.0, 1.0, 1.0)
+        >>> for line in lc:
+        ...    line *= 2
+        ...
+        >>> lc.bounds()
+        (0.0, 0.0, 2.0, 2.0)
+
+    Code which keeps line arrays around and modifies them *after* calling other methods must
+    however call :meth:`invalidate` afterward.
+
+    For large collections, the lines may alternatively be stored in *packed* form, i.e. as a
+    single contiguous buffer containing the points of all lines and an array of offsets
+    delimiting each line within this buffer (see :meth:`pack` and :meth:`as_arrays`). This
+    drastically reduces the memory overhead per line and lets whole-layer operations run as
+    single Numpy calls. The storage is switched back to a list of arrays whenever the
+    :attr:`lines` attribute is accessed, so the sequence API above works regardless of the
+    storage in use::
+
+        >>> lc = vpype.LineCollection([[0, 1+1j], [2, 3, 4j]])
+        >>> lc.pack()
+        >>> lc.is_packed
+        True
+        >>> points, offsets = lc.as_arrays()
+        >>> offsets
+        array([0, 2, 5])
+
+    Points are stored as ``complex128`` by default. Single precision (``complex64``) may be
+    used instead to halve memory usage, either by passing ``dtype`` or by changing the default
+    with :func:`set_default_dtype`. Lines added to the collection are converted to its dtype::
+
+        >>> lc = vpype.LineCollection([[0, 1+1j]], dtype=np.complex64)
+        >>> lc[0].dtype
+        dtype('complex64')
+
     Args:
         lines (LineCollectionLike): iterable of line (accepts the same input as
             :func:`~LineCollection.append`).
         metadata: if provided, used as layer metadata
+        dtype: dtype of the points (``complex128`` or ``complex64``), defaults to
+            :func:`get_default_dtype`
     """
 
-    def __init__(self, lines: LineCollectionLike = (), metadata: dict[str, Any] | None = None):
+    def __init__(
+        self,
+        lines: LineCollectionLike = (),
+        metadata: dict[str, Any] | None = None,
+        dtype: npt.DTypeLike | None = None,
+    ):
         """Create a LineCollection instance from an iterable of lines."""
         super().__init__(metadata)
 
-        self._lines: list[np.ndarray] = []
+        self._dtype = _default_dtype if dtype is None else _as_geometry_dtype(dtype)
+
+        # Lines are stored either as a list of arrays (``_lines``) or, in packed form, as a
+        # single point buffer and an offset array (``_packed``). Exactly one of them is set.
+        self._lines: _LineList = _LineList()
+        self._packed: tuple[np.ndarray, np.ndarray] | None = None
+
+        # affine transform (2x3 matrix) not yet applied to the stored points
+        self._transform: np.ndarray | None = None
+
+        # Statistics derived from the stored points are cached in `_cache`, which is valid as
+        # long as `_cache_key` matches `_version_key()`. `_version` must be incremented
+        # whenever the stored points may change, in addition to `_lines`'s own counter.
+        self._version = 0
+        self._cache: dict[str, Any] = {}
+        self._cache_key: tuple[int, int] | None = None
+
+        # True if the stored arrays may be shared with other collections, in which case they
+        # must be copied before being handed out for modification (see `_detach()`).
+        self._shared = False
+
+        # buffers with spare capacity backing the packed storage (see `_extend_packed()`)
+        self._spare: tuple[np.ndarray, np.ndarray] | None = None
+
         self.extend(lines)
 
     @property
     def lines(self) -> list[np.ndarray]:
         """Returns the list of line.
 
+        If the collection is packed, it is converted back to list storage, with lines being
+        views into the packed buffer. Any pending transform is applied beforehand. Lines shared
+        with other collections are copied, so that the returned arrays may safely be modified
+        in-place.
+
         Returns:
             list of line
         """
+        self._stored_lines()
+        self._detach()
+        return self._lines
+
+    def _stored_lines(self) -> _LineList:
+        """Returns the list of lines, switching to list storage if needed but without
+        copying shared lines.
+        """
+        self._apply_transform()
+        if self._packed is not None:
+            self._switch_storage(_unpack_lines(*self._packed), None)
         return self._lines
 
+    @property
+    def is_packed(self) -> bool:
+        """True if the lines are currently stored in packed form."""
+        return self._packed is not None
+
+    def pack(self) -> None:
+        """Convert the internal storage to the packed form.
+
+        All the points are copied into a single contiguous buffer. This is a no-op if the
+        collection is already packed.
+        """
+        if self._packed is None:
+            self._switch_storage([], _pack_lines(self._lines, self._dtype))
+            self._shared = False
+
+    def as_arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the collection's content as a point buffer and an offset array.
+
+        The point buffer is a 1D array of complex containing the points of all lines, one
+        after the other. The offset array is a 1D array of ``len(self) + 1`` integers, such
+        that line ``i`` is ``points[offsets[i]:offsets[i + 1]]``.
+
+        If the collection is packed, its internal buffers are returned, otherwise they are
+        computed without altering the storage. Any pending transform is applied beforehand.
+        The returned buffers may be shared with other collections and must not be modified.
+
+        Returns:
+            tuple (points, offsets)
+        """
+        self._apply_transform()
+        return self._stored_arrays()
+
+    def _stored_arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        """Returns the stored points and offsets, disregarding any pending transform."""
+        if self._packed is not None:
+            return self._packed
+        return _pack_lines(self._lines, self._dtype)
+
+    @property
+    def dtype(self) -> np.dtype:
+        """dtype of the points (``complex128`` or ``complex64``)."""
+        return self._dtype
+
+    def set_dtype(self, dtype: npt.DTypeLike) -> None:
+        """Convert the points to another dtype.
+
+        The collection is packed (see :meth:`pack`) if the dtype is changed.
+
+        Args:
+            dtype: ``complex128`` or ``complex64``
+        """
+        dtype = _as_geometry_dtype(dtype)
+        if dtype != self._dtype:
+            # the pending transform is applied with the current precision
+            self._apply_transform()
+            self.pack()
+            self._dtype = dtype
+            points, offsets = cast(tuple[np.ndarray, np.ndarray], self._packed)
+            self._packed = (points.astype(dtype, copy=False), offsets)
+            self._shared = False
+            self._version += 1
+
+    @property
+    def has_pending_transform(self) -> bool:
+        """True if an affine transform is pending, i.e. not yet applied to the points."""
+        return self._transform is not None
+
+    def _apply_transform(self) -> None:
+        """Apply the pending transform, if any, to the stored points."""
+        if self._transform is not None:
+            matrix = self._transform
+            self._transform = None
+            self.pack()
+            points, offsets = cast(tuple[np.ndarray, np.ndarray], self._packed)
+            if self._shared:
+                points = points.copy()
+                self._packed = (points, offsets)
+                self._shared = False
+            _apply_affine(points, matrix)
+            self._version += 1
+
+    def _share(self) -> None:
+        """Mark the stored arrays as shared with other collections.
+
+        Collections sharing arrays implement copy-on-write: the arrays are copied before any
+        modification, either by :meth:`_apply_transform` or by :meth:`_detach` when the lines
+        are accessed.
+        """
+        self._shared = True
+
+    def _detach(self) -> None:
+        """Prepare the stored arrays for in-place modification by the caller.
+
+        Shared arrays are copied beforehand, so that other collections are not affected. As
+        the caller may alter the points, the cached statistics are invalidated.
+        """
+        if self._shared:
+            if self._packed is not None:
+                points, offsets = self._packed
+                self._switch_storage([], (points.copy(), offsets.copy()))
+            else:
+                self._switch_storage([line.copy() for line in self._lines], None)
+            self._shared = False
+        self._version += 1
+
+    def _iter_lines(self) -> Iterator[np.ndarray]:
+        """Iterate over the lines without detaching shared arrays, for read-only use."""
+        self._apply_transform()
+        if self._packed is not None:
+            return iter(_unpack_lines(*self._packed))
+        return iter(self._lines)
+
+    def _share_storage(self, other: LineCollection) -> None:
+        """Replace the content with the one of another collection, sharing its storage."""
+        other._share()
+        cache_valid = other._cache_key == other._version_key()
+        self._lines = _LineList(other._lines)
+        self._packed = other._packed
+        self._transform = other._transform
+        self._shared = True
+        self._version += 1
+        if cache_valid:
+            self._cache = dict(other._cache)
+            self._cache_key = self._version_key()
+
+    def __getstate__(self) -> dict[str, Any]:
+        # the spare capacity is not worth serializing
+        return {**self.__dict__, "_spare": None}
+
+    def __deepcopy__(self, memo: dict[int, Any]) -> LineCollection:
+        # the geometry is shared with copy-on-write semantics instead of being copied
+        lc = LineCollection(metadata=copy.deepcopy(self.metadata, memo), dtype=self._dtype)
+        lc._share_storage(self)
+        return lc
+
+    def _version_key(self) -> tuple[int, int]:
+        return self._version, self._lines.version
+
+    def _cached(self, name: str, compute: Callable[[], Any]) -> Any:
+        """Returns a cached statistic of the stored points, computing it if needed."""
+        key = self._version_key()
+        if key != self._cache_key:
+            self._cache = {}
+            self._cache_key = key
+        if name not in self._cache:
+            self._cache[name] = compute()
+        return self._cache[name]
+
+    def _switch_storage(
+        self, lines: list[np.ndarray], packed: tuple[np.ndarray, np.ndarray] | None
+    ) -> None:
+        """Replace the storage by an equivalent one, retaining the cached statistics."""
+        cache_valid = self._cache_key == self._version_key()
+        self._lines = _LineList(lines)
+        self._packed = packed
+        self._version += 1
+        if cache_valid:
+            self._cache_key = self._version_key()
+
+    def invalidate(self) -> None:
+        """Invalidate the cached statistics.
+
+        This must be called after modifying the lines' points in-place through arrays obtained
+        before the last call to another method of the collection. Other modifications (through
+        this class' methods, the :attr:`lines` list, or arrays obtained by iterating or
+        indexing the collection) are detected automatically.
+        """
+        self._version += 1
+
     def clone(self, lines: LineCollectionLike = ()) -> LineCollection:
         """Creates a new :class:`LineCollection` with the same metadata.
 
@@ -184,7 +698,68 @@ class LineCollection(_MetadataMixin):
         Returns:
             the new :class:`LineCollection` instance
         """
-        return LineCollection(lines=lines, metadata=self.metadata)
+        return LineCollection(lines=lines, metadata=self.metadata, dtype=self._dtype)
+
+    @classmethod
+    def from_arrays(
+        cls,
+        points: npt.ArrayLike,
+        offsets: npt.ArrayLike,
+        metadata: dict[str, Any] | None = None,
+        dtype: npt.DTypeLike | None = None,
+    ) -> LineCollection:
+        """Create a :class:`LineCollection` from a point buffer and an offset array.
+
+        This is the most efficient way to create large collections, as the points are copied
+        once into the collection's packed storage (see :meth:`as_arrays` for the format)::
+
+            >>> import vpype
+            >>> lc = vpype.LineCollection.from_arrays([0, 1, 1+1j, 2j, 3j], [0, 3, 5])
+            >>> lc
+            LineCollection([array([0.+0.j, 1.+0.j, 1.+1.j]), array([0.+2.j, 0.+3.j])])
+
+        The points may be provided either as a 1D array of complex or as a Nx2 array of
+        floats. As with :meth:`append`, lines with less than two points are discarded.
+
+        Args:
+            points: 1D array of complex or Nx2 array of floats containing all the points
+            offsets: array of ``len(lines) + 1`` integers such that line ``i`` is
+                ``points[offsets[i]:offsets[i + 1]]``
+            metadata: if provided, used as layer metadata
+            dtype: dtype of the points (``complex128`` or ``complex64``), defaults to
+                :func:`get_default_dtype`
+
+        Returns:
+            the new :class:`LineCollection` instance
+        """
+        lc = cls(metadata=metadata, dtype=dtype)
+
+        points = np.asarray(points)
+        if points.ndim == 2 and points.shape[1] == 2 and not np.iscomplexobj(points):
+            # copy as a contiguous buffer whose rows can be viewed as complex numbers
+            points = np.array(points, dtype=np.finfo(lc._dtype).dtype, order="C")
+            points = points.view(lc._dtype).reshape(-1)
+        elif points.ndim == 1:
+            points = np.array(points, dtype=lc._dtype)
+        else:
+            raise ValueError(f"expected a 1D complex or Nx2 float array, got {points.shape}")
+
+        offsets = np.asarray(offsets)
+        if (
+            offsets.ndim != 1
+            or len(offsets) == 0
+            or not np.issubdtype(offsets.dtype, np.integer)
+            or offsets[0] != 0
+            or offsets[-1] != len(points)
+            or np.any(np.diff(offsets) < 0)
+        ):
+            raise ValueError(
+                "offsets must be a non-decreasing array of integers starting at 0 and ending "
+                "with the number of points"
+            )
+
+        lc._extend_arrays(*_drop_short_lines(points, offsets.astype(np.int64)))
+        return lc
 
     def append(self, line: LineLike) -> None:
         """Append a single line.
@@ -197,11 +772,12 @@ class LineCollection(_MetadataMixin):
         """
         if isinstance(line, LineString | LinearRing):
             # noinspection PyTypeChecker
-            self._lines.append(np.array(line.coords).view(dtype=complex).reshape(-1))
+            line = np.array(line.coords).view(dtype=complex).reshape(-1)
+            self._stored_lines().append(line.astype(self._dtype, copy=False))
         else:
-            line = np.array(line, dtype=complex).reshape(-1)
+            line = np.array(line, dtype=self._dtype).reshape(-1)
             if len(line) > 1:
-                self._lines.append(line)
+                self._stored_lines().append(line)
 
     def extend(self, lines: LineCollectionLike) -> None:
         """Append lines from a collection.
@@ -214,6 +790,9 @@ class LineCollection(_MetadataMixin):
         actually expected. As a result, they are accepted as input even though they are not,
         strictly speaking, a line collection.
 
+        The lines of another :py:class:`LineCollection` are not copied but shared with
+        copy-on-write semantics.
+
         Args:
             lines (LineCollectionLike): lines to append
         """
@@ -221,6 +800,50 @@ class LineCollection(_MetadataMixin):
         if hasattr(lines, "geom_type") and lines.is_empty:  # type: ignore
             return
 
+        self._apply_transform()
+
+        if isinstance(lines, LineCollection):
+            if lines is self:
+                lines = list(lines)
+            elif lines.dtype != self._dtype:
+                points, offsets = lines.as_arrays()
+                self._extend_arrays(points.astype(self._dtype), offsets)
+                return
+            elif len(self) == 0:
+                self._share_storage(lines)
+                return
+            elif lines.is_packed and self._packed is not None:
+                # packed collections are concatenated in a single operation
+                self._extend_packed(*lines.as_arrays())
+                return
+            else:
+                lines._apply_transform()
+                lines._share()
+                self._stored_lines().extend(lines._iter_lines())
+                self._shared = True
+                return
+
+        # bulk paths for a 2D complex array (one line per row) and for a list of 1D arrays
+        # already of the proper dtype
+        if isinstance(lines, np.ndarray) and lines.ndim == 2 and np.iscomplexobj(lines):
+            count, length = lines.shape
+            if length > 1:
+                self._extend_arrays(
+                    np.array(lines, dtype=self._dtype).reshape(-1),
+                    np.arange(0, count * length + 1, length, dtype=np.int64),
+                )
+            return
+        elif (
+            isinstance(lines, list | tuple)
+            and lines
+            and all(
+                isinstance(line, np.ndarray) and line.ndim == 1 and line.dtype == self._dtype
+                for line in lines
+            )
+        ):
+            self._extend_arrays(*_drop_short_lines(*_pack_lines(lines, self._dtype)))
+            return
+
         # handle shapely objects
         if isinstance(lines, GeometryCollection):
             for geom in lines.geoms:
@@ -237,6 +860,74 @@ class LineCollection(_MetadataMixin):
         for line in lines:
             self.append(line)
 
+    def _extend_arrays(self, points: np.ndarray, offsets: np.ndarray) -> None:
+        """Append lines from packed buffers which are owned by the collection, with the
+        collection's dtype.
+        """
+        if len(self) == 0:
+            self._set_packed(points, offsets, shared=False)
+        elif self._packed is not None:
+            self._extend_packed(points, offsets)
+        else:
+            self._stored_lines().extend(_unpack_lines(points, offsets))
+
+    def _extend_packed(self, points: np.ndarray, offsets: np.ndarray) -> None:
+        """Append packed lines to the packed storage.
+
+        The packed buffers are allocated with spare capacity, such that repeated extensions
+        run in amortized linear time. The spare capacity is only used while the packed buffers
+        are prefixes of the allocated ones and are not shared with other collections.
+        """
+        own_points, own_offsets = cast(tuple[np.ndarray, np.ndarray], self._packed)
+        point_count = len(own_points) + len(points)
+        offset_count = len(own_offsets) + len(offsets) - 1
+
+        spare = self._spare
+        if (
+            spare is None
+            or self._shared
+            or own_points.base is not spare[0]
+            or own_offsets.base is not spare[1]
+            or len(spare[0]) < point_count
+            or len(spare[1]) < offset_count
+        ):
+            spare = (
+                np.empty(2 * point_count, dtype=self._dtype),
+                np.empty(2 * offset_count, dtype=np.int64),
+            )
+            spare[0][: len(own_points)] = own_points
+            spare[1][: len(own_offsets)] = own_offsets
+            self._spare = spare
+
+        spare[0][len(own_points) : point_count] = points
+        spare[1][len(own_offsets) : offset_count] = offsets[1:] + own_offsets[-1]
+        self._packed = (spare[0][:point_count], spare[1][:offset_count])
+        self._shared = False
+        self._version += 1
+
+    def _set_packed(self, points: np.ndarray, offsets: np.ndarray, shared: bool) -> None:
+        """Replace the content with packed buffers, which are used without copy.
+
+        If ``shared`` is True, the buffers are copied before any modification (see
+        :meth:`_share`).
+        """
+        self._lines = _LineList()
+        self._packed = (points.astype(self._dtype, copy=False), offsets)
+        self._transform = None
+        self._shared = False
+        if shared:
+            self._share()
+        self._version += 1
+
+    def _set_lines(self, lines: list[np.ndarray]) -> None:
+        """Replace the content with a list of lines, switching to list storage."""
+        self._lines = _LineList(
+            line if line.dtype == self._dtype else line.astype(self._dtype) for line in lines
+        )
+        self._packed = None
+        self._transform = None
+        self._version += 1
+
     def is_empty(self) -> bool:
         """Check for emptiness.
 
@@ -247,30 +938,64 @@ class LineCollection(_MetadataMixin):
 
     def reverse(self) -> None:
         """Reverse order of the lines."""
-        self._lines = list(reversed(self._lines))
+        if self._packed is not None:
+            # flipping the whole buffer reverses both the line order and their direction
+            points, offsets = self._packed
+            offsets = offsets[-1] - np.flip(offsets)
+            self._packed = (_flip_packed_lines(np.flip(points), offsets), offsets)
+            self._version += 1
+        else:
+            self._lines = _LineList(reversed(self._lines))
+            self._version += 1
 
     def flip_lines(self) -> None:
         """Flip the direction of all lines."""
-        self._lines = [np.flip(line) for line in self._lines]
+        if self._packed is not None:
+            points, offsets = self._packed
+            self._packed = (_flip_packed_lines(points, offsets), offsets)
+            self._version += 1
+        else:
+            self._lines = _LineList(np.flip(line) for line in self._lines)
+            self._version += 1
 
     def __iter__(self):
-        return self._lines.__iter__()
+        self._apply_transform()
+        self._detach()
+        return self._iter_lines()
 
     def __len__(self) -> int:
+        if self._packed is not None:
+            return len(self._packed[1]) - 1
         return len(self._lines)
 
     def __getitem__(self, item: int | slice):
+        self._apply_transform()
+        self._detach()
+        if self._packed is not None:
+            points, offsets = self._packed
+            if isinstance(item, slice):
+                starts = offsets[:-1][item].tolist()
+                stops = offsets[1:][item].tolist()
+                return [points[start:stop] for start, stop in zip(starts, stops)]
+            item = range(len(offsets) - 1)[item]
+            return points[offsets[item] : offsets[item + 1]]
         return self._lines[item]
 
     def __repr__(self):
-        return f"LineCollection({self._lines})"
+        return f"LineCollection({list(self._iter_lines())})"
 
     def __eq__(self, other: object) -> bool:
         if isinstance(other, LineCollection):
-            return (
-                len(self) == len(other)
-                and self.metadata == other.metadata
-                and all(np.array_equal(a, b) for a, b in zip(self, other))
+            if len(self) != len(other) or self.metadata != other.metadata:
+                return False
+            if self.is_packed and other.is_packed:
+                points, offsets = self.as_arrays()
+                other_points, other_offsets = other.as_arrays()
+                return np.array_equal(offsets, other_offsets) and np.array_equal(
+                    points, other_points
+                )
+            return all(
+                np.array_equal(a, b) for a, b in zip(self._iter_lines(), other._iter_lines())
             )
         else:
             return NotImplemented
@@ -281,7 +1006,39 @@ class LineCollection(_MetadataMixin):
         Returns:
             a MultiLineString Shapely object
         """
-        return MultiLineString([as_vector(line) for line in self.lines])
+        return MultiLineString([as_vector(line) for line in self._iter_lines()])
+
+    def transform(self, matrix: np.ndarray | Iterable[Iterable[float]]) -> None:
+        """Apply an affine transform to the geometry.
+
+        The transform is expressed as a 2x3 matrix ``[[a, b, tx], [c, d, ty]]``, which maps
+        point ``(x, y)`` to ``(a * x + b * y + tx, c * x + d * y + ty)``. A 3x3 matrix in
+        homogeneous coordinates is accepted as well, in which case its last row is ignored::
+
+            >>> import math, vpype
+            >>> lc = vpype.LineCollection([(0, 1+1j)])
+            >>> lc.transform([[2, 0, 10], [0, 3, 0]])
+            >>> lc
+            LineCollection([array([10.+0.j, 12.+3.j])])
+
+        The transform is applied lazily: it is composed with any pending transform in
+        constant time, and the resulting transform is applied to all points in a single,
+        vectorized pass the next time the coordinates are accessed (e.g. by iterating over
+        the collection, accessing :attr:`lines`, cropping, etc.). The collection is packed
+        (see :meth:`pack`) at that time. :meth:`bounds` does not trigger the application of
+        pending transforms.
+
+        All other transform methods (:meth:`translate`, :meth:`scale`, etc.) are implemented
+        in terms of this method.
+
+        Args:
+            matrix: 2x3 (or 3x3) affine transform matrix
+        """
+        matrix = _as_affine_matrix(matrix)
+        if self._transform is None:
+            self._transform = matrix
+        else:
+            self._transform = _compose_affine(matrix, self._transform)
 
     def translate(self, dx: float, dy: float) -> None:
         """Translates all line by a given offset.
@@ -290,9 +1047,7 @@ class LineCollection(_MetadataMixin):
             dx: offset along X axis
             dy: offset along Y axis
         """
-        c = complex(dx, dy)
-        for line in self._lines:
-            line += c
+        self.transform([[1, 0, dx], [0, 1, dy]])
 
     def scale(self, sx: float, sy: float | None = None) -> None:
         """Scale the geometry.
@@ -316,9 +1071,7 @@ class LineCollection(_MetadataMixin):
         if sy is None:
             sy = sx
 
-        for line in self._lines:
-            line.real *= sx
-            line.imag *= sy
+        self.transform([[sx, 0, 0], [0, sy, 0]])
 
     def rotate(self, angle: float) -> None:
         """Rotates the geometry by ``angle`` amount.
@@ -338,9 +1091,8 @@ class LineCollection(_MetadataMixin):
         Args:
             angle: rotation angle in rad
         """
-        c = complex(math.cos(angle), math.sin(angle))
-        for line in self._lines:
-            line *= c
+        c, s = math.cos(angle), math.sin(angle)
+        self.transform([[c, -s, 0], [s, c, 0]])
 
     def skew(self, ax: float, ay: float) -> None:
         """Skew the geometry by some angular amounts along X and Y axes.
@@ -361,9 +1113,7 @@ class LineCollection(_MetadataMixin):
             ax: skew angle in rad along X axis
             ay: skew angle in rad along Y axis
         """
-        tx, ty = math.tan(ax), math.tan(ay)
-        for line in self._lines:
-            line += tx * line.imag + 1j * ty * line.real
+        self.transform([[1, math.tan(ax), 0], [math.tan(ay), 1, 0]])
 
     def reloop(self, tolerance: float) -> None:
         """Randomizes the seam of closed paths. Paths are considered closed when their first
@@ -372,10 +1122,11 @@ class LineCollection(_MetadataMixin):
         :param tolerance: tolerance to determine if a path is closed
         """
 
-        for i, line in enumerate(self._lines):
-            delta = line[-1] - line[0]
-            if np.hypot(delta.real, delta.imag) <= tolerance:
-                self._lines[i] = reloop(line)
+        closed = np.flatnonzero(self.line_closed(tolerance)).tolist()
+        if closed:
+            lines = self.lines
+            for i in closed:
+                self._lines[i] = reloop(lines[i])
 
     def crop(self, x1: float, y1: float, x2: float, y2: float) -> None:  # noqa: D417
         """Crop all lines to a rectangular area.
@@ -391,12 +1142,26 @@ class LineCollection(_MetadataMixin):
             y1, y2 = y2, y1
 
         if x1 == x2 or y1 == y2:
-            self._lines = []
+            self._set_lines([])
+            return
+
+        points, offsets = self.as_arrays()
+        inside, crop_points, crop_offsets, line_ids = _crop_packed(
+            points, offsets, x1, y1, x2, y2
+        )
+
+        # lines fully inside the crop area are kept without copy
+        if self._packed is None:
+            lines = [self._lines[i] for i in inside.tolist()]
         else:
-            new_lines = []
-            for line in self._lines:
-                new_lines.extend(crop(line, x1, y1, x2, y2))
-            self._lines = new_lines
+            bounds = offsets.tolist()
+            lines = [points[bounds[i] : bounds[i + 1]] for i in inside.tolist()]
+
+        if len(line_ids) > 0:
+            lines.extend(_unpack_lines(crop_points, crop_offsets))
+            order = np.argsort(np.concatenate([inside, line_ids]), kind="stable")
+            lines = [lines[i] for i in order.tolist()]
+        self._set_lines(lines)
 
     def circle_crop(self, x: float, y: float, r: float, quantization: float = 0.1) -> None:
         """Crop all lines to a circular area.
@@ -408,26 +1173,52 @@ class LineCollection(_MetadataMixin):
             quantization: maximum length of linear segment for the cropping circle
         """
         if r <= 0:
-            self._lines = []
+            self._set_lines([])
         else:
             mls = self.as_mls()
             cropping_circle = Polygon(as_vector(circle(x, y, r, quantization)))
             intersection = mls.intersection(cropping_circle)
 
-            self._lines = []
+            self._set_lines([])
             self.extend(intersection)
 
-    def filter(self, key: Callable[[np.ndarray], bool]) -> None:
+    def filter(self, key: Callable[[np.ndarray], bool] | npt.ArrayLike) -> None:
         """Remove lines from the :class:`LineCollection` for which key returns False.
 
+        Instead of a callable, a boolean mask with one item per line may be provided, which
+        is typically built from the per-line metrics (e.g. :meth:`line_lengths`)::
+
+            >>> import vpype
+            >>> lc = vpype.LineCollection([(0, 10), (0, 1j)])
+            >>> lc.filter(lc.line_lengths() > 5)
+            >>> len(lc)
+            1
+
         Args:
-            key: filter (returns True if the line should be kept or False otherwise)
+            key: filter (returns True if the line should be kept or False otherwise), or
+                boolean mask of the lines to keep
         """
-        self._lines = [line for line in self._lines if key(line)]
+        if callable(key):
+            self._set_lines([line for line in self._iter_lines() if key(line)])
+            return
+
+        mask = np.asarray(key, dtype=bool)
+        if mask.shape != (len(self),):
+            raise ValueError(
+                f"expected a mask of shape ({len(self)},), got shape {mask.shape} instead"
+            )
+        lines = list(self._iter_lines())
+        self._set_lines([lines[i] for i in np.flatnonzero(mask).tolist()])
 
     def merge(self, tolerance: float, flip: bool = True) -> None:
         """Merge lines whose endings overlap or are very close.
 
+        Starting with the first line, lines are repeatedly appended (or otherwise prepended)
+        to the current one if their closest ending is within ``tolerance``, until no more line
+        can be added. The next remaining line is then processed likewise. The pairs of close
+        line endings are found with a single query and the merged lines are assembled in a
+        single pass.
+
         Args:
             tolerance: max distance between line ending that may be merged
             flip: allow flipping line direction for further merging
@@ -435,47 +1226,36 @@ class LineCollection(_MetadataMixin):
         if len(self) < 2:
             return
 
-        # prepending with flip=False requires that we index line endings as well
-        index = LineIndex(self.lines, reverse=True)
-        new_lines = LineCollection()
-
-        def _merge_line(
-            line: np.ndarray, idx: int, *, reverse=False, prepend=False
-        ) -> np.ndarray:
-            """Append or prepend a line from the index to `line`, optionally reversing it
-            beforehand.
-            """
-            new_line = cast(np.ndarray, index.pop(idx))
-            if reverse:
-                new_line = np.flip(new_line)
-            if prepend:
-                return np.hstack([new_line, line])
-            else:
-                return np.hstack([line, new_line])
-
-        while len(index) > 0:
-            line = index.pop_front()
-
-            # we append to `line` until we dont find anything to add
-            while True:
-                # try appending
-                idx, reverse = index.find_nearest_within(line[-1], tolerance)
-                if idx is not None and (not reverse or flip):
-                    line = _merge_line(line, idx, reverse=reverse)
-                    continue
-
-                # try pre-pending
-                idx, reverse = index.find_nearest_within(line[0], tolerance)
-                if idx is not None and (reverse or flip):
-                    line = _merge_line(line, idx, prepend=True, reverse=not reverse)
-                    continue
-
-                # if everything fails we break from the loop and store the line as is
-                break
-
-            new_lines.append(line)
+        points, offsets = self.as_arrays()
+        (line_ids,) = np.nonzero(self.line_point_counts() > 0)
+        chains = _merge_chains(
+            self.line_starts()[line_ids], self.line_ends()[line_ids], tolerance, flip
+        )
 
-        self._lines = new_lines._lines
+        # entering a line by its start (even ID) or its end (odd ID)
+        entries = np.fromiter(
+            (entry for chain in chains for entry in chain),
+            dtype=np.int64,
+            count=len(line_ids),
+        )
+        entry_lines = line_ids[entries >> 1]
+        starts = offsets[entry_lines]
+        lengths = offsets[entry_lines + 1] - starts
+        piece_offsets = np.zeros(len(entries) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=piece_offsets[1:])
+
+        k = np.arange(piece_offsets[-1]) - np.repeat(piece_offsets[:-1], lengths)
+        k = np.where(
+            np.repeat(entries & 1, lengths).astype(bool),
+            np.repeat(lengths - 1, lengths) - k,
+            k,
+        )
+        chain_lengths = np.fromiter(map(len, chains), dtype=np.int64, count=len(chains))
+        chain_offsets = np.zeros(len(chains) + 1, dtype=np.int64)
+        np.cumsum(chain_lengths, out=chain_offsets[1:])
+        self._set_packed(
+            points[np.repeat(starts, lengths) + k], piece_offsets[chain_offsets], shared=False
+        )
 
     def bounds(self) -> tuple[float, float, float, float] | None:
         """Returns the geometries' bounding box.
@@ -484,15 +1264,59 @@ class LineCollection(_MetadataMixin):
             tuple (xmin, ymin, xmax, ymax) for the bounding box or None if the LineCollection
             is empty
         """
-        if len(self._lines) == 0:
+        if len(self) == 0:
             return None
+
+        stored_bounds = self._cached("bounds", self._compute_stored_bounds)
+        if self._transform is None:
+            return stored_bounds
+
+        # The bounds are computed from a subset of the stored points which is guaranteed to
+        # contain the extrema after the transform is applied, without applying it to the
+        # whole geometry. For axis-aligned transforms, the bounding box corners are enough.
+        # Otherwise, the convex hull is needed.
+        (a, b, _), (c, d, _) = self._transform.tolist()
+        if (b == 0 and c == 0) or (a == 0 and d == 0):
+            x1, y1, x2, y2 = stored_bounds
+            points = np.array([complex(x1, y1), complex(x2, y2)])
         else:
-            return (
-                float(min(line.real.min() for line in self._lines)),
-                float(min(line.imag.min() for line in self._lines)),
-                float(max(line.real.max() for line in self._lines)),
-                float(max(line.imag.max() for line in self._lines)),
-            )
+            points = self._cached("hull", self._compute_convex_hull).copy()
+        _apply_affine(points, self._transform)
+
+        return (
+            float(points.real.min()),
+            float(points.imag.min()),
+            float(points.real.max()),
+            float(points.imag.max()),
+        )
+
+    def _compute_stored_bounds(self) -> tuple[float, float, float, float]:
+        points, _ = self._stored_arrays()
+        return (
+            float(points.real.min()),
+            float(points.imag.min()),
+            float(points.real.max()),
+            float(points.imag.max()),
+        )
+
+    def _compute_convex_hull(self) -> np.ndarray:
+        """Returns the vertices of the convex hull of the stored points.
+
+        Degenerate geometries (e.g. collinear points) are handled by returning their extremal
+        points instead.
+        """
+        points, _ = self._stored_arrays()
+        try:
+            return points[ConvexHull(as_vector(points)).vertices]
+        except (QhullError, ValueError):
+            return points[
+                [
+                    np.argmin(points.real),
+                    np.argmax(points.real),
+                    np.argmin(points.imag),
+                    np.argmax(points.imag),
+                ]
+            ]
 
     def width(self) -> float:
         """Returns the total width of the geometries.
@@ -501,11 +1325,9 @@ class LineCollection(_MetadataMixin):
             the width (xmax - xmin) or 0.0 if the LineCollection is empty
         """
 
-        if self._lines:
-            return float(
-                max(line.real.max() for line in self._lines)
-                - min(line.real.min() for line in self._lines)
-            )
+        bounds = self.bounds()
+        if bounds is not None:
+            return bounds[2] - bounds[0]
         else:
             return 0.0
 
@@ -515,11 +1337,9 @@ class LineCollection(_MetadataMixin):
         Returns:
             the width (ymax - ymin) or 0.0 if the LineCollection is empty
         """
-        if self._lines:
-            return float(
-                max(line.imag.max() for line in self._lines)
-                - min(line.imag.min() for line in self._lines)
-            )
+        bounds = self.bounds()
+        if bounds is not None:
+            return bounds[3] - bounds[1]
         else:
             return 0.0
 
@@ -529,12 +1349,26 @@ class LineCollection(_MetadataMixin):
         Returns:
             the total length
         """
-        return sum(np.sum(np.abs(np.diff(line))) for line in self._lines)
+        self._apply_transform()
+        return self._cached("length", self._compute_length)
+
+    def _compute_length(self) -> float:
+        points, offsets = self._stored_arrays()
+        segment_lengths = np.abs(np.diff(points))
+
+        # discard the pen-up segments between consecutive lines
+        joints = offsets[1:-1] - 1
+        segment_lengths[joints[(joints >= 0) & (joints < len(segment_lengths))]] = 0.0
+        return float(np.sum(segment_lengths))
 
     def pen_up_trajectories(self) -> LineCollection:
         """Returns a LineCollection containing the pen-up trajectories."""
+        if len(self) < 2:
+            return LineCollection()
+
+        points, offsets = self.as_arrays()
         return LineCollection(
-            ([self._lines[i][-1], self._lines[i + 1][0]] for i in range(len(self._lines) - 1)),
+            np.stack([points[offsets[1:-1] - 1], points[offsets[1:-1]]], axis=1)
         )
 
     def pen_up_length(self) -> tuple[float, float, float]:
@@ -546,22 +1380,143 @@ class LineCollection(_MetadataMixin):
         Returns:
             tuple (total, mean, median) for the pen-up distances
         """
-        if len(self.lines) < 2:
+        if len(self) < 2:
             return 0.0, 0.0, 0.0
 
-        ends = np.array([line[-1] for line in self.lines[:-1]])
-        starts = np.array([line[0] for line in self.lines[1:]])
+        self._apply_transform()
+        return self._cached("pen_up_length", self._compute_pen_up_length)
+
+    def _compute_pen_up_length(self) -> tuple[float, float, float]:
+        points, offsets = self._stored_arrays()
+        ends = points[offsets[1:-1] - 1]
+        starts = points[offsets[1:-1]]
         dists = np.abs(starts - ends)
         # noinspection PyTypeChecker
         return float(np.sum(dists)), float(np.mean(dists)), float(np.median(dists))
 
+    def line_lengths(self) -> np.ndarray:
+        """Returns the length of each line.
+
+        This and the other per-line metrics methods (:meth:`line_bounds`,
+        :meth:`line_starts`, :meth:`line_ends`, :meth:`line_point_counts`, and
+        :meth:`line_closed`) compute their result for all lines in a single vectorized pass.
+        Results are cached until the geometry is modified and must thus not be modified.
+
+        Returns:
+            1D array of float with one item per line
+        """
+        self._apply_transform()
+        return self._cached("line_lengths", self._compute_line_lengths)
+
+    def _compute_line_lengths(self) -> np.ndarray:
+        points, offsets = self._stored_arrays()
+        segment_lengths = np.zeros(len(points))
+        segment_lengths[:-1] = np.abs(np.diff(points))
+
+        # discard the pen-up segments between consecutive lines
+        joints = offsets[1:-1] - 1
+        segment_lengths[joints[joints >= 0]] = 0.0
+        return _read_only(_reduce_lines(np.add, segment_lengths, offsets, 0.0))
+
+    def line_bounds(self) -> np.ndarray:
+        """Returns the bounds of each line.
+
+        Lines without points have NaN bounds.
+
+        Returns:
+            Nx4 array of float, where each row is (xmin, ymin, xmax, ymax)
+        """
+        self._apply_transform()
+        return self._cached("line_bounds", self._compute_line_bounds)
+
+    def _compute_line_bounds(self) -> np.ndarray:
+        points, offsets = self._stored_arrays()
+        bounds = np.stack(
+            [
+                _reduce_lines(np.minimum, points.real, offsets, np.nan),
+                _reduce_lines(np.minimum, points.imag, offsets, np.nan),
+                _reduce_lines(np.maximum, points.real, offsets, np.nan),
+                _reduce_lines(np.maximum, points.imag, offsets, np.nan),
+            ],
+            axis=1,
+        )
+        return _read_only(bounds.astype(float))
+
+    def line_starts(self) -> np.ndarray:
+        """Returns the first point of each line.
+
+        Lines without points have a NaN first point.
+
+        Returns:
+            1D array of complex with one item per line
+        """
+        return self._line_endpoints()[0]
+
+    def line_ends(self) -> np.ndarray:
+        """Returns the last point of each line.
+
+        Lines without points have a NaN last point.
+
+        Returns:
+            1D array of complex with one item per line
+        """
+        return self._line_endpoints()[1]
+
+    def _line_endpoints(self) -> tuple[np.ndarray, np.ndarray]:
+        self._apply_transform()
+        return self._cached("line_endpoints", self._compute_line_endpoints)
+
+    def _compute_line_endpoints(self) -> tuple[np.ndarray, np.ndarray]:
+        points, offsets = self._stored_arrays()
+        nonempty = np.diff(offsets) > 0
+        starts = np.full(len(offsets) - 1, np.nan, dtype=points.dtype)
+        ends = np.full(len(offsets) - 1, np.nan, dtype=points.dtype)
+        starts[nonempty] = points[offsets[:-1][nonempty]]
+        ends[nonempty] = points[offsets[1:][nonempty] - 1]
+        return _read_only(starts), _read_only(ends)
+
+    def line_point_counts(self) -> np.ndarray:
+        """Returns the number of points of each line.
+
+        Returns:
+            1D array of int with one item per line
+        """
+        return self._cached("line_point_counts", self._compute_line_point_counts)
+
+    def _compute_line_point_counts(self) -> np.ndarray:
+        if self._packed is not None:
+            counts = np.diff(self._packed[1])
+        else:
+            counts = np.fromiter(map(len, self._lines), dtype=np.int64, count=len(self._lines))
+        return _read_only(counts)
+
+    def line_closed(self, tolerance: float) -> np.ndarray:
+        """Returns the closed-ness of each line.
+
+        Lines are considered closed when their first and last point are closer than
+        ``tolerance``, consistently with :func:`vpype.is_closed`.
+
+        Args:
+            tolerance: max distance between starting and ending point to consider a line
+                closed
+
+        Returns:
+            1D array of bool with one item per line
+        """
+        starts, ends = self._line_endpoints()
+        with np.errstate(invalid="ignore"):
+            return (self.line_point_counts() > 1) & (np.abs(ends - starts) <= tolerance)
+
     def segment_count(self) -> int:
         """Returns the total number of segment across all lines.
 
         Returns:
             the total number of segments in the geometries
         """
-        return sum(max(0, len(line) - 1) for line in self._lines)
+        return self._cached("segment_count", self._compute_segment_count)
+
+    def _compute_segment_count(self) -> int:
+        return int(np.sum(np.maximum(self.line_point_counts() - 1, 0)))
 
 
 class Document(_MetadataMixin):
@@ -573,10 +1528,15 @@ class Document(_MetadataMixin):
     the physical size of the document. This attribute is not strictly linked to the actual
     Document's content, but can be set based on it.
 
+    The Document's :py:attr:`dtype` is used for the layers it creates (see
+    :class:`LineCollection` for details on the available precisions).
+
     Args:
         line_collection: if provided, used as layer 1
         metadata: if provided, used as global metadata
         page_size: if provided, used as page size
+        dtype: dtype of the points (``complex128`` or ``complex64``), defaults to
+            :func:`get_default_dtype`
     """
 
     def __init__(
@@ -584,6 +1544,7 @@ class Document(_MetadataMixin):
         line_collection: LineCollection | None = None,
         metadata: dict[str, Any] | None = None,
         page_size: tuple[float, float] | None = None,
+        dtype: npt.DTypeLike | None = None,
     ):
         """Create a Document, optionally providing a :py:class:`LayerCollection` for layer 1.
 
@@ -591,9 +1552,12 @@ class Document(_MetadataMixin):
             line_collection: if provided, used as layer 1
             metadata: if provided, used as global metadata
             page_size: if provided, used as page size
+            dtype: dtype of the points (``complex128`` or ``complex64``), defaults to
+                :func:`get_default_dtype`
         """
         super().__init__(metadata)
 
+        self._dtype = _default_dtype if dtype is None else _as_geometry_dtype(dtype)
         self._layers: dict[int, LineCollection] = {}
 
         if page_size is not None:
@@ -627,7 +1591,7 @@ class Document(_MetadataMixin):
         Returns:
             the cloned document
         """
-        doc = Document(metadata=self.metadata)
+        doc = Document(metadata=self.metadata, dtype=self._dtype)
         if keep_layers:
             for layer_id in self.layers:
                 doc.layers[layer_id] = self.layers[layer_id].clone()
@@ -645,6 +1609,21 @@ class Document(_MetadataMixin):
         """
         return self._layers
 
+    @property
+    def dtype(self) -> np.dtype:
+        """dtype of the points of the layers created by this document."""
+        return self._dtype
+
+    def set_dtype(self, dtype: npt.DTypeLike) -> None:
+        """Convert all layers to another dtype (see :meth:`LineCollection.set_dtype`).
+
+        Args:
+            dtype: ``complex128`` or ``complex64``
+        """
+        self._dtype = _as_geometry_dtype(dtype)
+        for layer in self._layers.values():
+            layer.set_dtype(self._dtype)
+
     @property
     def page_size(self) -> tuple[float, float] | None:
         """Returns the page size or None if it hasn't been set."""
@@ -746,9 +1725,10 @@ class Document(_MetadataMixin):
             raise ValueError(f"expected non-null, positive layer id, got {layer_id} instead")
 
         if isinstance(value, LineCollection):
+            value.set_dtype(self._dtype)
             self._layers[layer_id] = value
         else:
-            self._layers[layer_id] = LineCollection(value)
+            self._layers[layer_id] = LineCollection(value, dtype=self._dtype)
 
     def free_id(self) -> int:
         """Returns the lowest unused layer id.
@@ -786,7 +1766,7 @@ class Document(_MetadataMixin):
                 layer_id += 1
 
         if layer_id not in self._layers:
-            self._layers[layer_id] = LineCollection()
+            self._layers[layer_id] = LineCollection(dtype=self._dtype)
 
         self._layers[layer_id].extend(lines)
 
@@ -906,6 +1886,18 @@ class Document(_MetadataMixin):
         """
         return len(self._layers.keys())
 
+    def transform(self, matrix: np.ndarray | Iterable[Iterable[float]]) -> None:
+        """Apply an affine transform to all layers.
+
+        See :meth:`LineCollection.transform` for details on the matrix format.
+
+        Args:
+            matrix: 2x3 (or 3x3) affine transform matrix
+        """
+        matrix = _as_affine_matrix(matrix)
+        for layer in self._layers.values():
+            layer.transform(matrix)
+
     def translate(self, dx: float, dy: float) -> None:
         """Translates all line by a given offset.
 
@@ -913,8 +1905,7 @@ class Document(_MetadataMixin):
             dx: offset along X axis
             dy: offset along Y axis
         """
-        for layer in self._layers.values():
-            layer.translate(dx, dy)
+        self.transform([[1, 0, dx], [0, 1, dy]])
 
     def scale(self, sx: float, sy: float | None = None) -> None:
         """Scale the geometry.
@@ -927,8 +1918,10 @@ class Document(_MetadataMixin):
             sx: scale factor along x
             sy: scale factor along y (if None, then sx is used)
         """
-        for layer in self._layers.values():
-            layer.scale(sx, sy)
+        if sy is None:
+            sy = sx
+
+        self.transform([[sx, 0, 0], [0, sy, 0]])
 
     def rotate(self, angle: float) -> None:
         """Rotate the Document's content..
@@ -940,8 +1933,8 @@ class Document(_MetadataMixin):
         Args:
             angle: rotation angle (radian)
         """
-        for layer in self._layers.values():
-            layer.rotate(angle)
+        c, s = math.cos(angle), math.sin(angle)
+        self.transform([[c, -s, 0], [s, c, 0]])
 
     def bounds(
         self, layer_ids: Iterable[int] | None = None
@@ -0,0 +1,761 @@
+"""Optimization of the order in which lines are drawn."""
+
+from __future__ import annotations
+
+import logging
+import math
+import time
+from collections.abc import Callable
+from typing import cast
+
+import numpy as np
+from scipy.spatial import KDTree
+
+from .geometry import reloop
+from .line_index import LineIndex, _PointGrid
+from .model import Document, LineCollection, as_vector
+
+# REMINDER: anything added here must be added to docs/api.rst
+__all__ = ["sort_lines", "optimize_line_order", "sort_layers"]
+
+
+_CURVE_ORDER = 16  # the space-filling curves cover a 2**16 x 2**16 grid
+
+
+def _interleave_bits(v: np.ndarray) -> np.ndarray:
+    """Spread the lower 32 bits of v to the even bits of a 64-bit integer."""
+    v = v.astype(np.uint64) & np.uint64(0xFFFFFFFF)
+    for shift, mask in (
+        (16, 0x0000FFFF0000FFFF),
+        (8, 0x00FF00FF00FF00FF),
+        (4, 0x0F0F0F0F0F0F0F0F),
+        (2, 0x3333333333333333),
+        (1, 0x5555555555555555),
+    ):
+        v = (v | (v << np.uint64(shift))) & np.uint64(mask)
+    return v
+
+
+def _morton_index(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """Index of grid cells along the Morton (Z-order) curve."""
+    return _interleave_bits(x) | (_interleave_bits(y) << np.uint64(1))
+
+
+def _hilbert_tables() -> tuple[np.ndarray, np.ndarray]:
+    """Build the lookup tables to compute Hilbert curve indices 4 bits at a time.
+
+    The curve's orientation in a given cell is one of 4 states, which are combinations of
+    swapping and complementing the coordinates. For each state and 4-bit chunk of the x and y
+    coordinates (``state * 256 + (x_chunk << 4) + y_chunk``), the tables provide the
+    corresponding 8-bit chunk of the index and the orientation state of the next chunk.
+    """
+    index = np.empty(4 * 256, dtype=np.int64)
+    next_state = np.empty(4 * 256, dtype=np.int64)
+    for state in range(4):
+        for chunk in range(256):
+            complement, swap = state >> 1, state & 1
+            x, y = chunk >> 4, chunk & 15
+            if complement:
+                x, y = x ^ 15, y ^ 15
+            if swap:
+                x, y = y, x
+
+            d = 0
+            for bit in range(3, -1, -1):
+                rx, ry = (x >> bit) & 1, (y >> bit) & 1
+                d = (d << 2) | ((3 * rx) ^ ry)
+                if ry == 0:
+                    if rx == 1:
+                        x, y = x ^ 15, y ^ 15
+                        complement ^= 1
+                    x, y = y, x
+                    swap ^= 1
+            index[state * 256 + chunk] = d
+            next_state[state * 256 + chunk] = (complement << 1) | swap
+    return index, next_state
+
+
+_HILBERT_INDEX, _HILBERT_NEXT_STATE = _hilbert_tables()
+
+
+def _hilbert_index(x: np.ndarray, y: np.ndarray, order: int) -> np.ndarray:
+    """Index of grid cells along the Hilbert curve covering a ``2**order`` square grid.
+
+    The curve is computed 4 bits at a time, so ``order`` must be a multiple of 4.
+    """
+    d = np.zeros(len(x), dtype=np.int64)
+    state = np.zeros(len(x), dtype=np.int64)
+    for shift in range(order - 4, -1, -4):
+        chunk = (state << 8) | ((x >> shift) & 15) << 4 | ((y >> shift) & 15)
+        d = (d << 8) | _HILBERT_INDEX[chunk]
+        state = _HILBERT_NEXT_STATE[chunk]
+    return d
+
+
+def _curve_index(
+    points: np.ndarray, bounds: tuple[float, float, float, float], method: str
+) -> np.ndarray:
+    """Index of points along a space-filling curve covering the provided bounds."""
+    x1, y1, x2, y2 = bounds
+    size = max(x2 - x1, y2 - y1)
+    scale = ((1 << _CURVE_ORDER) - 1) / size if size > 0 else 0.0
+    x = ((points.real - x1) * scale).astype(np.int64)
+    y = ((points.imag - y1) * scale).astype(np.int64)
+    if method == "hilbert":
+        return _hilbert_index(x, y, _CURVE_ORDER)
+    else:
+        return _morton_index(x, y).astype(np.int64)
+
+
+def _reorder(lines: LineCollection, order: np.ndarray, flipped: np.ndarray) -> LineCollection:
+    """Create a new collection with the lines in the provided order and direction."""
+    points, offsets = lines.as_arrays()
+    counts = np.diff(offsets)[order]
+    new_offsets = np.zeros(len(order) + 1, dtype=np.int64)
+    np.cumsum(counts, out=new_offsets[1:])
+
+    k = np.arange(new_offsets[-1]) - np.repeat(new_offsets[:-1], counts)
+    k = np.where(np.repeat(flipped, counts), np.repeat(counts - 1, counts) - k, k)
+    return LineCollection.from_arrays(
+        points[np.repeat(offsets[:-1][order], counts) + k],
+        new_offsets,
+        metadata=lines.metadata,
+        dtype=lines.dtype,
+    )
+
+
+def _best_order(lines: LineCollection, sorted_lines: LineCollection) -> LineCollection:
+    """Returns the sorted lines, or a copy of the original lines if their order is better."""
+    original = lines.pen_up_length()
+    replacement = sorted_lines.pen_up_length()
+    if original[0] < replacement[0]:
+        logging.info(
+            f"optimize: could not improve pen-up distance {original} to {replacement}"
+        )
+        return lines.clone(lines)
+
+    logging.info(
+        f"optimize: reduced pen-up (distance, mean, median) from {original} to {replacement}"
+    )
+    return sorted_lines
+
+
+def _sort_lines_with_seams(
+    lines: LineCollection, flip: bool, closed_tolerance: float
+) -> list[np.ndarray]:
+    """Greedy sort where any vertex of a closed line is a candidate entry point.
+
+    All candidate entry points (start and, if ``flip`` is True, end of open lines, all but the
+    last vertex of closed lines) are stored in a single spatial index, with the items of each
+    line stored contiguously such that they can all be removed once the line is drawn.
+    """
+
+    points, offsets = lines.as_arrays()
+    counts = np.diff(offsets)
+    closed = lines.line_closed(closed_tolerance)
+
+    entry_counts = np.where(closed, counts - 1, 2 if flip else 1)
+    item_offsets = np.zeros(len(lines) + 1, dtype=np.int64)
+    np.cumsum(entry_counts, out=item_offsets[1:])
+    item_line = np.repeat(np.arange(len(lines)), entry_counts)
+    local = np.arange(item_offsets[-1]) - np.repeat(item_offsets[:-1], entry_counts)
+    item_vertex = np.where(
+        closed[item_line], local, np.where(local == 0, 0, counts[item_line] - 1)
+    )
+    grid = _PointGrid(points[offsets[item_line] + item_vertex])
+
+    def remove_line(idx: int) -> None:
+        start, stop = int(item_offsets[idx]), int(item_offsets[idx + 1])
+        if stop - start > 2:
+            grid.remove_many(np.arange(start, stop))
+        else:
+            for item in range(start, stop):
+                grid.remove(item)
+
+    remove_line(0)
+    new_lines = [lines[0]]
+    while grid.count > 0:
+        item = cast(int, grid.nearest(new_lines[-1][-1])[0])
+        idx, vertex = int(item_line[item]), int(item_vertex[item])
+        remove_line(idx)
+
+        line = lines[idx]
+        if vertex != 0:
+            line = reloop(line.copy(), vertex) if closed[idx] else np.flip(line)
+        new_lines.append(line)
+
+    return new_lines
+
+
+def sort_lines(
+    lines: LineCollection,
+    flip: bool = True,
+    method: str = "greedy",
+    closed_tolerance: float | None = None,
+) -> LineCollection:
+    """Sort lines to minimize the pen-up travel distance.
+
+    With the ``"greedy"`` method, starting with the first line, the line whose start (or end,
+    if ``flip`` is True) is the closest to the current line's end is drawn next.
+
+    With the ``"hilbert"`` and ``"morton"`` methods, lines are sorted by the position of the
+    midpoint between their endpoints along the corresponding space-filling curve, and, if
+    ``flip`` is True, reversed if their end comes first along the curve. These methods are
+    fully vectorized and much faster than the greedy method on very large collections (e.g.
+    millions of stipple dots or short hatches), at the cost of a longer pen-up distance.
+    The Hilbert curve generally yields shorter pen-up distances than the Morton curve.
+
+    With the ``"greedy"`` method, if ``closed_tolerance`` is provided, any vertex of a closed
+    line (as per :meth:`LineCollection.line_closed`) is considered as a candidate entry point,
+    and closed lines are rotated such that their seam is at the vertex closest to the current
+    line's end (see :func:`reloop`). The first line is left unchanged.
+
+    In all cases, the original order is retained if it has a lower pen-up distance than the
+    result.
+
+    Args:
+        lines: lines to sort
+        flip: allow reversing the lines' direction
+        method: sort method (``"greedy"``, ``"hilbert"`` or ``"morton"``)
+        closed_tolerance: if provided, choose the seam of closed lines, which are detected
+            using this tolerance (only supported by the ``"greedy"`` method)
+
+    Returns:
+        new line collection with the sorted lines
+    """
+    if method not in ("greedy", "hilbert", "morton"):
+        raise ValueError(f"unknown sort method '{method}'")
+    if closed_tolerance is not None and method != "greedy":
+        raise ValueError("seam selection is only supported by the greedy method")
+
+    if len(lines) < 2:
+        return lines.clone(lines)
+
+    if method != "greedy":
+        starts, ends = lines.line_starts(), lines.line_ends()
+        bounds = cast(tuple[float, float, float, float], lines.bounds())
+        order = np.argsort(_curve_index((starts + ends) / 2, bounds, method))
+        if flip:
+            flipped = _curve_index(ends, bounds, method) < _curve_index(starts, bounds, method)
+        else:
+            flipped = np.zeros(len(lines), dtype=bool)
+        return _best_order(lines, _reorder(lines, order, flipped[order]))
+
+    if closed_tolerance is not None:
+        return _best_order(
+            lines, lines.clone(_sort_lines_with_seams(lines, flip, closed_tolerance))
+        )
+
+    line_index = LineIndex(lines[1:], reverse=flip)
+    new_lines = [lines[0]]
+
+    while len(line_index) > 0:
+        idx, reverse = line_index.find_nearest(new_lines[-1][-1])
+        line = line_index.pop(idx)
+        if line is not None:
+            if reverse:
+                line = np.flip(line)
+            new_lines.append(line)
+
+    return _best_order(lines, lines.clone(new_lines))
+
+
+_LOG_INTERVAL = 10000
+
+
+class _Tour:
+    """Order of the lines being optimized by :func:`optimize_line_order`.
+
+    Line endings are identified by ``2 * line`` for their start and ``2 * line + 1`` for
+    their end. The tour is stored as the entry ending of the line at each position, along
+    with the position of each line, such that moves are applied with array operations. The
+    line ending coordinates are stored in a plain list, which is faster than an array for the
+    scalar accesses of the local search.
+    """
+
+    _MAX_SEGMENT_LENGTH = 3
+    _MIN_GAIN = 1e-10  # do not apply moves on rounding errors
+    _PERTURBATION_LENGTH = 50
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray, flip: bool, neighbors: int):
+        self.n = len(starts)
+        self.flip = flip
+        endings = np.empty(2 * self.n, dtype=complex)
+        endings[0::2] = starts
+        endings[1::2] = ends
+        self._points = endings.tolist()
+
+        self._ids = np.arange(0, 2 * self.n, 2)
+        self._pos = np.arange(self.n)
+        self.length = self.pen_up_length()
+
+        # lines reversed by a 2-opt move since they were last examined
+        self.stale = np.zeros(self.n, dtype=bool)
+
+        # candidate list of each line ending: nearest endings of other lines, closest first
+        k = min(neighbors + 2, 2 * self.n)
+        _, idx = KDTree(as_vector(endings)).query(as_vector(endings), k=k)
+        idx = idx.reshape(2 * self.n, k)
+        self._neighbors = [
+            [c for c in row if c >> 1 != ending >> 1][:neighbors]
+            for ending, row in enumerate(idx.tolist())
+        ]
+
+    @property
+    def order(self) -> np.ndarray:
+        """Line at each position."""
+        return self._ids >> 1
+
+    @property
+    def flipped(self) -> np.ndarray:
+        """Direction of the line at each position."""
+        return (self._ids & 1).astype(bool)
+
+    def pen_up_length(self) -> float:
+        points = np.array(self._points, dtype=complex)
+        return float(np.sum(np.abs(points[self._ids[1:]] - points[self._ids[:-1] ^ 1])))
+
+    def _entry(self, p: int) -> complex:
+        return self._points[self._ids.item(p)]
+
+    def _exit(self, p: int) -> complex:
+        return self._points[self._ids.item(p) ^ 1]
+
+    def _edge(self, p: int) -> float:
+        """Length of the pen-up between positions p and p + 1 (0 at the tour's ends)."""
+        if 0 <= p < self.n - 1:
+            return abs(
+                self._points[self._ids.item(p) ^ 1] - self._points[self._ids.item(p + 1)]
+            )
+        return 0.0
+
+    def _link(self, a: complex | None, b: complex | None) -> float:
+        return 0.0 if a is None or b is None else abs(a - b)
+
+    def _exit_or_none(self, p: int) -> complex | None:
+        return self._points[self._ids.item(p) ^ 1] if 0 <= p < self.n else None
+
+    def _entry_or_none(self, p: int) -> complex | None:
+        return self._points[self._ids.item(p)] if 0 <= p < self.n else None
+
+    def _two_opt_gain(self, a: int, b: int) -> float:
+        """Gain of reversing positions a to b (included)."""
+        return (
+            self._edge(a - 1)
+            + self._edge(b)
+            - self._link(self._exit_or_none(a - 1), self._exit(b))
+            - self._link(self._entry(a), self._entry_or_none(b + 1))
+        )
+
+    def _removal_gain(self, a: int, b: int) -> float:
+        """Gain of removing positions a to b (included) from the tour."""
+        return (
+            self._edge(a - 1)
+            + self._edge(b)
+            - self._link(self._exit_or_none(a - 1), self._entry_or_none(b + 1))
+        )
+
+    def _reverse(self, a: int, b: int) -> None:
+        self._ids[a : b + 1] = self._ids[a : b + 1][::-1] ^ 1
+        lines = self._ids[a : b + 1] >> 1
+        self._pos[lines] = np.arange(a, b + 1)
+
+        # the endings of the reversed lines swap roles, which changes the moves available to
+        # them even though their neighborhood is unchanged
+        self.stale[lines] = True
+
+    def _move(self, a: int, b: int, q: int, reverse: bool) -> None:
+        ids = self._ids
+        segment = ids[a : b + 1][::-1] ^ 1 if reverse else ids[a : b + 1].copy()
+        length = b - a + 1
+        if q > b:
+            ids[a : q - length + 1] = ids[b + 1 : q + 1]
+            ids[q - length + 1 : q + 1] = segment
+            start, stop = a, q + 1
+        else:
+            ids[q + 1 + length : b + 1] = ids[q + 1 : a]
+            ids[q + 1 : q + 1 + length] = segment
+            start, stop = q + 1, b + 1
+        self._pos[ids[start:stop] >> 1] = np.arange(start, stop)
+
+    def save(self) -> tuple[np.ndarray, float]:
+        return self._ids.copy(), self.length
+
+    def restore(self, state: tuple[np.ndarray, float]) -> None:
+        ids, self.length = state
+        self._ids[:] = ids
+        self._pos[ids >> 1] = np.arange(self.n)
+        self.stale[:] = False
+
+    def perturb(self) -> list[int]:
+        """Swap two random consecutive sequences of lines.
+
+        This move (a "double bridge") cannot be undone by a single 2-opt or Or-opt move, and
+        is used to escape local optima.
+
+        Returns:
+            lines whose neighborhood changed
+        """
+        a = np.random.randint(self.n - 1)
+        b = min(a + np.random.randint(1, self._PERTURBATION_LENGTH + 1), self.n - 1)
+        c = min(b + np.random.randint(1, self._PERTURBATION_LENGTH + 1), self.n)
+
+        gain = (
+            self._link(self._exit_or_none(a - 1), self._entry(a))
+            + self._link(self._exit(b - 1), self._entry(b))
+            + self._link(self._exit(c - 1), self._entry_or_none(c))
+            - self._link(self._exit_or_none(a - 1), self._entry(b))
+            - self._link(self._exit(c - 1), self._entry(a))
+            - self._link(self._exit(b - 1), self._entry_or_none(c))
+        )
+        changed = self._lines_at(a - 1, a, b - 1, b, c - 1, c)
+        self._ids[a:c] = np.concatenate([self._ids[b:c], self._ids[a:b]])
+        self._pos[self._ids[a:c] >> 1] = np.arange(a, c)
+        self.length -= gain
+        return changed
+
+    def _lines_at(self, *positions: int) -> list[int]:
+        return [self._ids.item(p) >> 1 for p in positions if 0 <= p < self.n]
+
+    def improve(self, line: int) -> list[int]:
+        """Apply the first improving move found in the neighborhood of a line.
+
+        Returns:
+            lines whose neighborhood changed (empty if no move was applied)
+        """
+        points, pos_item, ids_item = self._points, self._pos.item, self._ids.item
+        p = pos_item(line)
+        flipped = ids_item(p) & 1
+        for ending in (2 * line, 2 * line + 1):
+            is_exit = (ending & 1) != flipped
+            point = points[ending]
+
+            # only moves creating a pen-up shorter than the one currently connected to this
+            # line ending are considered (any move is considered at the tour's ends)
+            adjacent = p + 1 if is_exit else p - 1
+            if 0 <= adjacent < self.n:
+                current = abs(point - points[ids_item(adjacent) ^ (not is_exit)])
+            else:
+                current = math.inf
+
+            segments: list[tuple[int, int, complex, complex, float]] | None = None
+            for candidate in self._neighbors[ending]:
+                # candidates are sorted by distance
+                if abs(point - points[candidate]) >= current:
+                    break
+
+                other = candidate >> 1
+                q = pos_item(other)
+                other_is_exit = (candidate & 1) != (ids_item(q) & 1)
+
+                if is_exit == other_is_exit:
+                    if not self.flip:
+                        continue
+                    a, b = (
+                        (min(p, q) + 1, max(p, q)) if is_exit else (min(p, q), max(p, q) - 1)
+                    )
+                    if a <= b and (gain := self._two_opt_gain(a, b)) > self._MIN_GAIN:
+                        changed = self._lines_at(a - 1, a, b, b + 1)
+                        self._reverse(a, b)
+                        self.length -= gain
+                        return changed
+
+                if segments is None:
+                    # Or-opt segments of up to _MAX_SEGMENT_LENGTH lines ending (or starting)
+                    # with this line, along with their end points and the gain of their
+                    # removal
+                    segments = []
+                    for length in range(1, min(self._MAX_SEGMENT_LENGTH, self.n - 1) + 1):
+                        a, b = (p - length + 1, p) if is_exit else (p, p + length - 1)
+                        if a < 0 or b >= self.n:
+                            break
+                        segments.append(
+                            (a, b, self._entry(a), self._exit(b), self._removal_gain(a, b))
+                        )
+
+                # insertion between positions insert and insert + 1, that is after the
+                # other line if it is entered from its exit, and before it otherwise
+                insert = q if other_is_exit else q - 1
+                before, after = self._exit_or_none(insert), self._entry_or_none(insert + 1)
+                removed = self._link(before, after)
+                reverse = is_exit == other_is_exit
+                for a, b, entry, exit_, removal in segments:
+                    if a - 1 <= insert <= b:
+                        continue
+                    if reverse:
+                        entry, exit_ = exit_, entry
+                    insertion = self._link(before, entry) + self._link(exit_, after)
+                    if (gain := removal + removed - insertion) > self._MIN_GAIN:
+                        changed = self._lines_at(a - 1, a, b, b + 1, insert, insert + 1)
+                        self._move(a, b, insert, reverse)
+                        self.length -= gain
+                        return changed
+        return []
+
+
+def _local_search(
+    tour: _Tour,
+    queue: list[int],
+    passes: int,
+    deadline: float,
+    revisit_reversed: bool = True,
+    on_progress: Callable[[int, int, int], None] | None = None,
+) -> None:
+    """Apply improving moves, starting with the queued lines, until a local optimum is found,
+    ``passes`` passes have been made, or the deadline (as per :func:`time.perf_counter`) is
+    reached.
+
+    If ``revisit_reversed`` is False, lines which were reversed are not examined again unless
+    their neighborhood changed, which is faster but may not reach a local optimum.
+
+    ``on_progress`` is called with the current pass, the number of lines examined in this
+    pass, and the number of lines to examine in this pass.
+    """
+
+    active = [False] * tour.n
+    current_pass = 1
+    while current_pass <= passes:
+        if not queue:
+            # lines reversed since they were last examined must be examined again
+            if revisit_reversed:
+                queue = tour.order[tour.stale[tour.order]].tolist()
+            tour.stale[:] = False
+            if not queue:
+                break
+
+        next_queue = []
+        for i, line in enumerate(queue):
+            if on_progress is not None and i % _LOG_INTERVAL == 0:
+                on_progress(current_pass, i, len(queue))
+            if time.perf_counter() >= deadline:
+                return
+            active[line] = False
+            while changed_lines := tour.improve(line):
+                for changed in changed_lines:
+                    if not active[changed]:
+                        active[changed] = True
+                        next_queue.append(changed)
+
+        if on_progress is not None:
+            on_progress(current_pass, len(queue), len(queue))
+        queue = next_queue
+        current_pass += 1
+
+
+def optimize_line_order(
+    lines: LineCollection,
+    flip: bool = True,
+    passes: int = 250,
+    neighbors: int = 8,
+    time_limit: float | None = None,
+    progress: Callable[[float, float], None] | None = None,
+) -> LineCollection:
+    """Improve the order of lines to reduce the pen-up travel distance using local search.
+
+    Starting from the current order (typically obtained with :func:`sort_lines`), 2-opt moves
+    (reversing a sequence of lines) and Or-opt moves (relocating a sequence of up to three
+    lines, optionally reversed) are applied as long as they reduce the pen-up distance.
+
+    Only moves connecting a line ending to one of its ``neighbors`` nearest line endings are
+    considered, and lines are only examined again when their neighborhood in the sequence has
+    changed or when they have been reversed ("don't look bits"). Each pass examines the lines
+    affected by the previous pass, and the optimization stops when no more improvement can be
+    made or when ``passes`` passes have been made. This makes the optimization practical for
+    layers with up to hundreds of thousands of lines.
+
+    If ``time_limit`` is provided, the optimization is interrupted when the time limit is
+    reached. Conversely, if the local search completes before the time limit, the remaining
+    time is used to further improve the result by repeatedly perturbing the order (by swapping
+    two random sequences of lines) and applying the local search again, keeping the best order
+    found. In both cases, the best order found so far is returned.
+
+    Args:
+        lines: lines to optimize
+        flip: allow reversing the lines' direction (2-opt and reversed Or-opt moves are
+            disabled otherwise)
+        passes: maximum number of passes
+        neighbors: number of candidate line endings considered for each line ending
+        time_limit: if provided, duration of the optimization in seconds
+        progress: if provided, function called with the elapsed time (in seconds) and the
+            current pen-up distance during each pass, after each pass, and after each
+            improvement found by perturbation
+
+    Returns:
+        new line collection with the optimized order
+    """
+
+    if len(lines) < 3:
+        return lines.clone(lines)
+
+    start_time = time.perf_counter()
+    deadline = math.inf if time_limit is None else start_time + time_limit
+    tour = _Tour(lines.line_starts(), lines.line_ends(), flip, neighbors)
+    initial_length = tour.length
+
+    def report() -> None:
+        if progress is not None:
+            progress(time.perf_counter() - start_time, tour.length)
+
+    def on_progress(current_pass: int, examined: int, total: int) -> None:
+        logging.debug(
+            f"optimize: pen-up distance is {tour.length}. {100 * examined / total:.02f}% done "
+            f"with pass {current_pass}/{passes}"
+        )
+        report()
+
+    _local_search(tour, list(range(tour.n)), passes, deadline, on_progress=on_progress)
+
+    if time_limit is not None:
+        best = tour.save()
+        perturbations = 0
+        while time.perf_counter() < deadline:
+            perturbations += 1
+            _local_search(tour, tour.perturb(), passes, deadline, revisit_reversed=False)
+            if tour.length < best[1] - _Tour._MIN_GAIN:
+                best = tour.save()
+                logging.debug(
+                    f"optimize: pen-up distance is {tour.length} after {perturbations} "
+                    "perturbations"
+                )
+                report()
+            else:
+                tour.restore(best)
+        tour.restore(best)
+        report()
+
+    logging.info(
+        f"optimize: local search reduced pen-up distance from {initial_length} to "
+        f"{tour.pen_up_length()}"
+    )
+
+    return _reorder(lines, tour.order, tour.flipped)
+
+
+def _arrange_layer(
+    lines: LineCollection, position: complex, flip: bool
+) -> tuple[LineCollection, float]:
+    """Find the best line order of a layer entered from ``position``.
+
+    The layer's current order (reversed, if ``flip`` is True) is compared to the result of
+    :func:`sort_lines` starting with the line whose ending is the closest to ``position``.
+
+    Returns:
+        tuple (lines, distance) of the arranged lines and their pen-up distance, including
+        the travel from ``position``
+    """
+
+    def cost(lc: LineCollection) -> float:
+        return abs(lc.line_starts()[0] - position) + lc.pen_up_length()[0]
+
+    n = len(lines)
+    candidates = [lines]
+    if flip:
+        candidates.append(_reorder(lines, np.arange(n)[::-1], np.ones(n, dtype=bool)))
+
+    start_dists = np.abs(lines.line_starts() - position)
+    end_dists = np.abs(lines.line_ends() - position) if flip else np.full(n, math.inf)
+    first = int(np.argmin(np.minimum(start_dists, end_dists)))
+    closest_first = lines
+    if first != 0 or end_dists[0] < start_dists[0]:
+        order = np.concatenate([[first], np.arange(first), np.arange(first + 1, n)])
+        flipped = np.zeros(n, dtype=bool)
+        flipped[0] = end_dists[first] < start_dists[first]
+        closest_first = _reorder(lines, order, flipped)
+        candidates.append(closest_first)
+    candidates.append(sort_lines(closest_first, flip=flip))
+
+    costs = [cost(lc) for lc in candidates]
+    best = int(np.argmin(costs))
+    return candidates[best], costs[best]
+
+
+def sort_layers(
+    document: Document,
+    pen_count: int | None = None,
+    pen_switch_cost: float = 0.0,
+    flip: bool = True,
+) -> Document:
+    """Sort layers to minimize the pen-up travel distance and the number of pen changes.
+
+    Starting from the origin, the layer whose closest line ending is the least costly to reach
+    is plotted next, where the cost is the pen-up distance plus ``pen_switch_cost`` if the
+    layer's pen differs from the current one. The lines of the selected layer are then
+    arranged to start close to the current position, using the best of the current order,
+    the reversed order (if ``flip`` is True), and :func:`sort_lines` starting with the closest
+    line. The original layer order is retained if it has a lower cost than the result.
+
+    The layers' pen is determined in the same way as by :func:`write_hpgl`, i.e. layer ``i``
+    uses pen ``1 + (i - 1) % pen_count``. The layers are renumbered such as to follow the
+    computed order, while preserving their pen. If ``pen_count`` is None, each layer is
+    considered to use a different pen and layers are renumbered starting from 1.
+
+    Args:
+        document: document whose layers should be sorted
+        pen_count: number of pens of the plotter, or None if every layer uses its own pen
+        pen_switch_cost: cost of a pen change, expressed as an equivalent pen-up distance
+        flip: allow reversing the lines' direction
+
+    Returns:
+        new document with the sorted layers
+    """
+
+    def pen(layer_id: int) -> int:
+        return layer_id if pen_count is None else (layer_id - 1) % pen_count
+
+    def switch_cost(previous: int | None, layer_id: int) -> float:
+        return pen_switch_cost if previous is not None and previous != pen(layer_id) else 0.0
+
+    layer_ids = sorted(lid for lid, lc in document.layers.items() if len(lc) > 0)
+
+    # cost of the current layer order
+    original_cost = 0.0
+    position, current_pen = 0j, None
+    for lid in layer_ids:
+        lc = document.layers[lid]
+        original_cost += switch_cost(current_pen, lid) + abs(lc.line_starts()[0] - position)
+        original_cost += lc.pen_up_length()[0]
+        position, current_pen = lc.line_ends()[-1], pen(lid)
+
+    # greedy construction
+    sorted_layers: list[tuple[int, LineCollection]] = []
+    cost = 0.0
+    position, current_pen = 0j, None
+    remaining = list(layer_ids)
+    while remaining:
+
+        def entry_cost(lid: int) -> float:
+            lc = document.layers[lid]
+            dist = np.abs(lc.line_starts() - position).min()
+            if flip:
+                dist = min(dist, np.abs(lc.line_ends() - position).min())
+            return switch_cost(current_pen, lid) + float(dist)
+
+        lid = min(remaining, key=entry_cost)
+        remaining.remove(lid)
+        lc, dist = _arrange_layer(document.layers[lid], position, flip)
+        cost += switch_cost(current_pen, lid) + dist
+        sorted_layers.append((lid, lc))
+        position, current_pen = lc.line_ends()[-1], pen(lid)
+
+    new_doc = document.clone()
+    if original_cost <= cost:
+        logging.info(f"sort_layers: could not improve cost {original_cost} (got {cost})")
+        for lid, lc in document.layers.items():
+            new_doc.layers[lid] = lc.clone(lc)
+        return new_doc
+
+    logging.info(f"sort_layers: reduced cost from {original_cost} to {cost}")
+
+    # empty layers are kept after the others
+    sorted_layers.extend(
+        (lid, lc.clone()) for lid, lc in sorted(document.layers.items()) if len(lc) == 0
+    )
+
+    new_id = 0
+    for lid, lc in sorted_layers:
+        new_id += 1
+        if pen_count is not None:
+            new_id += (pen(lid) - (new_id - 1)) % pen_count
+        new_doc.layers[new_id] = lc
+
+    return new_doc
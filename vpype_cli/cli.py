@@ -138,6 +138,11 @@ _PLUGINS_LOADED = False
 @click.option(
     "-c", "--config", type=click.Path(exists=True), help="Load an additional config file."
 )
+@click.option(
+    "--single-precision",
+    is_flag=True,
+    help="Store geometries with single precision to reduce memory usage.",
+)
 @click.pass_context
 def cli(
     ctx: click.Context,
@@ -147,6 +152,7 @@ def cli(
     history: bool,
     seed: int,
     config: str,
+    single_precision: bool,
 ):
     """Execute the sequence of commands passed in argument.
 
@@ -178,6 +184,12 @@ def cli(
     This may be useful to easily keep a trace of how project might have been created or
     post-processed with vpype.
 
+    Geometries are stored with double precision by default. The `--single-precision` option
+    halves the memory usage, which is useful for very large pipelines, while still providing
+    far more precision than any plotter can use:
+
+        vpype --single-precision read huge_input.svg linemerge linesort write output.svg
+
     By default, vpype verbosity is low. It may be increased by using the `-v` option once or
     twice to increase verbosity to info, respectively debug level, e.g.:
 
@@ -254,8 +266,16 @@ if TYPE_CHECKING:  # pragma: no cover
 
 # noinspection PyUnusedLocal
 @cli.result_callback()
-def process_pipeline(processors, help_flag, verbose, include, history, seed, config):
-    execute_processors(processors, State())
+def process_pipeline(
+    processors, help_flag, verbose, include, history, seed, config, single_precision
+):
+    default_dtype = vp.get_default_dtype()
+    if single_precision:
+        vp.set_default_dtype(np.complex64)
+    try:
+        execute_processors(processors, State())
+    finally:
+        vp.set_default_dtype(default_dtype)
 
 
 def execute_processors(processors: Iterable[ProcessorType], state: State) -> None:
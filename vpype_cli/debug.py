@@ -6,16 +6,18 @@ import json
 from collections.abc import Iterable, Sequence
 from typing import Any
 
+import click
 import numpy as np
 
 import vpype as vp
 
 from .cli import cli
 from .decorators import global_processor
+from .types import TextType
 
 debug_data: list[dict[str, Any]] = []
 
-__all__ = ("dbsample", "dbdump", "stat", "DebugData")
+__all__ = ("dbsample", "dbdump", "stat", "estimate", "DebugData")
 
 
 @cli.command(hidden=True)
@@ -145,6 +147,11 @@ def stat(document: vp.Document):
         print(f"  Mean pen-up length: {pen_up_mean}")
         print(f"  Median pen-up length: {pen_up_median}")
         print(f"  Path count: {len(layer)}")
+        if len(layer) > 0:
+            line_lengths = layer.line_lengths()
+            print(f"  Mean path length: {np.mean(line_lengths)}")
+            print(f"  Median path length: {np.median(line_lengths)}")
+            print(f"  Closed path count: {np.count_nonzero(layer.line_closed(0.0))}")
         print(f"  Segment count: {layer.segment_count()}")
         print(
             "  Mean segment length:",
@@ -172,3 +179,60 @@ def stat(document: vp.Document):
     print("========================= ")
 
     return document
+
+
+def _format_time(seconds: float) -> str:
+    minutes, secs = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{seconds:.1f}s ({hours}:{minutes:02d}:{secs:02d})"
+
+
+@cli.command(group="Output")
+@click.option(
+    "-d",
+    "--device",
+    type=TextType(),
+    help="Plotter whose configuration provides the kinematics.",
+)
+@global_processor
+def estimate(document: vp.Document, device: str | None):
+    """Print an estimate of the time needed to plot the current geometries.
+
+    The estimate simulates a trapezoidal velocity profile over every segment and pen-up move,
+    with slowdowns at corners, and accounts for the time needed to raise, lower and change
+    pens. Layers are plotted in order of their layer ID, starting from the origin.
+
+    The plotter kinematics are obtained from the configuration of the plotter selected with
+    the `--device` option (or the default HPGL device, if configured), using the following
+    optional keys (default values are used for missing keys): `pen_down_speed` (drawing
+    distance per second, default: 100mm), `pen_up_speed` (pen-up travel distance per second,
+    default: 200mm), `acceleration` (distance per second squared, default: 1000mm),
+    `pen_lift_time` (time in seconds to raise or lower the pen, default: 0) and
+    `pen_switch_time` (time in seconds to change pen, default: 0). If no device is configured,
+    the default values are used and each layer is considered to use a different pen.
+    """
+
+    config = vp.config_manager.get_plotter_config(device)
+    if device is not None and config is None:
+        raise click.BadParameter(f"no configuration found for device '{device}'")
+
+    times = vp.estimate_plot_time(document, config)
+
+    print("===== Plot time estimate ===== ")
+    for layer_id, layer_time in times.items():
+        print(f"Layer {layer_id}")
+        print(f"  Pen-down time: {_format_time(layer_time.pen_down)}")
+        print(f"  Pen-up time: {_format_time(layer_time.pen_up)}")
+        print(f"  Pen lift time: {_format_time(layer_time.pen_lift)}")
+        print(f"  Pen switch time: {_format_time(layer_time.pen_switch)}")
+        print(f"  Total time: {_format_time(layer_time.total)}")
+    total = sum(times.values(), vp.PlotTime())
+    print("Totals")
+    print(f"  Pen-down time: {_format_time(total.pen_down)}")
+    print(f"  Pen-up time: {_format_time(total.pen_up)}")
+    print(f"  Pen lift time: {_format_time(total.pen_lift)}")
+    print(f"  Pen switch time: {_format_time(total.pen_switch)}")
+    print(f"  Total time: {_format_time(total.total)}")
+    print("============================== ")
+
+    return document
@@ -3,7 +3,6 @@ from __future__ import annotations
 import logging
 import math
 import random
-from typing import cast
 
 import click
 import numpy as np
@@ -14,10 +13,12 @@ from .cli import cli
 from .decorators import global_processor, layer_processor
 from .types import (
     ChoiceType,
+    FloatType,
     IntegerType,
     LayerType,
     LengthType,
     PageSizeType,
+    TextType,
     multiple_to_layer_ids,
 )
 
@@ -25,7 +26,9 @@ __all__ = (
     "crop",
     "circlecrop",
     "filter_command",
+    "layersort",
     "layout",
+    "linegraph",
     "linemerge",
     "lineshuffle",
     "linesimplify",
@@ -124,6 +127,39 @@ def trim(
     return document
 
 
+@cli.command(group="Operations")
+@click.option(
+    "-t",
+    "--tolerance",
+    type=LengthType(),
+    default="0.05mm",
+    help="Maximum distance between two points that should be connected.",
+)
+@layer_processor
+def linegraph(lines: vp.LineCollection, tolerance: float) -> vp.LineCollection:
+    """Merge lines into a minimal number of strokes by traversing their segment graph.
+
+    This command considers all the segments of a layer as the edges of a graph, whose nodes are
+    the segments' endpoints. Line endpoints closer than the tolerance to a point of another
+    line are snapped to it. Each connected part of the graph is then drawn using the minimum
+    possible number of continuous strokes, each segment being drawn exactly once. Stroke
+    direction is not preserved.
+
+    This is typically much more effective and faster than the `splitall linemerge` sequence for
+    densely connected geometries, such as wireframes, Voronoi diagrams, or meshes made of
+    touching polygons. Segments which cross each other without sharing an endpoint are not
+    connected.
+
+    By default, endpoints closer than 0.05mm are connected. This can be controlled with the
+    `--tolerance` option.
+
+    Note: consider using `linesort` after `linegraph` to optimize the pen-up distance between
+    the resulting strokes.
+    """
+
+    return vp.merge_line_graph(lines, tolerance)
+
+
 @cli.command(group="Operations")
 @click.option(
     "-t",
@@ -159,21 +195,58 @@ def linemerge(lines: vp.LineCollection, tolerance: float, no_flip: bool = True):
     is_flag=True,
     help="Disable reversing stroke direction for optimization.",
 )
+@click.option(
+    "-m",
+    "--method",
+    type=ChoiceType(["greedy", "hilbert", "morton"]),
+    default="greedy",
+    help="Sort method (default: greedy).",
+)
+@click.option(
+    "-s",
+    "--seam",
+    is_flag=True,
+    help="Enter closed paths at their vertex closest to the pen (greedy method only).",
+)
+@click.option(
+    "--tolerance",
+    type=LengthType(),
+    default="0.05mm",
+    help="Controls how close the path beginning and end must be to consider it closed ("
+    "default: 0.05mm).",
+)
 @click.option(
     "-t",
     "--two-opt",
     is_flag=True,
-    help="Use two-opt algorithm to perform additional distance minimization.",
+    help="Use local search (2-opt and Or-opt) to perform additional distance minimization.",
 )
 @click.option(
     "-p",
     "--passes",
     type=IntegerType(),
     default=250,
-    help="Number of passes the two-opt algorithm is permitted to take (default: 250)",
+    help="Maximum number of passes of the local search optimization (default: 250)",
+)
+@click.option(
+    "--time-limit",
+    type=FloatType(),
+    help=(
+        "Time limit in seconds for the local search optimization of each layer (implies "
+        "--two-opt)."
+    ),
 )
 @layer_processor
-def linesort(lines: vp.LineCollection, no_flip: bool, two_opt: bool, passes: int):
+def linesort(
+    lines: vp.LineCollection,
+    no_flip: bool,
+    method: str,
+    seam: bool,
+    tolerance: float,
+    two_opt: bool,
+    passes: int,
+    time_limit: float | None,
+):
     """Sort lines to minimize the pen-up travel distance.
 
     This command reorders the paths within layers such as to minimize the total pen-up
@@ -181,142 +254,128 @@ def linesort(lines: vp.LineCollection, no_flip: bool, two_opt: bool, passes: int
     pen-up distance. This behavior can be disabled using the `--no-flip` option.
 
     By default, a fast, greedy algorithm is used. Although it will dramatically reduce the
-    pen-up distance in most situation, it trades execution speed for optimality. Further
-    optimization using the two-opt algorithm can be enabled using the `--two-opt` option. Since
-    this greatly increase processing time, this feature is mostly useful for special cases such
-    as when the same design must be plotted multiple times.
-
-    When using `--two-opt`, detailed progress indication are available in the debug output,
-    which is enabled using the `-vv` global option:
+    pen-up distance in most situation, it trades execution speed for optimality. For very
+    large layers (e.g. millions of stipple dots or short hatches), `--method hilbert` or
+    `--method morton` instead sort paths along the corresponding space-filling curve, which is
+    nearly instantaneous but results in a longer pen-up distance (the Hilbert curve generally
+    performs better than the Morton curve).
+
+    With the `--seam` option, closed paths may be entered at any of their vertices instead of
+    their beginning or end only, and are rotated such that their seam is at the vertex closest
+    to the pen position (see also `reloop`). This may significantly reduce the pen-up distance
+    for artwork made of many closed paths, such as contours or glyph outlines. The
+    `--tolerance` option controls how close the path beginning and end must be to consider it
+    closed. This option is only supported by the greedy method.
+
+    Further optimization can be enabled using the `--two-opt` option, which applies a local
+    search using 2-opt moves (reversing a sequence of paths) and Or-opt moves (relocating up to
+    three consecutive paths), limited to each path ending's nearest neighbors. Each pass only
+    examines the paths affected by the previous one, and the optimization stops when no
+    further improvement is found or after `--passes` passes. With `--no-flip`, only moves
+    which preserve the path directions are used.
+
+    The `--time-limit` option bounds the duration of the optimization of each layer. If the
+    local search completes before the time limit, the remaining time is used to further
+    improve the result by repeatedly perturbing the path order and applying the local search
+    again. In all cases, the best order found is used.
+
+    When using `--two-opt` or `--time-limit`, detailed progress indication are available in
+    the debug output, which is enabled using the `-vv` global option:
 
         $ vpype -vv [...] linesort --two-opt [...]
 
     Note: to further optimize the plotting time, consider using `linemerge` before `linesort`.
     """
-    if len(lines) < 2:
-        return lines
-
-    line_index = vp.LineIndex(lines[1:], reverse=not no_flip)
-    new_lines = lines.clone([lines[0]])
-
-    while len(line_index) > 0:
-        # noinspection PyShadowingNames
-        idx, reverse = line_index.find_nearest(new_lines[-1][-1])
-        line = line_index.pop(idx)
-        if line is not None:
-            if reverse:
-                line = np.flip(line)
-            new_lines.append(line)
-
-    original = lines.pen_up_length()
-    replacement = new_lines.pen_up_length()
-    if original[0] < replacement[0]:
-        logging.info(
-            f"optimize: could not improve pen-up distance {original} to {replacement}"
-        )
-        new_lines = lines
-        replacement = original
-    else:
-        logging.info(
-            f"optimize: reduced pen-up (distance, mean, median) from {original} to "
-            f"{replacement}"
+    if seam and method != "greedy":
+        raise click.BadParameter("--seam is only supported by the greedy method")
+
+    new_lines = vp.sort_lines(
+        lines,
+        flip=not no_flip,
+        method=method,
+        closed_tolerance=tolerance if seam else None,
+    )
+    if two_opt or time_limit is not None:
+        new_lines = vp.optimize_line_order(
+            new_lines, flip=not no_flip, passes=passes, time_limit=time_limit
         )
+    return new_lines
 
-    if two_opt:
-        current_pass = 1
-        min_value = -1e-10  # Do not swap on rounding error.
-        length = len(new_lines)
-        endpoints = np.zeros((length, 4), dtype="complex")
-        # start, index, reverse-index, end
-        for i in range(length):
-            endpoints[i] = new_lines[i][0], i, ~i, new_lines[i][-1]
-        indexes0 = np.arange(0, length - 1)
-        indexes1 = indexes0 + 1
-
-        # noinspection PyShadowingNames
-        def log_progress(pos):
-            # only compute progress if debug output is enable
-            if logging.getLogger().level > logging.DEBUG:
-                return
-            starts = endpoints[indexes0, -1]
-            ends = endpoints[indexes1, 0]
-            dists = np.abs(starts - ends)
-            dist_sum = dists.sum()
-            logging.debug(
-                f"optimize: pen-up distance is {dist_sum}. {100 * pos / length:.02f}% done "
-                f"with pass {current_pass}/{passes}"
-            )
 
-        improved = True
-        while improved:
-            improved = False
-
-            first = endpoints[0][0]
-            pen_ups = endpoints[indexes0, -1]
-            pen_downs = endpoints[indexes1, 0]
-
-            delta = np.abs(first - pen_downs) - np.abs(pen_ups - pen_downs)
-            index = int(np.argmin(delta))
-            if delta[index] < min_value:
-                endpoints[: index + 1] = np.flip(
-                    endpoints[: index + 1], (0, 1)
-                )  # top to bottom, and right to left flips.
-                improved = True
-                log_progress(1)
-            for mid in range(1, length - 1):
-                idxs = np.arange(mid, length - 1)
-
-                mid_source = endpoints[mid - 1, -1]
-                mid_dest = endpoints[mid, 0]
-                pen_ups = endpoints[idxs, -1]
-                pen_downs = endpoints[idxs + 1, 0]
-                delta = (
-                    np.abs(mid_source - pen_ups)
-                    + np.abs(mid_dest - pen_downs)
-                    - np.abs(pen_ups - pen_downs)
-                    - np.abs(mid_source - mid_dest)
-                )
-                index = int(np.argmin(delta))
-                if delta[index] < min_value:
-                    endpoints[mid : mid + index + 1] = np.flip(
-                        endpoints[mid : mid + index + 1], (0, 1)
-                    )
-                    improved = True
-                    log_progress(mid)
-
-            last = endpoints[-1, -1]
-            pen_ups = endpoints[indexes0, -1]
-            pen_downs = endpoints[indexes1, 0]
-
-            delta = np.abs(pen_ups - last) - np.abs(pen_ups - pen_downs)
-            index = int(np.argmin(delta))
-            if delta[index] < min_value:
-                endpoints[index + 1 :] = np.flip(
-                    endpoints[index + 1 :], (0, 1)
-                )  # top to bottom, and right to left flips.
-                improved = True
-                log_progress(length)
-            if current_pass >= passes:
-                break
-            current_pass += 1
-
-        # Two-opt complete.
-        order = endpoints[:, 1]
-        reordered = list()
-        for i in range(length):
-            pos = int(order[i].real)
-            if pos < 0:
-                pos = ~pos
-                new_lines.lines[pos] = np.flip(new_lines.lines[pos])
-            reordered.append(new_lines.lines[pos])
-        new_lines.lines.clear()
-        new_lines.extend(reordered)
-        logging.info(
-            f"optimize: two-op further reduced pen-up (distance, mean, median) from "
-            f"{replacement} to {new_lines.pen_up_length()}"
-        )
+@cli.command(group="Operations")
+@click.option(
+    "-d",
+    "--device",
+    type=TextType(),
+    help="Plotter whose configuration provides the pen count and pen change cost.",
+)
+@click.option(
+    "--pen-switch-time",
+    type=FloatType(),
+    help="Time needed to change pen in seconds (overrides the device configuration).",
+)
+@click.option(
+    "--pen-up-speed",
+    type=LengthType(),
+    help="Pen-up travel distance per second (overrides the device configuration).",
+)
+@click.option(
+    "-f",
+    "--no-flip",
+    is_flag=True,
+    help="Disable reversing stroke direction for optimization.",
+)
+@global_processor
+def layersort(
+    document: vp.Document,
+    device: str | None,
+    pen_switch_time: float | None,
+    pen_up_speed: float | None,
+    no_flip: bool,
+) -> vp.Document:
+    """Sort layers to minimize the pen-up travel time, including pen changes.
+
+    This command reorders the layers such as to minimize the estimated pen-up time of the
+    whole plot, which includes the travel from the end of each layer to the beginning of the
+    next one, as well as the pen changes. Layers are renumbered to follow the optimized order.
+    In addition, the paths of each layer are arranged such that the layer starts close to the
+    end of the previous one, using either their current order (possibly reversed), or the
+    result of a greedy sort (as performed by `linesort`) starting with the closest path.
+
+    The pen used by each layer, the time needed to change pen and the pen-up speed are
+    obtained from the configuration of the plotter selected with the `--device` option (or the
+    default HPGL device, if configured). As for the `write` command, layer N uses pen
+    1 + (N - 1) % PEN_COUNT, and the renumbered layers keep their pen. The `pen_switch_time`
+    (in seconds, default: 0) and `pen_up_speed` (distance per second, default: 200mm) keys of
+    the device configuration may be overridden with the `--pen-switch-time` and
+    `--pen-up-speed` options. If no device is configured, each layer is considered to use a
+    different pen.
+
+    For best results, use `linesort` before `layersort`:
+
+        $ vpype read input.svg linesort layersort --device hp7475a write -d hp7475a out.hpgl
+    """
 
-    return new_lines
+    config = vp.config_manager.get_plotter_config(device)
+    if device is not None and config is None:
+        raise click.BadParameter(f"no configuration found for device '{device}'")
+
+    pen_count = config.pen_count if config is not None else None
+    if pen_switch_time is None:
+        pen_switch_time = config.pen_switch_time if config is not None else 0.0
+    if pen_up_speed is None:
+        pen_up_speed = (
+            config.pen_up_speed if config is not None else vp.PlotterConfig.pen_up_speed
+        )
+    if pen_up_speed <= 0:
+        raise click.BadParameter("pen-up speed must be positive")
+
+    return vp.sort_layers(
+        document,
+        pen_count=pen_count,
+        pen_switch_cost=pen_switch_time * pen_up_speed,
+        flip=not no_flip,
+    )
 
 
 @cli.command(group="Operations")
@@ -478,18 +537,18 @@ def filter_command(
     If multiple options are provided, paths will be kept only if they respect every
     corresponding criterion (i.e. logical AND operator).
     """
-    keys = []
+    masks = []
     if min_length is not None:
-        keys.append(lambda line: vp.line_length(line) >= cast(float, min_length))
+        masks.append(lines.line_lengths() >= min_length)
     if max_length is not None:
-        keys.append(lambda line: vp.line_length(line) <= cast(float, max_length))
+        masks.append(lines.line_lengths() <= max_length)
     if closed:
-        keys.append(lambda line: vp.is_closed(line, tolerance))
+        masks.append(lines.line_closed(tolerance))
     if not_closed:
-        keys.append(lambda line: not vp.is_closed(line, tolerance))
+        masks.append(~lines.line_closed(tolerance))
 
-    if keys:
-        lines.filter(lambda line: vp.union(line, keys))
+    if masks:
+        lines.filter(np.logical_and.reduce(masks))
     else:
         logging.warning("filter: no criterion was provided, all geometries are preserved")
 
@@ -671,10 +730,12 @@ def layout(
 
     document.page_size = size
 
+    # the scaling (if any) and translation are combined into a single transform
+    scale = 1.0
+    offset_x = offset_y = 0.0
     if margin is not None:
-        document.translate(-min_x, -min_y)
         scale = min((size[0] - 2 * margin) / width, (size[1] - 2 * margin) / height)
-        document.scale(scale)
+        offset_x, offset_y = -min_x * scale, -min_y * scale
         min_x = min_y = 0.0
         width *= scale
         height *= scale
@@ -695,7 +756,7 @@ def layout(
     else:
         v_offset = margin + (size[1] - height - 2 * margin) / 2 - min_y
 
-    document.translate(h_offset, v_offset)
+    document.transform([[scale, 0, offset_x + h_offset], [0, scale, offset_y + v_offset]])
     return document
 
 
@@ -743,11 +804,11 @@ def pagerotate(document: vp.Document, clockwise: bool, orientation: str | None):
         return document
 
     if clockwise:
-        document.rotate(math.pi / 2)
-        document.translate(h, 0)
+        c, s = math.cos(math.pi / 2), math.sin(math.pi / 2)
+        document.transform([[c, -s, h], [s, c, 0]])
     else:
-        document.rotate(-math.pi / 2)
-        document.translate(0, w)
+        c, s = math.cos(-math.pi / 2), math.sin(-math.pi / 2)
+        document.transform([[c, -s, 0], [s, c, w]])
 
     document.page_size = h, w
     return document
@@ -833,21 +894,22 @@ def splitdist(
             new_doc.add(lines, layer_id)
             continue
 
-        cumulative_length = 0
-        split_lines = lines.clone()
-        num_lines = len(lines)
+        cumulative_length = 0.0
+        start = 0
+        line_lengths = lines.line_lengths().tolist()
+        num_lines = len(line_lengths)
 
-        for i, line in enumerate(lines):
-            current_line_length = np.sum(np.abs(np.diff(line)))
-            split_lines.append(line)
-            cumulative_length += current_line_length
+        for i, line_length in enumerate(line_lengths):
+            cumulative_length += line_length
 
             if cumulative_length >= dist or i == num_lines - 1:
+                split_lines = lines.clone()
+                split_lines.extend(lines[start : i + 1])
                 if new_doc.layers[layer_id].is_empty():
                     new_doc.add(split_lines, layer_id, with_metadata=True)
                 else:
                     new_doc.add(split_lines, new_doc.free_id(), with_metadata=True)
-                split_lines = lines.clone()
-                cumulative_length = 0
+                start = i + 1
+                cumulative_length = 0.0
 
     return new_doc
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import logging
+import math
 import pathlib
 import sys
 
@@ -35,8 +36,16 @@ __all__ = ("read",)
     "-q",
     "--quantization",
     type=LengthType(),
-    default="0.1mm",
-    help="Maximum length of segments approximating curved elements (default: 0.1mm).",
+    help=(
+        "Maximum length of segments approximating curved elements (default: 0.1mm, or "
+        "unbounded with `--tolerance`)."
+    ),
+)
+@click.option(
+    "-t",
+    "--tolerance",
+    type=LengthType(),
+    help="Approximate curved elements adaptively with this maximum deviation.",
 )
 @click.option("--no-fail", is_flag=True, help="Do not fail is the target file doesn't exist.")
 @click.option(
@@ -53,6 +62,12 @@ __all__ = ("read",)
     default=False,
     help="Enable multiprocessing for SVG conversion.",
 )
+@click.option(
+    "--streaming",
+    is_flag=True,
+    default=False,
+    help="Read the SVG one top-level group at a time to limit memory usage.",
+)
 @click.option(
     "-c",
     "--no-crop",
@@ -83,18 +98,25 @@ def read(
     single_layer: bool,
     layer: int | None,
     attr: list[str],
-    quantization: float,
+    quantization: float | None,
+    tolerance: float | None,
     no_fail: bool,
     simplify: bool,
     parallel: bool,
+    streaming: bool,
     no_crop: bool,
     display_size: tuple[float, float] | None,
     display_landscape: bool,
 ) -> vp.Document:
-    """Extract geometries from an SVG file.
+    """Extract geometries from an SVG file or a vpype file.
 
     FILE may be a file path or a dash (-) to read from the standard input instead.
 
+    Files with the `.vpype` extension are read as vpype's native binary format (see the `write`
+    command). Such files are loaded as is, including their metadata and page size, and the
+    SVG-specific options are ignored. In single-layer mode, all their layers are merged into
+    the target layer.
+
     By default, the `read` command attempts to preserve the layer structure of the SVG. In this
     context, top-level groups (<g>) are each considered a layer. If any, all non-group,
     top-level SVG elements are imported into layer 1.
@@ -134,12 +156,25 @@ of appearance.
     to approximate the curve while still guaranteeing an accurate conversion, but may increase
     the execution time of this command.
 
+    Alternatively, curved elements may be approximated adaptively with the `--tolerance`
+    option, which sets the maximum deviation between the curves and their approximation. Flat
+    portions of curves are then approximated with fewer, longer segments, which yields far
+    fewer points than the default quantization for the same accuracy, and in a single pass. In
+    this mode, the segment length is unbounded unless `--quantization` is provided as well.
+
     The `--parallel` option enables multiprocessing for the SVG conversion. This is recommended
-    ONLY when using `--simplify` on large SVG files with many curved elements.
+    for large SVG files with many curved elements, especially when using `--simplify`, and has
+    no effect on single-CPU machines.
 
     By default, the geometries are cropped to the SVG boundaries defined by its width and
     length attributes. The crop operation can be disabled with the `--no-crop` option.
 
+    The `--streaming` option enables incremental reading of large SVG files, where each
+    top-level group is read and converted in turn, such that the memory usage is bounded by the
+    largest layer rather than by the whole file. In this mode, elements may only reference
+    (e.g. with <use>) top-level definitions (<defs>, <style> and <symbol>) which appear before
+    them. This option is ignored in single-layer mode and with `--attr`.
+
     In general, SVG boundaries are determined by the `width` and `height` of the top-level
     <svg> tag. However, some SVGs may have their width and/or height specified as percent
     value or even miss them altogether (in which case they are assumed to be set to 100%). In
@@ -180,6 +215,10 @@ of appearance.
 
             vpype read --quantization 0.01mm --simplify input_file.svg [...]
 
+        Multi-layer import with adaptive approximation of curves:
+
+            vpype read --tolerance 0.01mm input_file.svg [...]
+
         Multi-layer import with cropping disabled:
 
             vpype read --no-crop input_file.svg [...]
@@ -201,13 +240,31 @@ of appearance.
         else:
             raise click.BadParameter(f"file {file!r} does not exist")
 
+    if tolerance is not None and tolerance <= 0:
+        raise click.BadParameter("tolerance must be strictly positive")
+    if quantization is None:
+        quantization = math.inf if tolerance is not None else vp.convert_length("0.1mm")
+
     if layer is not None and not single_layer:
         single_layer = True
         logging.debug("read: `--layer` provided, assuming single-layer mode")
 
-    if single_layer:
+    if path is not None and path.suffix.lower() == ".vpype":
+        doc = vp.read_vpype(path)
+        doc.add_to_sources(path)
+        if single_layer:
+            target_layer = single_to_layer_id(layer, document)
+            for lc in doc.layers.values():
+                document.add(lc, target_layer)
+            document.extend_page_size(doc.page_size)
+            document.sources |= doc.sources
+        else:
+            document.extend(doc)
+    elif single_layer:
         if len(attr) > 0:
             logging.warning("read: `--attr` is ignored in single-layer mode")
+        if streaming:
+            logging.warning("read: `--streaming` is ignored in single-layer mode")
 
         lc, width, height = vp.read_svg(
             file,
@@ -217,6 +274,7 @@ of appearance.
             parallel=parallel,
             default_width=default_width,
             default_height=default_height,
+            tolerance=tolerance,
         )
 
         document.add(lc, single_to_layer_id(layer, document), with_metadata=True)
@@ -235,8 +293,12 @@ of appearance.
                 parallel=parallel,
                 default_width=default_width,
                 default_height=default_height,
+                tolerance=tolerance,
+                streaming=streaming,
             )
         else:
+            if streaming:
+                logging.warning("read: `--streaming` is ignored with `--attr`")
             doc = vp.read_svg_by_attributes(
                 file,
                 attributes=attr,
@@ -246,6 +308,7 @@ of appearance.
                 parallel=parallel,
                 default_width=default_width,
                 default_height=default_height,
+                tolerance=tolerance,
             )
         document.extend(doc)
 
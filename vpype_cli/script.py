@@ -25,6 +25,8 @@ def script(file) -> vp.LineCollection:
         - Iterable of Nx2 numpy float array
         - Iterable of Nx1 numpy complex array (where the real and imag part corresponds to
           the x, resp. y coordinates)
+        - vpype's LineCollection (scripts generating large amounts of paths should build it
+          with `LineCollection.from_arrays()`, which is much faster than the other formats)
 
     All coordinates are expected to be in SVG pixel units (1/96th of an inch).
     """
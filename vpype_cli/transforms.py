@@ -38,6 +38,14 @@ def _compute_origin(
     return cast(tuple[float, float], origin), layer_ids, bounds
 
 
+def _transform_about_origin(
+    lc: vp.LineCollection, origin: tuple[float, float], a: float, b: float, c: float, d: float
+) -> None:
+    """Apply the linear transform ``[[a, b], [c, d]]`` around ``origin`` in a single pass."""
+    ox, oy = origin
+    lc.transform([[a, b, ox - a * ox - b * oy], [c, d, oy - c * ox - d * oy]])
+
+
 @cli.command(group="Transforms")
 @click.argument("offset", nargs=2, type=LengthType(), required=True)
 @layer_processor
@@ -113,10 +121,7 @@ def scale_relative(
         return document
 
     for vid in layer_ids:
-        lc = document[vid]
-        lc.translate(-origin[0], -origin[1])
-        lc.scale(scale[0], scale[1])
-        lc.translate(origin[0], origin[1])
+        _transform_about_origin(document[vid], origin, scale[0], 0, 0, scale[1])
 
     return document
 
@@ -190,10 +195,7 @@ def scaleto(
         factors = (min(factors), min(factors))
 
     for vid in layer_ids:
-        lc = document[vid]
-        lc.translate(-origin[0], -origin[1])
-        lc.scale(factors[0], factors[1])
-        lc.translate(origin[0], origin[1])
+        _transform_about_origin(document[vid], origin, factors[0], 0, 0, factors[1])
 
     return document
 
@@ -242,11 +244,9 @@ def rotate(
     except ValueError:
         return document
 
+    cos, sin = math.cos(angle * math.pi / 180.0), math.sin(angle * math.pi / 180.0)
     for vid in layer_ids:
-        lc = document[vid]
-        lc.translate(-origin[0], -origin[1])
-        lc.rotate(angle * math.pi / 180.0)
-        lc.translate(origin[0], origin[1])
+        _transform_about_origin(document[vid], origin, cos, -sin, sin, cos)
 
     return document
 
@@ -294,10 +294,9 @@ def skew(
     except ValueError:
         return document
 
+    tan_x = math.tan(angles[0] * math.pi / 180.0)
+    tan_y = math.tan(angles[1] * math.pi / 180.0)
     for vid in layer_ids:
-        lc = document[vid]
-        lc.translate(-origin[0], -origin[1])
-        lc.skew(angles[0] * math.pi / 180.0, angles[1] * math.pi / 180.0)
-        lc.translate(origin[0], origin[1])
+        _transform_about_origin(document[vid], origin, 1, tan_x, tan_y, 1)
 
     return document
@@ -16,8 +16,9 @@ __all__ = ("write",)
 
 WRITE_HELP = f"""Save geometries to a file.
 
-The `write` command support two format: SVG and HPGL. The format is determined based on the
-file extension used for `OUTPUT` or the `--file-format` option. The latter is useful when
+The `write` command support three formats: SVG, HPGL, and vpype's native binary format. The
+format is determined based on the file extension used for `OUTPUT` or the `--file-format`
+option. The latter is useful when
 `OUTPUT` is a single dash (`-`), in which case the output is printed to stdout instead of a
 file.
 
@@ -93,6 +94,11 @@ reduce file size. If `--absolute` is used, absolute coordinate are used instead.
 Optionally, the HPGL-only `--velocity` can be provided, in which case a `VS` command will be
 emitted with the provided value.
 
+The vpype format (`.vpype` extension) stores the document as is, including all layers,
+metadata, and page size, with full precision. It is meant for intermediate files between
+vpype invocations, as the `read` command loads it nearly instantly regardless of its size.
+All other options are ignored for this format.
+
 Examples:
 
     Write to a SVG using the current page size as set by the `read` command:
@@ -122,6 +128,10 @@ Examples:
     Write a A4 page with portrait orientation HPGL file:
 
         vpype [...] write --device hp7475a --page-size a4 --center
+
+    Save an intermediate result for further processing:
+
+        vpype read input.svg linemerge linesort write intermediate.vpype
 """
 
 
@@ -131,7 +141,7 @@ Examples:
     "-f",
     "--format",
     "file_format",
-    type=click.Choice(["svg", "hpgl"], case_sensitive=False),
+    type=click.Choice(["svg", "hpgl", "vpype"], case_sensitive=False),
     help="Output format (inferred from file extension by default).",
 )
 @click.option(
@@ -275,6 +285,14 @@ def write(
             velocity=velocity,
             quiet=quiet,
         )
+    elif file_format == "vpype":
+        if output.name == "<stdout>":
+            # the output file is opened in text mode
+            vp.write_vpype(output.buffer, document)
+        else:
+            # write through the (not yet opened) path, so that the file the document was read
+            # from, which may still be memory-mapped, can be safely overwritten
+            vp.write_vpype(output.name, document)
     else:
         logging.warning(
             f"write: format could not be inferred or format unknown '{file_format}', "
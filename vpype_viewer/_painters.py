@@ -17,6 +17,29 @@ if TYPE_CHECKING:  # pragma: no cover
 ResourceType = mgl.Buffer | mgl.Texture | mgl.TextureArray
 
 
+def _vertex_buffer(points: np.ndarray) -> np.ndarray:
+    """Returns a Nx2 float32 vertex buffer for a point array.
+
+    Single precision geometries are used as is, without conversion.
+    """
+    return vp.as_vector(points).astype("f4", copy=False)
+
+
+def _line_ids(offsets: np.ndarray) -> np.ndarray:
+    """Returns the line index of each point of a packed point buffer."""
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+def _strip_indices(offsets: np.ndarray) -> np.ndarray:
+    """Returns an index buffer for rendering a packed point buffer as line strips, with a
+    primitive restart index (-1) after each line.
+    """
+    total_length = int(offsets[-1])
+    indices = np.full(total_length + len(offsets) - 1, -1, dtype="i4")
+    indices[np.arange(total_length) + _line_ids(offsets)] = np.arange(total_length)
+    return indices
+
+
 class Painter:
     def __init__(self, ctx: mgl.Context):
         self._ctx = ctx
@@ -119,20 +142,8 @@ class LineCollectionFastPainter(Painter):
 
     @staticmethod
     def _build_buffers(lc: vp.LineCollection) -> tuple[np.ndarray, np.ndarray]:
-        total_length = sum(len(line) for line in lc)
-        buffer = np.empty((total_length, 2), dtype="f4")
-        indices = np.empty(total_length + len(lc), dtype="i4")
-        indices.fill(-1)
-
-        # build index array
-        cur_index = 0
-        for i, line in enumerate(lc):
-            next_idx = cur_index + len(line)
-            indices[i + cur_index : i + next_idx] = np.arange(cur_index, next_idx)
-            buffer[cur_index:next_idx] = vp.as_vector(line)
-            cur_index = next_idx
-
-        return buffer, indices
+        points, offsets = lc.as_arrays()
+        return _vertex_buffer(points), _strip_indices(offsets)
 
 
 class LineCollectionFastColorfulPainter(Painter):
@@ -176,23 +187,11 @@ class LineCollectionFastColorfulPainter(Painter):
 
     @classmethod
     def _build_buffers(cls, lc: vp.LineCollection) -> tuple[np.ndarray, np.ndarray]:
-        total_length = sum(len(line) for line in lc)
-        buffer = np.empty(total_length, dtype=[("vertex", "2f4"), ("color", "i1")])
-        indices = np.empty(total_length + len(lc), dtype="i4")
-        indices.fill(-1)
-
-        # build index array
-        cur_index = 0
-        for i, line in enumerate(lc):
-            next_idx = cur_index + len(line)
-            indices[i + cur_index : i + next_idx] = np.arange(cur_index, next_idx)
-
-            buffer["vertex"][cur_index:next_idx] = vp.as_vector(line)
-            buffer["color"][cur_index:next_idx] = i % len(cls.COLORS)
-
-            cur_index = next_idx
-
-        return buffer, indices
+        points, offsets = lc.as_arrays()
+        buffer = np.empty(len(points), dtype=[("vertex", "2f4"), ("color", "i1")])
+        buffer["vertex"] = vp.as_vector(points)
+        buffer["color"] = _line_ids(offsets) % len(cls.COLORS)
+        return buffer, _strip_indices(offsets)
 
 
 class LineCollectionPointsPainter(Painter):
@@ -240,16 +239,7 @@ class LineCollectionPointsPainter(Painter):
 
     @staticmethod
     def _build_buffers(lc: vp.LineCollection) -> np.ndarray:
-        buffer = np.empty((sum(len(line) for line in lc), 2), dtype="f4")
-
-        # build index array
-        cur_index = 0
-        for i, line in enumerate(lc):
-            next_idx = cur_index + len(line)
-            buffer[cur_index:next_idx] = vp.as_vector(line)
-            cur_index = next_idx
-
-        return buffer
+        return _vertex_buffer(lc.as_arrays()[0])
 
 
 class LineCollectionPenUpPainter(Painter):
@@ -343,7 +333,7 @@ class LineCollectionPreviewPainter(Painter):
             indices.append(reset_index)
 
         return (
-            np.vstack([vp.as_vector(line).astype("f4") for line in lc]),
+            _vertex_buffer(lc.as_arrays()[0]),
             np.concatenate(indices).astype("i4"),
         )
 